@@ -2,87 +2,80 @@
 """
 Aggregates all extracted cigar data into master JSON files.
 Creates: master-cigars.json, brands.json, lines.json
+(or .ndjson files plus master-cigars.meta.json with --format ndjson)
 """
 
-import json
 import os
 import re
+import sys
 import hashlib
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set
 from datetime import datetime
 from collections import defaultdict
 
+sys.path.insert(0, str(Path(__file__).parent))
+import codec
+from cigar_record import CigarRecord
+from extract_cache import file_hash, source_version
+from fuzzy_dedup import DEFAULT_THRESHOLD, fuzzy_clusters
+from identifiers import IdentifierIndex, normalize_upc
+from name_matcher import BRAND_INDEX, match_vitola, match_wrapper
+from record_io import (find_records, is_records_file, iter_records, json_default, output_format, records_path,
+                       write_records)
+from slugs import generate_slug
 
-def generate_slug(text: str) -> str:
-    """Generate URL-friendly slug from text."""
-    if not text:
-        return ""
-    slug = text.lower()
-    slug = re.sub(r'[^a-z0-9\s-]', '', slug)
-    slug = re.sub(r'[\s_]+', '-', slug)
-    slug = re.sub(r'-+', '-', slug)
-    return slug.strip('-')
 
-
-def generate_id(cigar: Dict) -> str:
-    """Generate unique ID for a cigar based on its key attributes."""
+def generate_id(cigar: Dict, qualifier: str = "") -> str:
+    """Generate unique ID for a cigar based on its key attributes.
+    
+    qualifier tells apart records that share brand, name and size (see
+    assign_ids); without one the id is the same as it has always been.
+    """
     key = f"{cigar.get('brand', '')}-{cigar.get('name', '')}-{cigar.get('size', '')}"
+    if qualifier:
+        key = f"{key}-{qualifier}"
     return hashlib.md5(key.encode()).hexdigest()[:12]
 
 
-def normalize_brand(brand: str) -> str:
-    """Normalize brand name."""
-    if not brand:
-        return ""
-    
-    brand = str(brand).strip()
-    
-    # Common normalizations
-    normalizations = {
-        "1875 BY ROMEO Y JULIETA": "Romeo y Julieta",
-        "ROMEO Y JULIETA": "Romeo y Julieta",
-        "H. UPMANN": "H. Upmann",
-        "MONTECRISTO": "Montecristo",
-        "PUNCH": "Punch",
-        "HOYO DE MONTERREY": "Hoyo de Monterrey",
-        "ARTURO FUENTE": "Arturo Fuente",
-        "AF": "Arturo Fuente",
-        "LA FLOR DOMINICANA": "La Flor Dominicana",
-        "LFD": "La Flor Dominicana",
-        "MY FATHER": "My Father",
-        "DREW ESTATE": "Drew Estate",
-        "J.C. NEWMAN": "J.C. Newman",
-        "JCN": "J.C. Newman",
-        "CUESTA-REY": "Cuesta-Rey",
-        "CR": "Cuesta-Rey",
-        "OLIVA": "Oliva",
-        "PADRON": "Padron",
-        "PADRÓN": "Padron",
-        "ROCKY PATEL": "Rocky Patel",
-        "AJ FERNANDEZ": "AJ Fernandez",
-        "A.J. FERNANDEZ": "AJ Fernandez",
-        "FOUNDATION": "Foundation",
-        "ASHTON": "Ashton",
-        "DAVIDOFF": "Davidoff",
-        "PERDOMO": "Perdomo",
-        "ESPINOSA": "Espinosa",
-        "PLASENCIA": "Plasencia",
-        "LA AURORA": "La Aurora",
-        "ACID": "Acid",
-        "LIGA PRIVADA": "Liga Privada",
-        "UNDERCROWN": "Undercrown",
-        "HERRERA ESTELI": "Herrera Esteli",
-        "DEADWOOD": "Deadwood",
-    }
+def assign_ids(ordered: List[Dict]):
+    """Set the id of each exact-dedup entry's record, in catalog order.
     
-    brand_upper = brand.upper()
-    for key, value in normalizations.items():
-        if key in brand_upper:
-            return value
+    The first record for a brand/name/size keeps the plain generate_id().
+    Later ones, kept apart by a sub-brand or a different UPC, get an id
+    qualified by their line and UPC (and a counter if that still clashes),
+    so existing ids never move.
+    """
+    seen = set()
+    for entry in ordered:
+        cigar = entry["record"]
+        cigar_id = generate_id(cigar)
+        if cigar_id in seen:
+            qualifier = f"{cigar.get('line') or ''}-{cigar.get('upc') or ''}"
+            cigar_id = generate_id(cigar, qualifier)
+            n = 1
+            while cigar_id in seen:
+                n += 1
+                cigar_id = generate_id(cigar, f"{qualifier}-{n}")
+        seen.add(cigar_id)
+        cigar['id'] = cigar_id
+
+
+def split_brand(brand: str) -> tuple:
+    """(canonical brand, sub-brand) through the BRAND_ALIASES index.
+    
+    'H UPMANN 1844 ANEJO' -> ('H. Upmann', '1844 Anejo'); the sub-brand is
+    "" for a plain alias.
+    """
+    if not brand:
+        return "", ""
     
-    # Title case if not found
-    return brand.title()
+    return BRAND_INDEX.split(str(brand).strip())
+
+
+def normalize_brand(brand: str) -> str:
+    """Normalize brand name through the BRAND_ALIASES index."""
+    return split_brand(brand)[0]
 
 
 def validate_and_fix_size(cigar: Dict) -> Dict:
@@ -121,33 +114,165 @@ def validate_and_fix_size(cigar: Dict) -> Dict:
     return cigar
 
 
-def deduplicate_cigars(cigars: List[Dict]) -> List[Dict]:
-    """Remove duplicate cigars based on key attributes."""
-    seen = {}
-    unique = []
+def dedup_key(cigar: Dict, sub_brand: str = "") -> str:
+    """Exact-match dedup key: normalized brand and sub-brand, name and size.
     
-    for cigar in cigars:
-        # Validate size data
-        cigar = validate_and_fix_size(cigar)
-        
-        # Create dedup key
-        key = (
-            normalize_brand(cigar.get('brand', '')).lower(),
-            cigar.get('name', '').lower(),
-            cigar.get('size', '').lower(),
-        )
-        
-        if key not in seen:
-            seen[key] = cigar
-            unique.append(cigar)
+    The sub-brand keeps 'H UPMANN 1844 ANEJO' and 'H UPMANN 1844 CLASSIC'
+    apart when both list a 'TORO BOX 25'.
+    """
+    return "\x1f".join((
+        normalize_brand(cigar.get('brand', '')).lower(),
+        sub_brand.lower(),
+        (cigar.get('name') or '').lower(),
+        (cigar.get('size') or '').lower(),
+    ))
+
+
+def upc_groups(records: List[Dict]) -> List[List[int]]:
+    """Split the records of one dedup key by UPC.
+    
+    Records with different valid UPCs are different products even when
+    brand, name and size agree. Records without a UPC join the first
+    group, which always holds records[0].
+    """
+    groups = {}
+    loose = []
+    for i, cigar in enumerate(records):
+        upc, _ = normalize_upc(cigar.get('upc'))
+        if upc is None:
+            loose.append(i)
         else:
-            # Merge data from duplicate (prefer non-null values)
-            existing = seen[key]
-            for field, value in cigar.items():
-                if value and not existing.get(field):
-                    existing[field] = value
+            groups.setdefault(upc, []).append(i)
+    
+    if not groups:
+        return [loose]
+    ordered = list(groups.values())
+    ordered[0] = sorted(ordered[0] + loose)
+    return ordered
+
+
+def merge_records(records: List[Dict]) -> Dict:
+    """Merge duplicate records into a copy of the first (prefer non-null values).
+    
+    A lone record is returned as is rather than copied; loaded records are
+    not modified after load_source.
+    """
+    if len(records) == 1:
+        return records[0]
+    merged = records[0].copy()
+    for cigar in records[1:]:
+        for field, value in cigar.items():
+            if value and not merged.get(field):
+                merged[field] = value
+    return merged
+
+
+def id_changes(previous: List[Dict], current: List[Dict]) -> Dict[str, Optional[str]]:
+    """Ids of the previous catalog that are gone from current, mapped to
+    their successor, or None if there is none.
+    
+    The successor has the same source, name and size (else the same name
+    and size). Ties go to the record whose brand and line spell the old
+    brand ('H Upmann 1844 Anejo' -> 'H. Upmann' + '1844 Anejo').
+    """
+    ids = {cigar['id'] for cigar in current}
+    by_source = defaultdict(list)
+    by_name = defaultdict(list)
+    for cigar in current:
+        by_source[(cigar.get('source'), cigar.get('name'), cigar.get('size'))].append(cigar)
+        by_name[(cigar.get('name'), cigar.get('size'))].append(cigar)
+    
+    def successor(cigar: Dict) -> Optional[str]:
+        brand = generate_slug(cigar.get('brand', ''))
+        for candidates in (by_source.get((cigar.get('source'), cigar.get('name'), cigar.get('size'))),
+                           by_name.get((cigar.get('name'), cigar.get('size')))):
+            if not candidates:
+                continue
+            if len(candidates) > 1:
+                candidates = [c for c in candidates
+                              if brand in (generate_slug(c['brand']), generate_slug(f"{c['brand']} {c.get('line') or ''}"))]
+            if len(candidates) == 1:
+                return candidates[0]['id']
+        return None
     
-    return unique
+    return {cigar['id']: successor(cigar) for cigar in previous if cigar.get('id') not in ids}
+
+
+def record_summary(cigar: Dict) -> Dict:
+    """Fields that identify a record in the dedup reports."""
+    return {field: cigar.get(field) for field in ("id", "brand", "name", "size", "source")}
+
+
+def fold_clusters(ordered: List[Dict], clusters: List[List[int]]) -> tuple:
+    """Merge each cluster of entries into its first; returns (ordered, brand slugs with merges)."""
+    result = []
+    merged_brands = set()
+    for cluster in clusters:
+        entry = ordered[cluster[0]]
+        if len(cluster) > 1:
+            entry = dict(entry, record=merge_records([ordered[i]["record"] for i in cluster]))
+            merged_brands.add(entry["brand_slug"])
+        result.append(entry)
+    return result, merged_brands
+
+
+def identifier_deduplicate(ordered: List[Dict]) -> tuple:
+    """Merge entries that share a UPC or SKU (qualified by box count).
+    
+    ordered holds the exact-dedup entries; the entries are not modified.
+    Returns (ordered, identifiers, report): identifiers maps each UPC/SKU
+    identifier to its canonical cigar id, report lists size conflicts.
+    """
+    index = IdentifierIndex()
+    for position, entry in enumerate(ordered):
+        index.add(position, entry["record"])
+    
+    groups = index.groups()
+    result, merged_brands = fold_clusters(ordered, groups)
+    
+    identifiers = [
+        {"identifier": identifier, "cigar_id": ordered[index.find(position)]["record"].get("id")}
+        for identifier, position in index.owner.items()
+    ]
+    conflicts = [
+        {
+            "identifier": conflict["identifier"],
+            "sizes": conflict["sizes"],
+            "records": [record_summary(ordered[i]["record"]) for i in conflict["positions"]],
+        }
+        for conflict in index.conflicts
+    ]
+    report = {
+        "identifiers": len(identifiers),
+        "merged": len(ordered) - len(result),
+        "conflicts": len(conflicts),
+        "invalid_upcs": index.invalid_upcs,
+        "brands": sorted(merged_brands),
+    }
+    return result, identifiers, dict(report, conflict_details=conflicts)
+
+
+def fuzzy_deduplicate(ordered: List[Dict], threshold: float) -> tuple:
+    """Fold near-duplicate cigars into the first of each fuzzy cluster.
+    
+    ordered holds the exact-dedup entries; the entries are not modified.
+    Returns (ordered, merges, stats), with one merge report row per record
+    folded away.
+    """
+    records = [u["record"] for u in ordered]
+    clusters, pairs, stats = fuzzy_clusters(records, threshold)
+    result, merged_brands = fold_clusters(ordered, clusters)
+    
+    merges = [
+        {
+            "score": pair["score"],
+            "kept": record_summary(records[pair["leader"]]),
+            "merged": record_summary(records[pair["record"]]),
+        }
+        for pair in pairs
+    ]
+    stats["brands"] = sorted(merged_brands)
+    return result, merges, stats
 
 
 def build_taxonomy(cigars: List[Dict]) -> tuple:
@@ -201,77 +326,348 @@ def build_taxonomy(cigars: List[Dict]) -> tuple:
     return list(brands.values()), list(lines.values())
 
 
-def process_all():
-    """Main aggregation process."""
+STATE_FILENAME = ".aggregate_state.json"
+SCHEMA_EXAMPLES = 10  # schema problems kept per file for the report
+
+# Modules whose code shapes the saved state. The state is keyed on a hash
+# of their source, so any change to them starts the next run from scratch.
+STATE_MODULES = ("aggregate", "cigar_record", "codec", "config", "extract_cache", "fuzzy_dedup",
+                 "identifiers", "name_matcher", "record_io", "size_parser", "slugs")
+
+
+def state_version() -> str:
+    return source_version(STATE_MODULES)
+
+
+def empty_state() -> Dict:
+    return {"version": state_version(), "files": {}, "unique": {}, "brands": {}, "lines": {}}
+
+
+def state_object(obj: Dict):
+    """json object_hook for the state file: cigar records (the only objects
+    with both 'brand' and 'id', as set by load_source) become CigarRecords
+    as they are parsed, so the whole state never exists as plain dicts."""
+    if "brand" in obj and "id" in obj:
+        return CigarRecord(obj)
+    return obj
+
+
+def load_state(path: Path) -> Dict:
+    """Load the previous aggregation state, or an empty one if unusable."""
+    if path.exists():
+        try:
+            state = codec.load(path, object_hook=state_object)
+            if state.get("version") == state_version():
+                files = state["files"]
+                for entry in state["unique"].values():
+                    if entry["record"] is None:
+                        rel, i = entry["first"]
+                        entry["record"] = files[rel]["records"][i]
+                return state
+        except (ValueError, OSError):
+            pass
+    return empty_state()
+
+
+def save_state(path: Path, state: Dict):
+    """Write the aggregation state. A dedup group of one record stores no
+    copy of it; load_state points it back at the record in its file."""
+    files = state["files"]
+    unique = {
+        key: dict(entry, record=None)
+        if entry["record"] is files[entry["first"][0]]["records"][entry["first"][1]] else entry
+        for key, entry in state["unique"].items()
+    }
+    codec.dump(dict(state, unique=unique), path, compact=True, default=json_default)
+
+
+def source_files(extracted_dir: Path) -> List[str]:
+    """Extracted JSON files in aggregation order, relative to extracted_dir."""
+    files = []
+    for subdir in ["excel", "pdf"]:
+        dir_path = extracted_dir / subdir
+        if not dir_path.exists():
+            continue
+        for json_file in sorted(dir_path.iterdir()):
+            if is_records_file(json_file):
+                files.append(f"{subdir}/{json_file.name}")
+    return files
+
+
+def load_source(json_file: Path) -> tuple:
+    """Load one extracted JSON/NDJSON file into normalized CigarRecords.
+    
+    Records are checked against CIGAR_SCHEMA as they are decoded; returns
+    (cigars, keys, problems): the dedup key of each cigar, and one
+    'index: message' entry per schema problem.
+    
+    A sub-brand left over from brand normalization becomes the line when
+    the extractor's line was only the start of the name, and is part of
+    the dedup key either way. Ids are final only after assign_ids().
+    """
+    cigars = []
+    keys = []
+    problems = []
+    for i, record in enumerate(iter_records(json_file)):
+        problems.extend(f"{i}: {problem}" for problem in codec.check_record(record))
+        cigars.append(CigarRecord(record))
+    
+    for cigar in cigars:
+        # Normalize brand
+        cigar['brand'], sub_brand = split_brand(cigar.get('brand', ''))
+        
+        line = cigar.get('line')
+        if sub_brand and line and (cigar.get('name') or '').upper().startswith(line.upper()):
+            cigar['line'] = sub_brand
+        
+        # Generate ID and slug
+        cigar['id'] = generate_id(cigar)
+        cigar['slug'] = generate_slug(f"{cigar['brand']} {cigar.get('name', '')}")
+        
+        # Backfill classification the extractor could not supply
+        if not cigar.get('vitola'):
+            cigar['vitola'] = match_vitola(cigar.get('name'))
+        if not cigar.get('wrapper'):
+            cigar['wrapper'] = match_wrapper(cigar.get('name'))
+        
+        validate_and_fix_size(cigar)
+        keys.append(dedup_key(cigar, sub_brand))
+    
+    return cigars, keys, problems
+
+
+def refresh_state(state: Dict, extracted_dir: Path) -> Dict:
+    """Apply changed, added and removed extract files to the aggregation state.
+    
+    Only files whose mtime/size changed are hashed, and only files whose hash
+    changed are reloaded. Dedup groups are re-merged for the keys those files
+    touch, and brands/lines are rebuilt for the brands those groups belong to.
+    Returns a summary of what changed.
+    """
+    order = source_files(extracted_dir)
+    rank = {rel: i for i, rel in enumerate(order)}
+    files = state["files"]
+    unique = state["unique"]
+    
+    removed = [rel for rel in files if rel not in rank]
+    changed = []
+    affected = set()
+    
+    for rel in order:
+        json_file = extracted_dir / rel
+        st = json_file.stat()
+        entry = files.get(rel)
+        if entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+            continue
+        
+        digest = file_hash(json_file)
+        if entry and entry["hash"] == digest:
+            entry["mtime"], entry["size"] = st.st_mtime, st.st_size
+            continue
+        
+        try:
+            records, keys, problems = load_source(json_file)
+            print(f"  Loaded {len(records)} cigars from {json_file.name}")
+            if problems:
+                print(f"    Schema problems: {len(problems)} (first: {problems[0]})")
+        except Exception as e:
+            print(f"  Error loading {json_file.name}: {e}")
+            records, keys, problems = [], [], []
+            # Stored without a hash or mtime so the next run loads it again
+            digest = None
+        
+        if entry:
+            affected.update(entry["keys"])
+        
+        sources = defaultdict(int)
+        for cigar in records:
+            sources[cigar.get('source', 'unknown')] += 1
+        
+        files[rel] = {
+            "mtime": st.st_mtime if digest else None,
+            "size": st.st_size,
+            "hash": digest,
+            "records": records,
+            "keys": keys,
+            "sources": dict(sources),
+            "schema_problems": {"count": len(problems), "examples": problems[:SCHEMA_EXAMPLES]},
+        }
+        affected.update(files[rel]["keys"])
+        changed.append(rel)
+    
+    for rel in removed:
+        affected.update(files.pop(rel)["keys"])
+    
+    # Re-merge the affected dedup groups from every file that holds them
+    touched = set(changed) | set(removed)
+    positions = {}
+    
+    def key_positions(rel: str) -> Dict[str, List[int]]:
+        if rel not in positions:
+            index = defaultdict(list)
+            for i, key in enumerate(files[rel]["keys"]):
+                index[key].append(i)
+            positions[rel] = index
+        return positions[rel]
+    
+    affected_brands = set()
+    
+    for key in affected:
+        previous = unique.pop(key, None)
+        holders = []
+        if previous:
+            affected_brands.add(previous["brand_slug"])
+            holders = [rel for rel in previous["files"] if rel not in touched]
+            for split in previous.get("splits", []):
+                affected_brands.add(unique.pop(split)["brand_slug"])
+        holders += [rel for rel in changed if key in key_positions(rel)]
+        if not holders:
+            continue
+        holders.sort(key=rank.get)
+        
+        located = [(rel, i) for rel in holders for i in key_positions(rel)[key]]
+        records = [files[rel]["records"][i] for rel, i in located]
+        
+        # One entry per UPC; entries after the first are keyed off this one
+        groups = upc_groups(records)
+        splits = [f"{key}\x1e{n}" for n in range(1, len(groups))]
+        for group_key, group in zip([key] + splits, groups):
+            merged = merge_records([records[i] for i in group])
+            brand_slug = generate_slug(normalize_brand(merged.get('brand', '')))
+            
+            unique[group_key] = {
+                "record": merged,
+                "first": list(located[group[0]]),
+                "files": holders,
+                "brand_slug": brand_slug,
+                "line_slug": f"{brand_slug}-{generate_slug(merged['line'])}" if merged.get('line') else None,
+            }
+            affected_brands.add(brand_slug)
+        if splits:
+            unique[key]["splits"] = splits
+    
+    # Rebuild taxonomy for affected brands only
+    ordered = sorted(unique.values(), key=lambda u: (rank[u["first"][0]], u["first"][1]))
+    state["order"] = ordered
+    
+    if affected_brands:
+        subset = [u["record"] for u in ordered if u["brand_slug"] in affected_brands]
+        brands, lines = build_taxonomy(subset)
+        
+        state["brands"] = {slug: b for slug, b in state["brands"].items() if slug not in affected_brands}
+        state["lines"] = {slug: l for slug, l in state["lines"].items() if l["brand_id"] not in affected_brands}
+        state["brands"].update((b["slug"], b) for b in brands)
+        state["lines"].update((l["slug"], l) for l in lines)
+    
+    return {
+        "changed_files": changed,
+        "removed_files": removed,
+        "affected_keys": len(affected),
+        "affected_brands": sorted(affected_brands),
+    }
+
+
+def process_all(incremental: bool = False, fmt: str = "json",
+                fuzzy_threshold: Optional[float] = DEFAULT_THRESHOLD, compact: bool = False):
+    """Main aggregation process.
+    
+    With incremental=True, the state saved by the previous run is reused and
+    only extract files that changed since then are reloaded. fmt="ndjson"
+    streams the master files one record per line, with the metadata block
+    in master-cigars.meta.json. Near-duplicates scoring at least
+    fuzzy_threshold are merged after exact dedup (None disables this).
+    compact writes the master files without indentation.
+    """
     base_dir = Path(os.path.expanduser("~/Projects/boxbluebook/data"))
     extracted_dir = base_dir / "extracted"
     output_dir = base_dir
+    state_path = base_dir / STATE_FILENAME
+    
+    state = load_state(state_path) if incremental else empty_state()
+    changes = refresh_state(state, extracted_dir)
+    ordered = state.pop("order")
+    assign_ids(ordered)
+    
+    if incremental:
+        print(f"\nChanged files: {len(changes['changed_files'])}, removed: {len(changes['removed_files'])}")
+        print(f"Affected dedup keys: {changes['affected_keys']}, brands: {len(changes['affected_brands'])}")
     
-    all_cigars = []
     sources = defaultdict(int)
+    raw_records = 0
+    for entry in state["files"].values():
+        raw_records += len(entry["records"])
+        for source, count in entry["sources"].items():
+            sources[source] += count
     
-    # Load all extracted JSON files
-    for subdir in ["excel", "pdf"]:
-        dir_path = extracted_dir / subdir
-        if not dir_path.exists():
-            continue
-        
-        for json_file in dir_path.glob("*.json"):
-            try:
-                with open(json_file, 'r') as f:
-                    cigars = json.load(f)
-                    
-                    for cigar in cigars:
-                        # Normalize brand
-                        cigar['brand'] = normalize_brand(cigar.get('brand', ''))
-                        
-                        # Generate ID and slug
-                        cigar['id'] = generate_id(cigar)
-                        cigar['slug'] = generate_slug(f"{cigar['brand']} {cigar.get('name', '')}")
-                        
-                        sources[cigar.get('source', 'unknown')] += 1
-                    
-                    all_cigars.extend(cigars)
-                    print(f"  Loaded {len(cigars)} cigars from {json_file.name}")
-            except Exception as e:
-                print(f"  Error loading {json_file.name}: {e}")
-    
-    print(f"\nTotal raw cigars: {len(all_cigars)}")
-    
-    # Deduplicate
-    unique_cigars = deduplicate_cigars(all_cigars)
-    print(f"Unique cigars after dedup: {len(unique_cigars)}")
-    
-    # Build taxonomy
-    brands, lines = build_taxonomy(unique_cigars)
+    print(f"\nTotal raw cigars: {raw_records}")
+    
+    print(f"Unique cigars after dedup: {len(ordered)}")
+    
+    # Identifier joins first, then name similarity
+    ordered, identifiers, identifier_report = identifier_deduplicate(ordered)
+    merged_brands = set(identifier_report["brands"])
+    print(f"Unique cigars after UPC/SKU merge: {len(ordered)}")
+    
+    merges, fuzzy_stats = [], None
+    if fuzzy_threshold is not None:
+        ordered, merges, fuzzy_stats = fuzzy_deduplicate(ordered, fuzzy_threshold)
+        merged_brands.update(fuzzy_stats["brands"])
+        print(f"Unique cigars after fuzzy dedup (threshold {fuzzy_threshold}): {len(ordered)}")
+    
+    # Counts changed only for brands with merges; the saved state keeps
+    # the exact-dedup taxonomy
+    brand_map, line_map = state["brands"], state["lines"]
+    if merged_brands:
+        brands, lines = build_taxonomy([u["record"] for u in ordered if u["brand_slug"] in merged_brands])
+        brand_map = {slug: b for slug, b in brand_map.items() if slug not in merged_brands}
+        line_map = {slug: l for slug, l in line_map.items() if l["brand_id"] not in merged_brands}
+        brand_map.update((b["slug"], b) for b in brands)
+        line_map.update((l["slug"], l) for l in lines)
+    
+    unique_cigars = [u["record"] for u in ordered]
+    
+    # Taxonomy in first-appearance order
+    brand_order = list(dict.fromkeys(u["brand_slug"] for u in ordered))
+    line_order = list(dict.fromkeys(u["line_slug"] for u in ordered if u["line_slug"]))
+    brands = [brand_map[slug] for slug in brand_order if slug in brand_map]
+    lines = [line_map[slug] for slug in line_order if slug in line_map]
     print(f"Unique brands: {len(brands)}")
     print(f"Unique lines: {len(lines)}")
     
+    save_state(state_path, state)
+    
     # Save master files
     timestamp = datetime.now().isoformat()
     
-    master_cigars = {
-        "metadata": {
-            "generated": timestamp,
-            "total_cigars": len(unique_cigars),
-            "total_brands": len(brands),
-            "total_lines": len(lines),
-            "sources": dict(sources),
-        },
-        "cigars": unique_cigars,
+    metadata = {
+        "generated": timestamp,
+        "total_cigars": len(unique_cigars),
+        "total_brands": len(brands),
+        "total_lines": len(lines),
+        "sources": dict(sources),
     }
     
-    with open(output_dir / "master-cigars.json", 'w') as f:
-        json.dump(master_cigars, f, indent=2)
-    print(f"\nSaved: master-cigars.json ({len(unique_cigars)} cigars)")
+    # Ids retired since the last catalog, for anything keyed on them
+    previous_path = find_records(output_dir, "master-cigars")
+    retired = {}
+    if previous_path:
+        retired = id_changes(list(iter_records(previous_path, key="cigars")), unique_cigars)
+    
+    master_path = records_path(output_dir, "master-cigars", fmt)
+    write_records(master_path, unique_cigars, key="cigars", metadata=metadata, compact=compact)
+    print(f"\nSaved: {master_path.name} ({len(unique_cigars)} cigars)")
     
-    with open(output_dir / "brands.json", 'w') as f:
-        json.dump({"brands": brands}, f, indent=2)
-    print(f"Saved: brands.json ({len(brands)} brands)")
+    brands_path = records_path(output_dir, "brands", fmt)
+    write_records(brands_path, brands, key="brands", compact=compact)
+    print(f"Saved: {brands_path.name} ({len(brands)} brands)")
     
-    with open(output_dir / "lines.json", 'w') as f:
-        json.dump({"lines": lines}, f, indent=2)
-    print(f"Saved: lines.json ({len(lines)} lines)")
+    lines_path = records_path(output_dir, "lines", fmt)
+    write_records(lines_path, lines, key="lines", compact=compact)
+    print(f"Saved: {lines_path.name} ({len(lines)} lines)")
+    
+    identifiers_path = records_path(output_dir, "identifiers", fmt)
+    write_records(identifiers_path, identifiers, key="identifiers", compact=compact)
+    print(f"Saved: {identifiers_path.name} ({len(identifiers)} identifiers)")
     
     # Generate summary report
     report = {
@@ -280,8 +676,8 @@ def process_all():
             "cigars": len(unique_cigars),
             "brands": len(brands),
             "lines": len(lines),
-            "raw_records": len(all_cigars),
-            "duplicates_removed": len(all_cigars) - len(unique_cigars),
+            "raw_records": raw_records,
+            "duplicates_removed": raw_records - len(unique_cigars),
         },
         "by_brand": {b["name"]: b["cigar_count"] for b in sorted(brands, key=lambda x: -x["cigar_count"])[:20]},
         "sources": dict(sources),
@@ -295,11 +691,46 @@ def process_all():
         },
     }
     
+    # Raw brand strings that matched no alias and were only title-cased
+    # (covers the files loaded by this run)
+    report["brand_fallbacks"] = dict(sorted(BRAND_INDEX.fallbacks.items()))
+    
+    # Extract files with values that did not match CIGAR_SCHEMA
+    report["schema_problems"] = {
+        rel: entry["schema_problems"]
+        for rel, entry in state["files"].items()
+        if entry.get("schema_problems", {}).get("count")
+    }
+    
+    report["totals"]["identifier_merged"] = identifier_report["merged"]
+    report["identifiers"] = {k: v for k, v in identifier_report.items() if k != "conflict_details"}
+    
+    if fuzzy_stats is not None:
+        report["totals"]["fuzzy_merged"] = fuzzy_stats["merged"]
+        report["fuzzy_dedup"] = fuzzy_stats
+    
+    if incremental:
+        report["incremental"] = changes
+    
     reports_dir = base_dir / "reports"
     reports_dir.mkdir(exist_ok=True)
     
-    with open(reports_dir / "aggregation_report.json", 'w') as f:
-        json.dump(report, f, indent=2)
+    codec.dump(report, reports_dir / "aggregation_report.json")
+    codec.dump(identifier_report["conflict_details"], reports_dir / "identifier_conflicts.json")
+    
+    if fuzzy_stats is not None:
+        codec.dump({"threshold": fuzzy_threshold, "merges": merges}, reports_dir / "fuzzy_merges.json")
+    
+    # id_changes.json accumulates across runs: an id retired earlier follows
+    # its successor if that is retired now
+    id_log_path = reports_dir / "id_changes.json"
+    id_log = codec.load(id_log_path) if id_log_path.exists() else {}
+    for old, new in id_log.items():
+        if new in retired:
+            id_log[old] = retired[new]
+    id_log.update(retired)
+    if id_log:
+        codec.dump(id_log, id_log_path, sort_keys=True)
     
     # Print summary
     print("\n" + "="*60)
@@ -309,18 +740,48 @@ def process_all():
     print(f"Total brands: {report['totals']['brands']}")
     print(f"Total lines: {report['totals']['lines']}")
     print(f"Duplicates removed: {report['totals']['duplicates_removed']}")
+    print(f"  of which shared UPC/SKU: {identifier_report['merged']} "
+          f"({identifier_report['conflicts']} size conflicts, see reports/identifier_conflicts.json)")
+    if fuzzy_stats is not None:
+        print(f"  of which near-duplicates: {fuzzy_stats['merged']} "
+              f"({fuzzy_stats['comparisons']} comparisons in {fuzzy_stats['blocks']} blocks, "
+              f"see reports/fuzzy_merges.json)")
+    
+    if retired:
+        print(f"Ids changed since the previous catalog: {len(retired)} (see reports/id_changes.json)")
     
     print("\nTop 10 brands by cigar count:")
     for brand, count in list(report['by_brand'].items())[:10]:
         print(f"  {brand}: {count}")
     
+    if report["schema_problems"]:
+        total = sum(problems["count"] for problems in report["schema_problems"].values())
+        print(f"\nSchema problems: {total} in {len(report['schema_problems'])} files "
+              f"(see reports/aggregation_report.json)")
+    
+    if report["brand_fallbacks"]:
+        print(f"\nBrands without an alias (title-cased): {len(report['brand_fallbacks'])}")
+    
     print("\nData coverage:")
     for field, count in report['coverage'].items():
-        pct = count / report['totals']['cigars'] * 100
+        pct = count / report['totals']['cigars'] * 100 if report['totals']['cigars'] else 0
         print(f"  {field}: {count} ({pct:.1f}%)")
     
     return report
 
 
+def fuzzy_threshold_arg(argv: List[str]) -> Optional[float]:
+    """--fuzzy-threshold 0..1 (default DEFAULT_THRESHOLD), or None with --no-fuzzy."""
+    if "--no-fuzzy" in argv:
+        return None
+    if "--fuzzy-threshold" in argv:
+        threshold = float(argv[argv.index("--fuzzy-threshold") + 1])
+        if not 0 < threshold <= 1:
+            raise ValueError(f"--fuzzy-threshold must be in (0, 1], got {threshold}")
+        return threshold
+    return DEFAULT_THRESHOLD
+
+
 if __name__ == "__main__":
-    process_all()
+    process_all(incremental="--incremental" in sys.argv, fmt=output_format(sys.argv),
+                fuzzy_threshold=fuzzy_threshold_arg(sys.argv), compact="--compact" in sys.argv)
@@ -0,0 +1,114 @@
+"""
+Compact in-memory cigar record for the aggregation working set.
+
+A plain dict per record carries its own hash table and its own copy of
+every repeated string ("Arturo Fuente", "Nicaragua", "Maduro", the source
+label). CigarRecord keeps the CIGAR_SCHEMA fields in __slots__, interns
+the categorical strings so all records share one copy, and shares the
+key order tuple between records with the same layout. It supports the
+dict operations aggregation uses (get, [], []=, in, items), and becomes
+a dict again only when serialized (to_dict, via record_io.json_default).
+"""
+
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import CIGAR_SCHEMA
+
+# Schema fields plus what aggregation adds
+FIELDS = tuple(CIGAR_SCHEMA) + ("source", "id", "slug")
+FIELD_SET = frozenset(FIELDS)
+
+# Low-cardinality strings shared by many records
+INTERNED_FIELDS = frozenset({"brand", "line", "vitola", "wrapper", "country", "source", "size"})
+
+# Key order tuples, one object per distinct layout
+_KEY_ORDERS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def key_order(keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    return _KEY_ORDERS.setdefault(keys, keys)
+
+
+def intern_value(field: str, value: Any) -> Any:
+    if field in INTERNED_FIELDS and type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+class CigarRecord:
+    """Slotted cigar record with dict-style access.
+
+    Present keys and their order are tracked in _keys, so a record
+    round-trips to the same dict it was built from. Keys outside FIELDS
+    are kept in _extra.
+    """
+
+    __slots__ = FIELDS + ("_keys", "_extra")
+
+    def __init__(self, data: Optional[Dict] = None):
+        self._keys = key_order(tuple(data)) if data else ()
+        self._extra = None
+        if data:
+            for key, value in data.items():
+                if key in FIELD_SET:
+                    setattr(self, key, intern_value(key, value))
+                else:
+                    if self._extra is None:
+                        self._extra = {}
+                    self._extra[key] = value
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self._keys:
+            self._keys = key_order(self._keys + (key,))
+        if key in FIELD_SET:
+            setattr(self, key, intern_value(key, value))
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._keys:
+            raise KeyError(key)
+        if key in FIELD_SET:
+            return getattr(self, key)
+        return self._extra[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self._keys:
+            return default
+        return self[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._keys
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for key in self._keys:
+            yield key, self[key]
+
+    def copy(self) -> "CigarRecord":
+        clone = CigarRecord()
+        for key in FIELDS:
+            if key in self._keys:
+                setattr(clone, key, getattr(self, key))
+        clone._keys = self._keys
+        clone._extra = dict(self._extra) if self._extra else None
+        return clone
+
+    def to_dict(self) -> Dict:
+        return {key: self[key] for key in self._keys}
+
+    def __repr__(self) -> str:
+        return f"CigarRecord({self.to_dict()!r})"
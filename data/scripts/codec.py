@@ -0,0 +1,153 @@
+"""
+JSON codec shared by every script that reads or writes pipeline files.
+
+Uses orjson, else msgspec, when installed, and falls back to the stdlib
+json module; set JSON_CODEC=json|orjson|msgspec to pick one. All
+backends produce the same documents: 2-space indented by default, or
+compact (no whitespace) with compact=True.
+
+check_record() validates a decoded record against config.CIGAR_SCHEMA,
+coercing lossless mismatches ("20" or 20.0 for an int field) in place.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import CIGAR_SCHEMA
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+def _load_backend(name: str):
+    if name == "orjson":
+        import orjson
+        return orjson
+    if name == "msgspec":
+        import msgspec
+        return msgspec
+    return json
+
+
+def _select_backend() -> tuple:
+    requested = os.environ.get("JSON_CODEC")
+    if requested:
+        if requested not in BACKENDS:
+            raise ValueError(f"Unknown JSON_CODEC: {requested} (expected one of {', '.join(BACKENDS)})")
+        return requested, _load_backend(requested)
+    for name in BACKENDS:
+        try:
+            return name, _load_backend(name)
+        except ImportError:
+            continue
+
+
+BACKEND, _module = _select_backend()
+
+
+def dumps(obj: Any, compact: bool = False, sort_keys: bool = False,
+          default: Optional[Callable] = None) -> bytes:
+    """Encode obj as UTF-8 JSON bytes."""
+    if BACKEND == "orjson":
+        option = _module.OPT_NON_STR_KEYS
+        if not compact:
+            option |= _module.OPT_INDENT_2
+        if sort_keys:
+            option |= _module.OPT_SORT_KEYS
+        return _module.dumps(obj, default=default, option=option)
+
+    if BACKEND == "msgspec":
+        encoded = _module.json.Encoder(enc_hook=default, order="sorted" if sort_keys else None).encode(obj)
+        return encoded if compact else _module.json.format(encoded, indent=2)
+
+    if compact:
+        text = json.dumps(obj, sort_keys=sort_keys, default=default, separators=(',', ':'), ensure_ascii=False)
+    else:
+        text = json.dumps(obj, sort_keys=sort_keys, default=default, indent=2, ensure_ascii=False)
+    return text.encode()
+
+
+def loads(data, object_hook: Optional[Callable] = None) -> Any:
+    """Decode JSON bytes or text.
+
+    object_hook (applied to every object as it is parsed) needs the stdlib
+    decoder, so it is used whenever a hook is given.
+    """
+    if object_hook is not None:
+        return json.loads(data, object_hook=object_hook)
+    if BACKEND == "orjson":
+        return _module.loads(data)
+    if BACKEND == "msgspec":
+        return _module.json.decode(data)
+    return json.loads(data)
+
+
+def dump(obj: Any, path: Path, compact: bool = False, sort_keys: bool = False,
+         default: Optional[Callable] = None):
+    """Write obj to path as JSON."""
+    with open(path, 'wb') as f:
+        f.write(dumps(obj, compact=compact, sort_keys=sort_keys, default=default))
+
+
+def load(path: Path, object_hook: Optional[Callable] = None) -> Any:
+    """Read a JSON document from path."""
+    with open(path, 'rb') as f:
+        return loads(f.read(), object_hook=object_hook)
+
+
+def _to_int(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        return int(value)
+    raise ValueError
+
+
+def _to_float(value):
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        return float(value.replace(',', '').replace('$', ''))
+    raise ValueError
+
+
+def _to_str(value):
+    if isinstance(value, (int, float)):
+        return str(value)
+    raise ValueError
+
+
+COERCE = {int: _to_int, float: _to_float, str: _to_str}
+
+
+def check_record(record: Dict, schema: Dict[str, type] = CIGAR_SCHEMA) -> List[str]:
+    """Validate record against schema, fixing what can be fixed in place.
+
+    None is valid for every field, and an int is a valid float. A value
+    that cannot be coerced to its field type is replaced with None.
+    Returns one message per coerced or dropped value; "name" must be a
+    non-empty string.
+    """
+    problems = []
+
+    name = record.get("name")
+    if not isinstance(name, str) or not name.strip():
+        problems.append(f"name: missing or not a string ({name!r})")
+
+    for field, expected in schema.items():
+        value = record.get(field)
+        if value is None or type(value) is expected or (expected is float and type(value) is int):
+            continue
+        try:
+            if isinstance(value, bool):
+                raise ValueError
+            record[field] = COERCE[expected](value)
+            problems.append(f"{field}: coerced {value!r} to {expected.__name__}")
+        except (ValueError, KeyError):
+            record[field] = None
+            problems.append(f"{field}: dropped {value!r} (expected {expected.__name__})")
+
+    return problems
@@ -13,6 +13,7 @@ CIGAR_SCHEMA = {
     "length": float,        # Length in inches
     "ring_gauge": int,      # Ring gauge
     "box_count": int,       # Cigars per box
+    "wholesale_single": float, # Wholesale price per cigar
     "wholesale_price": float,  # Wholesale box price
     "msrp_single": float,   # MSRP per cigar
     "msrp_box": float,      # MSRP per box
@@ -23,29 +24,48 @@ CIGAR_SCHEMA = {
 }
 
 # File configurations
+#
+# Excel configs are run directly by ExcelExtractor.extract_with_config:
+#   match           - substring of the workbook filename this config applies to
+#   sheet / sheets  - one sheet (name or index), or a list of sheet names/globs
+#   header_markers  - text identifying the header row (any cell containing one)
+#   header_row      - 0-based header row, used when no marker is found
+#   mapping         - schema field -> column name, column index, or callable(df)
+#   extra_columns   - columns a callable mapping reads, so they are loaded too
+#   required        - fields that must have a value for a row to be kept
+#   require_pattern - field -> regex the value must contain
+#   exclude_pattern - field -> regex that drops the row when it matches
+#   country / origin_map - fixed country, or country per sheet name
+#   source          - source label; {sheet} is replaced by the sheet name
 EXCEL_CONFIGS = {
     "AUSA Price List 2025.xlsx": {
         "type": "excel",
+        "match": "AUSA",
         "header_row": 2,
         "sheet": 0,
         "mapping": {
             "brand": "BRAND",
             "name": "DESCRIPTION",
             "size": "SIZE",
-            "box_count": lambda df: df["PACKAGING UNIT"].str.extract(r'(\d+)')[0].astype(float),
+            "box_count": "PACKAGING UNIT",
             "wholesale_price": "NET PRICE UNIT",
             "msrp_single": "MSRP CIGAR / UNIT",
             "msrp_box": "MSRP BOX",
             "upc": "UPC EACH",
             "sku": "SKU",
         },
+        "required": ["brand", "name"],
+        "exclude_pattern": {"brand": r"(?i)ACCESSORIES"},
         "brand_name": "Altadis USA",
         "brands": ["Romeo y Julieta", "Montecristo", "H. Upmann", "Punch", "Hoyo de Monterrey"],
+        "source": "AUSA Price List 2025",
     },
     
     "Arturo Fuente Price List w Special Cigars and UPCs - 2025.xlsx": {
         "type": "excel",
+        "match": "Arturo Fuente",
         "header_row": 10,
+        "header_markers": ["Item #", "AFCC"],
         "sheet": 0,
         "mapping": {
             "sku": 0,  # Column index
@@ -56,14 +76,21 @@ EXCEL_CONFIGS = {
             "wholesale_price": 5,
             "msrp_single": 6,
             "msrp_box": 7,
+            "upc": 9,
         },
+        "required": ["sku", "name"],
+        "require_pattern": {"sku": r"\d"},
         "brand_name": "Arturo Fuente",
+        "country": "Dominican Republic",
+        "source": "Arturo Fuente Price List 2025",
     },
     
     "Drew Estate Retailer Price List.xlsx": {
         "type": "excel",
+        "match": "Drew Estate Retailer",
         "sheet": "Raw Data",
         "header_row": 2,
+        "header_markers": ["U_DE_Brand", "ItemName"],
         "mapping": {
             "brand": "U_DE_Brand",
             "line": "U_DE_Sub_Brand",
@@ -77,13 +104,19 @@ EXCEL_CONFIGS = {
             "upc": "CodeBars",
             "sku": "ItemCode",
         },
+        "required": ["brand", "name"],
+        "exclude_pattern": {"brand": r"^(?:\d+|.)$"},  # index/ID rows
         "brand_name": "Drew Estate",
+        "country": "Nicaragua",
+        "source": "Drew Estate Price List",
     },
     
     "Drew Diplomat Exclusive Products Price List.xlsx": {
         "type": "excel",
+        "match": "Drew Diplomat",
         "sheet": "Raw Data",
         "header_row": 2,
+        "header_markers": ["U_DE_Brand", "ItemName"],
         "mapping": {
             "brand": "U_DE_Brand",
             "line": "U_DE_Sub_Brand",
@@ -97,13 +130,19 @@ EXCEL_CONFIGS = {
             "upc": "CodeBars",
             "sku": "ItemCode",
         },
+        "required": ["brand", "name"],
+        "exclude_pattern": {"brand": r"^(?:\d+|.)$"},
         "brand_name": "Drew Estate (Diplomat)",
+        "country": "Nicaragua",
+        "source": "Drew Estate Diplomat Price List",
     },
     
     "J.C. Newman Price List and UPC - 2025.xlsx": {
         "type": "excel",
-        "sheets": ["JCN DOM", "JCN NIC", "JCN HH", "JCN TPA", "JCN Other"],
+        "match": "J.C. Newman",
+        "sheets": ["JCN*"],
         "header_row": 11,
+        "header_markers": ["Item #", "Item Description"],
         "mapping": {
             "sku": "Item #",
             "box_count": "# of Cigars",
@@ -115,13 +154,15 @@ EXCEL_CONFIGS = {
             "msrp_box": "SRP Per Box/Bundle",
             "upc": "Cigar UPC",
         },
+        "required": ["sku", "name"],
         "brand_name": "J.C. Newman",
         "origin_map": {
             "JCN DOM": "Dominican Republic",
             "JCN NIC": "Nicaragua",
             "JCN HH": "Honduras",
-            "JCN TPA": "USA (Tampa)",
+            "JCN TPA": "USA",
         },
+        "source": "J.C. Newman Price List 2025 ({sheet})",
     },
 }
 
@@ -187,6 +228,16 @@ PDF_CONFIGS = {
     },
 }
 
+# PDF layout profiles, keyed by layout_profiles.layout_key(filename)
+# (lowercased filename without years or punctuation). Each profile is
+#   crop           - [x0, top, x1, bottom] box around the price tables
+#   table_settings - pdfplumber table settings, normally explicit
+#                    vertical lines (column x-positions) plus a
+#                    horizontal strategy
+# Learned profiles land in <output_dir>/.layout_profiles.json; copy one
+# here once reviewed. Entries here take precedence.
+PDF_LAYOUT_PROFILES = {}
+
 # Vitola standardization
 VITOLA_MAP = {
     # Standard sizes
@@ -237,6 +288,45 @@ WRAPPER_MAP = {
     "candela": "Candela",
 }
 
+# Brand standardization: alias (any case) -> canonical brand name.
+# Aliases match whole words, so "CR" does not hit "CREAM".
+BRAND_ALIASES = {
+    "1875 BY ROMEO Y JULIETA": "Romeo y Julieta",
+    "ROMEO Y JULIETA": "Romeo y Julieta",
+    "H. UPMANN": "H. Upmann",
+    "MONTECRISTO": "Montecristo",
+    "PUNCH": "Punch",
+    "HOYO DE MONTERREY": "Hoyo de Monterrey",
+    "ARTURO FUENTE": "Arturo Fuente",
+    "AF": "Arturo Fuente",
+    "LA FLOR DOMINICANA": "La Flor Dominicana",
+    "LFD": "La Flor Dominicana",
+    "MY FATHER": "My Father",
+    "DREW ESTATE": "Drew Estate",
+    "J.C. NEWMAN": "J.C. Newman",
+    "JCN": "J.C. Newman",
+    "CUESTA-REY": "Cuesta-Rey",
+    "CR": "Cuesta-Rey",
+    "OLIVA": "Oliva",
+    "PADRON": "Padron",
+    "PADRÓN": "Padron",
+    "ROCKY PATEL": "Rocky Patel",
+    "AJ FERNANDEZ": "AJ Fernandez",
+    "A.J. FERNANDEZ": "AJ Fernandez",
+    "FOUNDATION": "Foundation",
+    "ASHTON": "Ashton",
+    "DAVIDOFF": "Davidoff",
+    "PERDOMO": "Perdomo",
+    "ESPINOSA": "Espinosa",
+    "PLASENCIA": "Plasencia",
+    "LA AURORA": "La Aurora",
+    "ACID": "Acid",
+    "LIGA PRIVADA": "Liga Privada",
+    "UNDERCROWN": "Undercrown",
+    "HERRERA ESTELI": "Herrera Esteli",
+    "DEADWOOD": "Deadwood",
+}
+
 # Country codes
 COUNTRY_MAP = {
     "nicaragua": "Nicaragua",
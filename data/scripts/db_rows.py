@@ -0,0 +1,46 @@
+"""
+Row mapping from the master catalog files to database rows.
+Shared by the Supabase REST importer and the PostgreSQL COPY loader.
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).parent))
+from slugs import generate_slug
+
+
+def cigar_slugs(cigar: Dict) -> tuple:
+    """(brand slug, line slug) of a master-cigars entry, as built by build_taxonomy."""
+    brand_slug = generate_slug(cigar.get("brand", ""))
+    line_slug = f"{brand_slug}-{generate_slug(cigar['line'])}" if cigar.get("line") else None
+    return brand_slug, line_slug
+
+
+def cigar_record(cigar: Dict, brand_map: Dict[str, str], line_map: Dict[str, str]) -> Dict:
+    """Map a master-cigars entry to a cigars row, resolving brand/line slugs through the maps."""
+    brand_slug, line_slug = cigar_slugs(cigar)
+
+    record = {
+        "name": cigar.get("name"),
+        "slug": cigar.get("slug"),
+        "brand_id": brand_map.get(brand_slug),
+        "line_id": line_map.get(line_slug) if line_slug else None,
+        "vitola": cigar.get("vitola"),
+        "size": cigar.get("size"),
+        "length": cigar.get("length"),
+        "ring_gauge": cigar.get("ring_gauge"),
+        "box_count": cigar.get("box_count"),
+        "wholesale_price": cigar.get("wholesale_price"),
+        "msrp_single": cigar.get("msrp_single"),
+        "msrp_box": cigar.get("msrp_box"),
+        "wrapper": cigar.get("wrapper"),
+        "country": cigar.get("country"),
+        "upc": cigar.get("upc"),
+        "sku": cigar.get("sku"),
+        "source": cigar.get("source"),
+    }
+
+    # Remove None values
+    return {k: v for k, v in record.items() if v is not None}
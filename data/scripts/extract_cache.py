@@ -0,0 +1,120 @@
+"""
+Content-hash cache for the PDF and Excel extractors.
+Lets process_all skip source files that have not changed since the last run.
+"""
+
+import hashlib
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+import codec
+
+CACHE_FILENAME = ".extract_cache.json"
+SCRIPTS_DIR = Path(__file__).parent
+
+# The extractors and every module they import, directly or not
+EXTRACTOR_MODULES = ("extract_pdf", "extract_excel", "config", "size_parser", "name_parser", "name_matcher",
+                     "table_profile", "layout_profiles", "record_io", "codec", "layout_cache", "peak_rss",
+                     "isolation", "extract_cache")
+
+
+def file_hash(filepath: Path) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_version(modules: Iterable[str]) -> str:
+    """Hash over the source of the named modules in this directory."""
+    digest = hashlib.sha256()
+    for module in sorted(modules):
+        script = SCRIPTS_DIR / f"{module}.py"
+        digest.update(script.name.encode())
+        digest.update(script.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def code_version() -> str:
+    """Version of the extraction code: a hash over EXTRACTOR_MODULES.
+
+    Any change to an extractor, config.py or a shared helper invalidates
+    the whole cache, so stale JSON is never reused after a parser fix.
+    Scripts the extractors do not import (aggregate.py, the importers)
+    leave it alone.
+    """
+    return source_version(EXTRACTOR_MODULES)
+
+
+class ExtractionCache:
+    """Manifest of extracted files keyed by source filename.
+
+    An entry is a hit when the source content hash and the extractor
+    version both match and its output JSON still exists on disk.
+    """
+
+    def __init__(self, output_dir: Path, version: str, force: bool = False):
+        self.path = Path(output_dir) / CACHE_FILENAME
+        self.version = version
+        self.force = force
+        self.hits = []
+        self.misses = []
+        self._hashes = {}
+
+        self.entries = {}
+        if self.path.exists():
+            try:
+                self.entries = codec.load(self.path)
+            except (ValueError, OSError):
+                self.entries = {}
+
+    def hash_for(self, filepath: Path) -> str:
+        if filepath.name not in self._hashes:
+            self._hashes[filepath.name] = file_hash(filepath)
+        return self._hashes[filepath.name]
+
+    def lookup(self, filepath: Path, output_file: Optional[Path] = None) -> Optional[Dict]:
+        """Return the cached entry for an unchanged file, recording a hit or miss.
+
+        With output_file, the entry must also point at that path, so a run
+        writing a different output format re-extracts instead of reusing it.
+        """
+        entry = self.entries.get(filepath.name)
+        if (
+            not self.force
+            and entry
+            and entry.get("version") == self.version
+            and (output_file is None or entry.get("output_file") == str(output_file))
+            and entry.get("hash") == self.hash_for(filepath)
+            and Path(entry.get("output_file", "")).exists()
+        ):
+            self.hits.append(filepath.name)
+            return entry
+
+        self.misses.append(filepath.name)
+        return None
+
+    def store(self, filepath: Path, result: Dict):
+        """Record a successful extraction of filepath."""
+        self.entries[filepath.name] = {
+            "hash": self.hash_for(filepath),
+            "version": self.version,
+            **result,
+        }
+
+    def save(self):
+        codec.dump(self.entries, self.path, sort_keys=True)
+
+    def report(self) -> Dict:
+        return {
+            "version": self.version,
+            "force": self.force,
+            "hits": len(self.hits),
+            "misses": len(self.misses),
+            "hit_files": sorted(self.hits),
+            "miss_files": sorted(self.misses),
+        }
@@ -6,451 +6,233 @@ Parses manufacturer Excel files and outputs normalized JSON.
 
 import pandas as pd
 import numpy as np
-import json
-import re
 import os
 import sys
 from pathlib import Path
+from fnmatch import fnmatch
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
 # Add parent dir for config
 sys.path.insert(0, str(Path(__file__).parent))
-from config import VITOLA_MAP, WRAPPER_MAP
+from config import CIGAR_SCHEMA, EXCEL_CONFIGS
+from extract_cache import ExtractionCache, code_version
+from size_parser import parse_size_series
+from name_parser import ParsedName, parse_name
+import codec
+from record_io import output_format, records_path, write_records
+
+# Rows searched for a config's header_markers
+HEADER_SCAN_ROWS = 20
 
 class ExcelExtractor:
-    def __init__(self, source_dir: str, output_dir: str):
+    def __init__(self, source_dir: str, output_dir: str, cache: Optional[ExtractionCache] = None,
+                 output_format: str = "json"):
         self.source_dir = Path(source_dir)
         self.output_dir = Path(output_dir)
+        self.cache = cache
+        self.output_format = output_format
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.stats = {"files_processed": 0, "cigars_extracted": 0, "errors": []}
     
-    def parse_size(self, size_str: str) -> tuple:
-        """Parse size string like '5 x 50' or '6 1/2 x 52' into (length, ring_gauge).
-        
-        Standard cigar sizes:
-        - Length: typically 4-9 inches
-        - Ring gauge: typically 30-70 (64ths of an inch)
-        """
-        if not size_str or pd.isna(size_str):
-            return None, None
-        
-        size_str = str(size_str).strip().upper()
-        
-        # Handle various formats
-        patterns = [
-            r'(\d+(?:\s*\d+/\d+)?)\s*[Xx×]\s*(\d+)',  # 5 x 50, 6 1/2 x 52
-            r'(\d+(?:\.\d+)?)["\']?\s*[Xx×]\s*(\d+)',  # 5" x 50
-            r'(\d+)\s*/\s*(\d+)',  # 52/6 (ring/length format)
-        ]
-        
-        def parse_num(s):
-            """Parse a number that might contain fractions."""
-            s = str(s).strip()
-            if '/' in s:
-                parts = s.split()
-                if len(parts) == 2:  # "6 1/2"
-                    whole = float(parts[0])
-                    frac_parts = parts[1].split('/')
-                    return whole + float(frac_parts[0]) / float(frac_parts[1])
-                else:  # Just "1/2" or similar
-                    frac_parts = s.split('/')
-                    return float(frac_parts[0]) / float(frac_parts[1])
-            return float(s)
-        
-        for pattern in patterns:
-            match = re.search(pattern, size_str)
-            if match:
-                g1, g2 = match.groups()
-                n1 = parse_num(g1)
-                n2 = parse_num(g2)
-                
-                # Determine which is length vs ring gauge
-                # Length is typically 4-9 inches, ring gauge is typically 30-70
-                # The smaller number is usually the length
-                if n1 < 15 and n2 >= 30:
-                    return n1, int(n2)  # n1 is length
-                elif n2 < 15 and n1 >= 30:
-                    return n2, int(n1)  # n2 is length
-                elif n1 < n2:
-                    return n1, int(n2)  # Assume smaller is length
-                else:
-                    return n2, int(n1)
-        
-        return None, None
+    def column(self, df: pd.DataFrame, name) -> pd.Series:
+        """Column by name, or an all-null column if the sheet lacks it."""
+        if name in df.columns:
+            return df[name]
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    
+    def has_value(self, col: pd.Series) -> pd.Series:
+        """Mask of non-null, non-blank cells."""
+        return col.notna() & (col.astype(str).str.strip() != '')
+    
+    def text_column(self, col: pd.Series) -> pd.Series:
+        """Stripped cell text, null for empty cells."""
+        return col.astype(str).str.strip().where(self.has_value(col))
     
-    def extract_vitola(self, name: str, vitola_field: str = None) -> str:
-        """Extract standardized vitola name from product name or vitola field."""
-        if vitola_field and not pd.isna(vitola_field):
-            vitola = str(vitola_field).strip().lower()
+    def price_column(self, col: pd.Series) -> pd.Series:
+        """Vectorized clean_price."""
+        if pd.api.types.is_numeric_dtype(col):
+            return col.astype(float)
+        return pd.to_numeric(col.astype(str).str.replace(r'[$,\s]', '', regex=True), errors='coerce')
+    
+    def count_column(self, col: pd.Series, first_number: bool = False) -> pd.Series:
+        """Integer counts, null where unparseable. first_number takes the
+        first run of digits in the cell text ('20 Cigars Box' -> 20)."""
+        if first_number:
+            col = col.astype(str).str.extract(r'(\d+)', expand=False)
+        return np.trunc(pd.to_numeric(col, errors='coerce')).astype('Int64')
+    
+    def classify(self, frame: pd.DataFrame, line: bool = True) -> pd.DataFrame:
+        """Add line/vitola/wrapper columns, and missing box counts, from one
+        parse_name pass over each name."""
+        parsed = pd.DataFrame(
+            [parse_name(n, b) for n, b in zip(frame["name"], frame["brand"])],
+            index=frame.index, columns=ParsedName._fields,
+        )
+        if line:
+            frame["line"] = parsed["line"]
+        if "vitola" in frame.columns:
+            frame["vitola"] = frame["vitola"].where(frame["vitola"].notna(), parsed["vitola"])
         else:
-            vitola = str(name).lower() if name else ""
-        
-        for key, value in VITOLA_MAP.items():
-            if key in vitola:
-                return value
-        
-        # Try to extract from name
-        for key, value in VITOLA_MAP.items():
-            if key in str(name).lower():
-                return value
-        
-        return vitola_field if vitola_field and not pd.isna(vitola_field) else None
+            frame["vitola"] = parsed["vitola"]
+        frame["wrapper"] = parsed["wrapper"]
+        if "box_count" in frame.columns:
+            frame["box_count"] = frame["box_count"].fillna(parsed["box_count"].astype('Int64'))
+        return frame
     
-    def extract_wrapper(self, name: str) -> str:
-        """Extract wrapper type from product name."""
-        if not name:
-            return None
-        
-        name_lower = str(name).lower()
-        
-        for key, value in WRAPPER_MAP.items():
-            if key in name_lower:
-                return value
-        
-        return None
+    def emit_records(self, frame: pd.DataFrame) -> List[Dict]:
+        """Convert an extraction frame to JSON-ready records (nulls -> None)."""
+        frame = frame.astype(object)
+        return frame.where(frame.notna(), None).to_dict('records')
     
-    def extract_line(self, name: str, brand: str) -> str:
-        """Try to extract product line from name."""
-        if not name:
-            return None
-        
-        name_clean = str(name).strip()
-        
-        # Remove brand prefix if present
-        if brand:
-            name_clean = re.sub(rf'^{re.escape(brand)}\s*[-–]?\s*', '', name_clean, flags=re.IGNORECASE)
-        
-        # Common patterns
-        # "Brand - Line Vitola" or "Brand Line Vitola"
-        parts = re.split(r'\s+(?:robusto|toro|churchill|corona|gordo|torpedo|belicoso|lancero)\s*', 
-                        name_clean, flags=re.IGNORECASE)
-        if parts and len(parts[0].strip()) > 2:
-            return parts[0].strip()
-        
+    def typed_column(self, field: str, col: pd.Series) -> pd.Series:
+        """Coerce a mapped column to its CIGAR_SCHEMA type."""
+        kind = CIGAR_SCHEMA.get(field, str)
+        if kind is float:
+            return self.price_column(col)
+        if kind is int:
+            counts = self.count_column(col, first_number=True)
+            return counts.where(counts.fillna(0) != 0)
+        return self.text_column(col)
+    
+    def find_config(self, filename: str) -> Optional[Dict]:
+        """EXCEL_CONFIGS entry for a workbook, by exact name or match substring."""
+        if filename in EXCEL_CONFIGS:
+            return EXCEL_CONFIGS[filename]
+        for config in EXCEL_CONFIGS.values():
+            if config.get("match") and config["match"] in filename:
+                return config
         return None
     
-    def clean_price(self, price) -> Optional[float]:
-        """Clean and convert price to float."""
-        if price is None or pd.isna(price):
-            return None
-        
-        if isinstance(price, (int, float)):
-            return float(price)
-        
-        # Remove currency symbols and commas
-        price_str = re.sub(r'[$,]', '', str(price))
-        try:
-            return float(price_str)
-        except ValueError:
-            return None
+    def usecols_for(self, config: Dict):
+        """Columns to load for a config: all mapped indexes, or all mapped names."""
+        sources = [v for v in config["mapping"].values() if not callable(v)]
+        sources += config.get("extra_columns", [])
+        if all(isinstance(v, int) for v in sources):
+            return sorted(set(sources))
+        wanted = {str(v).strip() for v in sources}
+        return lambda c: str(c).strip() in wanted
     
-    def extract_ausa(self, filepath: Path) -> List[Dict]:
-        """Extract Altadis USA price list."""
-        cigars = []
-        
-        df = pd.read_excel(filepath, header=2)
-        
-        for _, row in df.iterrows():
-            brand = row.get('BRAND')
-            if not brand or pd.isna(brand) or 'ACCESSORIES' in str(brand).upper():
-                continue
-            
-            size = str(row.get('SIZE', ''))
-            length, ring_gauge = self.parse_size(size)
-            
-            # Extract box count from packaging
-            packaging = str(row.get('PACKAGING UNIT', ''))
-            box_match = re.search(r'(\d+)', packaging)
-            box_count = int(box_match.group(1)) if box_match else None
-            
-            cigar = {
-                "brand": str(brand).strip(),
-                "name": str(row.get('DESCRIPTION', '')).strip(),
-                "size": size,
-                "length": length,
-                "ring_gauge": ring_gauge,
-                "box_count": box_count,
-                "wholesale_price": self.clean_price(row.get('NET PRICE UNIT')),
-                "msrp_single": self.clean_price(row.get('MSRP CIGAR / UNIT')),
-                "msrp_box": self.clean_price(row.get('MSRP BOX')),
-                "upc": str(row.get('UPC EACH', '')).strip() if row.get('UPC EACH') else None,
-                "sku": str(row.get('SKU', '')).strip() if row.get('SKU') else None,
-                "source": "AUSA Price List 2025",
-            }
-            
-            cigar["line"] = self.extract_line(cigar["name"], cigar["brand"])
-            cigar["vitola"] = self.extract_vitola(cigar["name"])
-            cigar["wrapper"] = self.extract_wrapper(cigar["name"])
-            
-            cigars.append(cigar)
+    def find_header_row(self, raw: pd.DataFrame, config: Dict) -> int:
+        """Locate the header row among the first HEADER_SCAN_ROWS rows of a sheet.
         
-        return cigars
+        The first row with a cell containing one of the config's header_markers
+        wins; without markers or a match, the configured header_row is used.
+        """
+        markers = [m.lower() for m in config.get("header_markers", [])]
+        if markers:
+            for i in range(min(HEADER_SCAN_ROWS, len(raw))):
+                cells = [str(v).lower() for v in raw.iloc[i].dropna().values]
+                if any(m in cell for m in markers for cell in cells):
+                    return i
+        return config.get("header_row", 0)
     
-    def extract_fuente(self, filepath: Path) -> List[Dict]:
-        """Extract Arturo Fuente price list."""
-        cigars = []
-        
-        df = pd.read_excel(filepath, header=None)
+    def slice_header(self, raw: pd.DataFrame, config: Dict, header_row: Optional[int] = None) -> pd.DataFrame:
+        """Split a header=None sheet into its data rows, named by the header row."""
+        if header_row is None:
+            header_row = self.find_header_row(raw, config)
+        header = raw.iloc[header_row] if header_row < len(raw) else pd.Series(np.nan, index=raw.columns)
         
-        # Find header row (contains "Item #" or "AFCC")
-        header_row = None
-        for i in range(20):
-            row_str = ' '.join([str(v) for v in df.iloc[i].dropna().values])
-            if 'Item #' in row_str or 'AFCC' in row_str:
-                header_row = i
-                break
+        df = raw.iloc[header_row + 1:].reset_index(drop=True)
+        if not all(isinstance(c, int) for c in config["mapping"].values() if not callable(c)):
+            df.columns = [f"Unnamed: {i}" if pd.isna(h) else str(h) for i, h in enumerate(header)]
+        return df.infer_objects()
+    
+    def read_sheets(self, filepath: Path, config: Dict) -> Dict[str, pd.DataFrame]:
+        """Read every configured sheet in one workbook open.
         
-        if header_row is None:
-            header_row = 10  # Default
+        Each sheet is parsed once with header=None; the header row is found
+        in the parsed rows and the data sliced below it, instead of parsing
+        the sheet a second time with header=header_row.
         
-        # Read with header
-        df = pd.read_excel(filepath, header=header_row)
+        Column names are only known once the header row is found, so for a
+        config mapped by name the first rows are read first (nrows) to find
+        it and resolve the names to positions; the full parse then loads
+        only those columns.
+        """
+        usecols = self.usecols_for(config)
+        scan_rows = max(HEADER_SCAN_ROWS, config.get("header_row", 0) + 1)
+        sheets = {}
         
-        for idx, row in df.iterrows():
-            # Skip if row index is less than 2 rows after header (skip subheaders)
-            values = row.values
-            if len(values) < 8:
-                continue
-            
-            # First column is SKU (should be numeric or alphanumeric)
-            sku = values[0]
-            if pd.isna(sku):
-                continue
-            
-            sku_str = str(sku).strip()
-            # Skip if not a valid SKU (should contain digits)
-            if not any(c.isdigit() for c in sku_str):
-                continue
+        with pd.ExcelFile(filepath) as xl:
+            if "sheets" in config:
+                names = [s for s in xl.sheet_names if any(fnmatch(s, pat) for pat in config["sheets"])]
+            else:
+                sheet = config.get("sheet", 0)
+                names = [xl.sheet_names[sheet] if isinstance(sheet, int) else sheet]
             
-            try:
-                name = str(values[2]).strip() if len(values) > 2 and not pd.isna(values[2]) else ""
-                size = str(values[3]).strip() if len(values) > 3 and not pd.isna(values[3]) else ""
-                
-                # Skip empty names
-                if not name or name == 'nan':
-                    continue
-                
-                length, ring_gauge = self.parse_size(size)
-                
-                box_count = None
-                if len(values) > 1 and not pd.isna(values[1]):
-                    box_str = str(values[1])
-                    box_match = re.search(r'(\d+)', box_str)
-                    box_count = int(box_match.group(1)) if box_match else None
-                
-                # Get UPC if available
-                upc_single = str(values[9]).strip() if len(values) > 9 and not pd.isna(values[9]) else None
-                upc_box = str(values[10]).strip() if len(values) > 10 and not pd.isna(values[10]) else None
-                
-                cigar = {
-                    "brand": "Arturo Fuente",
-                    "name": name,
-                    "size": size,
-                    "length": length,
-                    "ring_gauge": ring_gauge,
-                    "box_count": box_count,
-                    "wholesale_price": self.clean_price(values[5]) if len(values) > 5 else None,
-                    "msrp_single": self.clean_price(values[6]) if len(values) > 6 else None,
-                    "msrp_box": self.clean_price(values[7]) if len(values) > 7 else None,
-                    "upc": upc_single,
-                    "sku": sku_str,
-                    "country": "Dominican Republic",
-                    "source": "Arturo Fuente Price List 2025",
-                }
-                
-                cigar["line"] = self.extract_line(name, "Arturo Fuente")
-                cigar["vitola"] = self.extract_vitola(name)
-                cigar["wrapper"] = self.extract_wrapper(name)
-                
-                cigars.append(cigar)
-            except Exception as e:
-                continue
+            for name in names:
+                try:
+                    header_row = None
+                    columns = usecols
+                    if callable(usecols):
+                        head = xl.parse(name, header=None, nrows=scan_rows)
+                        header_row = self.find_header_row(head, config)
+                        columns = None
+                        if header_row < len(head):
+                            columns = [i for i, h in enumerate(head.iloc[header_row]) if usecols(h)] or None
+                    raw = xl.parse(name, header=None, usecols=columns)
+                    sheets[name] = self.slice_header(raw, config, header_row)
+                except Exception as e:
+                    self.stats["errors"].append(f"{filepath.name} ({name}): {str(e)}")
+        
+        return sheets
+    
+    def map_columns(self, df: pd.DataFrame, config: Dict) -> pd.DataFrame:
+        """Apply a config mapping to a sheet: one typed column per schema field."""
+        positions = self.usecols_for(config)
+        df = df.rename(columns=lambda c: str(c).strip())
+        fields = {}
+        
+        for field, source in config["mapping"].items():
+            if callable(source):
+                col = source(df)
+            elif isinstance(source, int):
+                col = df.iloc[:, positions.index(source)]
+            else:
+                col = self.column(df, source)
+            fields[field] = self.typed_column(field, col)
         
-        return cigars
+        return pd.DataFrame(fields, index=df.index)
     
-    def extract_drew_estate(self, filepath: Path, diplomat: bool = False) -> List[Dict]:
-        """Extract Drew Estate price list."""
+    def extract_with_config(self, filepath: Path, config: Dict) -> List[Dict]:
+        """Extract a workbook described by an EXCEL_CONFIGS entry."""
         cigars = []
         
-        try:
-            # Read raw to find header row
-            df_raw = pd.read_excel(filepath, sheet_name="Raw Data", header=None)
-            
-            # Find header row (contains U_DE_Brand, ItemName, etc.)
-            header_row = None
-            for i in range(10):
-                row_str = ' '.join([str(v) for v in df_raw.iloc[i].dropna().values])
-                if 'U_DE_Brand' in row_str or 'ItemName' in row_str:
-                    header_row = i
-                    break
-            
-            if header_row is None:
-                header_row = 2
-            
-            df = pd.read_excel(filepath, sheet_name="Raw Data", header=header_row)
-        except Exception as e:
-            self.stats["errors"].append(f"{filepath.name}: {str(e)}")
-            return cigars
-        
-        # Map column names (handle variations)
-        col_map = {}
-        for col in df.columns:
-            col_lower = str(col).lower()
-            if 'brand' in col_lower and 'sub' not in col_lower:
-                col_map['brand'] = col
-            elif 'sub_brand' in col_lower or 'subbrand' in col_lower:
-                col_map['line'] = col
-            elif 'itemname' in col_lower.replace('_', ''):
-                col_map['name'] = col
-            elif 'description' in col_lower:
-                col_map['vitola'] = col
-            elif 'size' in col_lower:
-                col_map['size'] = col
-            elif 'sticks' in col_lower or 'perbox' in col_lower.replace('_', ''):
-                col_map['box_count'] = col
-            elif col_lower == 'price':
-                col_map['price'] = col
-            elif 'msrp_box' in col_lower or 'msrpbox' in col_lower.replace('_', ''):
-                col_map['msrp_box'] = col
-            elif 'msrp_stick' in col_lower or 'msrpstick' in col_lower.replace('_', ''):
-                col_map['msrp_single'] = col
-            elif 'codebar' in col_lower or 'upc' in col_lower:
-                col_map['upc'] = col
-            elif 'itemcode' in col_lower.replace('_', ''):
-                col_map['sku'] = col
-        
-        for _, row in df.iterrows():
-            brand = row.get(col_map.get('brand', 'U_DE_Brand'))
-            if not brand or pd.isna(brand):
-                continue
-            
-            # Skip if brand looks like an index/ID rather than a name
-            brand_str = str(brand).strip()
-            if brand_str.isdigit() or len(brand_str) < 2:
+        for sheet, df in self.read_sheets(filepath, config).items():
+            try:
+                frame = self.map_columns(df, config)
+            except Exception as e:
+                self.stats["errors"].append(f"{filepath.name} ({sheet}): {str(e)}")
                 continue
             
-            name = row.get(col_map.get('name', 'ItemName'), '')
-            if not name or pd.isna(name):
+            keep = pd.Series(True, index=frame.index)
+            for field in config.get("required", ["name"]):
+                keep &= frame[field].notna()
+            for field, pattern in config.get("require_pattern", {}).items():
+                keep &= frame[field].str.contains(pattern, na=False, regex=True).astype(bool)
+            for field, pattern in config.get("exclude_pattern", {}).items():
+                keep &= ~frame[field].str.contains(pattern, na=False, regex=True).astype(bool)
+            frame = frame[keep]
+            if frame.empty:
                 continue
             
-            size = str(row.get(col_map.get('size', 'U_DE_Size'), ''))
-            length, ring_gauge = self.parse_size(size)
-            
-            box_count = None
-            box_val = row.get(col_map.get('box_count', 'U_DE_Sticks_Per_Box'))
-            if box_val and not pd.isna(box_val):
-                try:
-                    box_count = int(float(box_val))
-                except (ValueError, TypeError):
-                    pass
-            
-            cigar = {
-                "brand": brand_str,
-                "line": str(row.get(col_map.get('line', 'U_DE_Sub_Brand'), '')).strip() if row.get(col_map.get('line', 'U_DE_Sub_Brand')) and not pd.isna(row.get(col_map.get('line', 'U_DE_Sub_Brand'))) else None,
-                "name": str(name).strip(),
-                "vitola": str(row.get(col_map.get('vitola', 'U_DE_PL_Description'), '')).strip() if row.get(col_map.get('vitola', 'U_DE_PL_Description')) and not pd.isna(row.get(col_map.get('vitola', 'U_DE_PL_Description'))) else None,
-                "size": size,
-                "length": length,
-                "ring_gauge": ring_gauge,
-                "box_count": box_count,
-                "wholesale_price": self.clean_price(row.get(col_map.get('price', 'Price'))),
-                "msrp_single": self.clean_price(row.get(col_map.get('msrp_single', 'MSRP_Stick'))),
-                "msrp_box": self.clean_price(row.get(col_map.get('msrp_box', 'MSRP_Box'))),
-                "upc": str(row.get(col_map.get('upc', 'CodeBars'), '')).strip() if row.get(col_map.get('upc', 'CodeBars')) and not pd.isna(row.get(col_map.get('upc', 'CodeBars'))) else None,
-                "sku": str(row.get(col_map.get('sku', 'ItemCode'), '')).strip() if row.get(col_map.get('sku', 'ItemCode')) and not pd.isna(row.get(col_map.get('sku', 'ItemCode'))) else None,
-                "country": "Nicaragua",
-                "source": f"Drew Estate {'Diplomat ' if diplomat else ''}Price List",
-            }
+            if "brand" not in frame.columns:
+                frame["brand"] = config["brand_name"]
             
-            if not cigar["vitola"]:
-                cigar["vitola"] = self.extract_vitola(cigar["name"])
-            cigar["wrapper"] = self.extract_wrapper(cigar["name"])
-            
-            cigars.append(cigar)
-        
-        return cigars
-    
-    def extract_jc_newman(self, filepath: Path) -> List[Dict]:
-        """Extract J.C. Newman price list (multiple sheets)."""
-        cigars = []
-        
-        origin_map = {
-            "JCN DOM": "Dominican Republic",
-            "JCN NIC": "Nicaragua",
-            "JCN HH": "Honduras",
-            "JCN TPA": "USA",
-            "JCN Other": None,
-        }
-        
-        xl = pd.ExcelFile(filepath)
-        
-        for sheet in xl.sheet_names:
-            if sheet not in origin_map and not sheet.startswith("JCN"):
-                continue
+            size = frame["size"].fillna('') if "size" in frame.columns else pd.Series('', index=frame.index)
+            dims = parse_size_series(size)
+            frame["size"] = size
+            frame["length"] = dims["length"]
+            frame["ring_gauge"] = dims["ring_gauge"]
+            frame["country"] = config.get("origin_map", {}).get(sheet, config.get("country"))
+            frame["source"] = config["source"].format(sheet=sheet)
             
-            country = origin_map.get(sheet)
+            frame = self.classify(frame, line="line" not in config["mapping"])
             
-            try:
-                df = pd.read_excel(xl, sheet_name=sheet, header=None)
-                
-                # Find header row
-                header_row = None
-                for i in range(20):
-                    row = df.iloc[i].dropna()
-                    values = [str(v).lower() for v in row.values]
-                    if any('item #' in v or 'item description' in v for v in values):
-                        header_row = i
-                        break
-                
-                if header_row is None:
-                    continue
-                
-                df = pd.read_excel(xl, sheet_name=sheet, header=header_row)
-                
-                for _, row in df.iterrows():
-                    sku = row.get('Item #')
-                    if not sku or pd.isna(sku):
-                        continue
-                    
-                    name = row.get('Item Description', '')
-                    if not name or pd.isna(name):
-                        continue
-                    
-                    size = str(row.get('Cigar Size', ''))
-                    length, ring_gauge = self.parse_size(size)
-                    
-                    box_count = None
-                    box_val = row.get('# of Cigars')
-                    if box_val and not pd.isna(box_val):
-                        try:
-                            box_count = int(box_val)
-                        except:
-                            pass
-                    
-                    cigar = {
-                        "brand": "J.C. Newman",
-                        "name": str(name).strip(),
-                        "size": size,
-                        "length": length,
-                        "ring_gauge": ring_gauge,
-                        "box_count": box_count,
-                        "wholesale_price": self.clean_price(row.get('Cost Per Box/Bundle')),
-                        "msrp_single": self.clean_price(row.get('SRP Per Cigar')),
-                        "msrp_box": self.clean_price(row.get('SRP Per Box/Bundle')),
-                        "upc": str(row.get('Cigar UPC', '')).strip() if row.get('Cigar UPC') else None,
-                        "sku": str(sku).strip(),
-                        "country": country,
-                        "source": f"J.C. Newman Price List 2025 ({sheet})",
-                    }
-                    
-                    cigar["line"] = self.extract_line(name, "J.C. Newman")
-                    cigar["vitola"] = self.extract_vitola(name)
-                    cigar["wrapper"] = self.extract_wrapper(name)
-                    
-                    cigars.append(cigar)
-            except Exception as e:
-                self.stats["errors"].append(f"{filepath.name} ({sheet}): {str(e)}")
+            columns = [f for f in CIGAR_SCHEMA if f in frame.columns]
+            columns += [f for f in frame.columns if f not in CIGAR_SCHEMA and f != "source"]
+            cigars.extend(self.emit_records(frame[columns + ["source"]]))
         
         return cigars
     
@@ -465,16 +247,9 @@ class ExcelExtractor:
         cigars = []
         
         try:
-            if "AUSA" in filename:
-                cigars = self.extract_ausa(filepath)
-            elif "Arturo Fuente" in filename:
-                cigars = self.extract_fuente(filepath)
-            elif "Drew Estate Retailer" in filename:
-                cigars = self.extract_drew_estate(filepath, diplomat=False)
-            elif "Drew Diplomat" in filename:
-                cigars = self.extract_drew_estate(filepath, diplomat=True)
-            elif "J.C. Newman" in filename:
-                cigars = self.extract_jc_newman(filepath)
+            config = self.find_config(filename)
+            if config:
+                cigars = self.extract_with_config(filepath, config)
             else:
                 self.stats["errors"].append(f"No extractor for: {filename}")
         except Exception as e:
@@ -483,23 +258,36 @@ class ExcelExtractor:
         return cigars
     
     def process_all(self) -> Dict:
-        """Process all Excel files in source directory."""
-        excel_files = list(self.source_dir.glob("*.xlsx"))
+        """Process all Excel files in source directory.
+        
+        Workbooks whose content hash and extractor version match the cache
+        are reused from their existing JSON instead of being re-parsed.
+        """
+        excel_files = sorted(self.source_dir.glob("*.xlsx"))
         
-        all_cigars = []
         file_results = {}
         
         for filepath in excel_files:
+            output_path = records_path(self.output_dir, filepath.stem.replace(" ", "_").lower(), self.output_format)
+            cached = self.cache.lookup(filepath, output_path) if self.cache else None
+            if cached:
+                print(f"Cached: {filepath.name}")
+                file_results[filepath.name] = {
+                    "status": "success",
+                    "cigars_extracted": cached["cigars_extracted"],
+                    "output_file": cached["output_file"],
+                }
+                self.stats["files_processed"] += 1
+                self.stats["cigars_extracted"] += cached["cigars_extracted"]
+                continue
+            
             print(f"Processing: {filepath.name}")
+            errors_before = len(self.stats["errors"])
             cigars = self.process_file(filepath.name)
             
             if cigars:
                 # Save per-manufacturer JSON
-                output_name = filepath.stem.replace(" ", "_").lower() + ".json"
-                output_path = self.output_dir / output_name
-                
-                with open(output_path, 'w') as f:
-                    json.dump(cigars, f, indent=2)
+                write_records(output_path, cigars)
                 
                 file_results[filepath.name] = {
                     "status": "success",
@@ -507,27 +295,40 @@ class ExcelExtractor:
                     "output_file": str(output_path),
                 }
                 
-                all_cigars.extend(cigars)
                 self.stats["files_processed"] += 1
                 self.stats["cigars_extracted"] += len(cigars)
+                
+                if self.cache and len(self.stats["errors"]) == errors_before:
+                    self.cache.store(filepath, {
+                        "cigars_extracted": len(cigars),
+                        "output_file": str(output_path),
+                    })
             else:
                 file_results[filepath.name] = {
                     "status": "failed" if filepath.name in [e.split(":")[0] for e in self.stats["errors"]] else "no_data",
                     "cigars_extracted": 0,
                 }
         
-        return {
+        summary = {
             "stats": self.stats,
             "file_results": file_results,
-            "total_cigars": len(all_cigars),
+            "total_cigars": self.stats["cigars_extracted"],
         }
+        
+        if self.cache:
+            self.cache.save()
+            summary["cache"] = self.cache.report()
+        
+        return summary
 
 
 def main():
     source_dir = os.path.expanduser("~/Desktop/Cigar Price Lists/")
     output_dir = os.path.expanduser("~/Projects/boxbluebook/data/extracted/excel/")
     
-    extractor = ExcelExtractor(source_dir, output_dir)
+    cache = ExtractionCache(output_dir, code_version(), force="--force" in sys.argv)
+    
+    extractor = ExcelExtractor(source_dir, output_dir, cache=cache, output_format=output_format(sys.argv))
     results = extractor.process_all()
     
     print("\n" + "="*60)
@@ -536,6 +337,9 @@ def main():
     print(f"Files processed: {results['stats']['files_processed']}")
     print(f"Total cigars extracted: {results['stats']['cigars_extracted']}")
     
+    if "cache" in results:
+        print(f"Cache: {results['cache']['hits']} hits, {results['cache']['misses']} misses")
+    
     if results['stats']['errors']:
         print(f"\nErrors ({len(results['stats']['errors'])}):")
         for error in results['stats']['errors']:
@@ -551,8 +355,7 @@ def main():
     os.makedirs(os.path.dirname(summary_path), exist_ok=True)
     
     results["timestamp"] = datetime.now().isoformat()
-    with open(summary_path, 'w') as f:
-        json.dump(results, f, indent=2)
+    codec.dump(results, summary_path)
     
     print(f"\nReport saved to: {summary_path}")
 
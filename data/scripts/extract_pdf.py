@@ -5,175 +5,199 @@ Parses manufacturer PDF files and outputs normalized JSON.
 """
 
 import pdfplumber
-import json
 import re
 import os
 import sys
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 sys.path.insert(0, str(Path(__file__).parent))
-from config import VITOLA_MAP, WRAPPER_MAP
+from extract_cache import ExtractionCache, code_version
+from layout_cache import LayoutCache
+from layout_profiles import LayoutProfiles, learn_layout_profile, profile_tables
+from peak_rss import peak_rss_mb, reset_peak_rss
+from isolation import DEFAULT_MEMORY_LIMIT_MB, DEFAULT_TIMEOUT, KILLED, TIMEOUT, run_isolated
+from size_parser import parse_size
+from name_matcher import match_vitola, match_wrapper
+from name_parser import parse_name
+from table_profile import PRICE_ROLES, PROFILE_ROWS, find_header, parse_price, profile_fits, profile_table
+import codec
+from record_io import output_format, records_path, write_records
+
+
+# Documents shorter than this are laid out in-process even with page_workers > 1
+PAGE_PARALLEL_MIN_PAGES = 4
+
+# Set in run_isolated's subprocesses (see _extract_isolated), where a
+# MemoryError must propagate so the file is reported as killed
+_in_isolated_worker = False
+
+
+def _layout_page(page, mode: str, settings: Optional[Dict] = None):
+    """Layout output for a single pdfplumber page.
+    
+    For tables, settings is a layout profile; without one pdfplumber
+    auto-detects the tables.
+    """
+    if mode == "text":
+        return page.extract_text(**(settings or {}))
+    if mode == "words":
+        return page.extract_words(**(settings or {}))
+    if settings:
+        return profile_tables(page, settings)
+    return page.extract_tables()
+
+
+def _layout_page_range(filepath: str, start: int, end: int, mode: str,
+                       settings: Optional[Dict] = None) -> List:
+    """Process pool entry point: lay out pages [start, end) of one PDF."""
+    layouts = []
+    with pdfplumber.open(filepath) as pdf:
+        for page in pdf.pages[start:end]:
+            layouts.append(_layout_page(page, mode, settings))
+            page.close()
+    return layouts
 
 
 class PDFExtractor:
-    def __init__(self, source_dir: str, output_dir: str):
+    def __init__(self, source_dir: str, output_dir: str, page_workers: int = 1,
+                 cache: Optional[ExtractionCache] = None, output_format: str = "json",
+                 layout_cache: Optional[LayoutCache] = None,
+                 layout_profiles: Optional[LayoutProfiles] = None, learn_layout_profiles: bool = False,
+                 isolate: bool = False, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                 memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB):
         self.source_dir = Path(source_dir)
         self.output_dir = Path(output_dir)
+        self.page_workers = page_workers
+        self.cache = cache
+        self.layout_cache = layout_cache
+        self.layout_profiles = layout_profiles
+        self.learn_layout_profiles = learn_layout_profiles
+        self.isolate = isolate
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.output_format = output_format
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.stats = {"files_processed": 0, "cigars_extracted": 0, "errors": [], "needs_review": []}
+        self.stats = {"files_processed": 0, "cigars_extracted": 0, "errors": [], "needs_review": [],
+                      "peak_rss_mb": {}}
     
-    def parse_size(self, size_str: str) -> tuple:
-        """Parse size string into (length, ring_gauge)."""
-        if not size_str:
-            return None, None
-        
-        size_str = str(size_str).strip().upper()
+    def page_tables(self, filepath: Path) -> Iterator[List]:
+        """Yield page.extract_tables() output for each page, in page order.
         
-        patterns = [
-            r'(\d+(?:\s*\d+/\d+)?)\s*[Xx×]\s*(\d+)',
-            r'(\d+(?:\.\d+)?)["\']?\s*[Xx×]\s*(\d+)',
-            r'(\d+)\s*[Xx×]\s*(\d+(?:\s*\d+/\d+)?)',
-        ]
+        Uses the file's layout profile when there is one.
+        """
+        profile = self.layout_profiles.profile_for(filepath.name) if self.layout_profiles else None
+        return self._page_layouts(filepath, "tables", profile)
+    
+    def page_texts(self, filepath: Path) -> Iterator[str]:
+        """Yield page.extract_text() output for each page, in page order."""
+        return self._page_layouts(filepath, "text")
+    
+    def page_words(self, filepath: Path) -> Iterator[List[Dict]]:
+        """Yield page.extract_words() output for each page, in page order."""
+        return self._page_layouts(filepath, "words")
+    
+    def _page_layouts(self, filepath: Path, mode: str, settings: Optional[Dict] = None) -> Iterator:
+        """Page layouts from the layout cache, else from pdfplumber.
         
-        for pattern in patterns:
-            match = re.search(pattern, size_str)
-            if match:
-                g1, g2 = match.groups()
-                
-                # Determine which is length vs ring gauge
-                # Ring gauge is typically 30-70, length is typically 4-9
-                def parse_num(s):
-                    s = s.strip()
-                    if '/' in s:
-                        parts = s.split()
-                        if len(parts) == 2:
-                            whole = float(parts[0])
-                            frac = parts[1].split('/')
-                            return whole + float(frac[0]) / float(frac[1])
-                        else:
-                            frac = s.split('/')
-                            return float(frac[0]) / float(frac[1])
-                    return float(s)
-                
-                n1 = parse_num(g1)
-                n2 = parse_num(g2)
-                
-                # Usually format is length x ring_gauge
-                if n1 < 20 and n2 >= 30:
-                    return n1, int(n2)
-                elif n2 < 20 and n1 >= 30:
-                    return n2, int(n1)
-                elif n1 < n2:
-                    return n1, int(n2)
-                else:
-                    return n2, int(n1)
+        Pages laid out by pdfplumber are streamed into the layout cache as
+        they go by; once the document is done the entry is kept, so the
+        next run over an unchanged PDF never opens it.
+        """
+        if self.layout_cache is None:
+            return self._lay_out(filepath, mode, settings)
         
-        return None, None
+        pages = self.layout_cache.load(filepath, mode, settings)
+        if pages is not None:
+            return pages
+        return self.layout_cache.store(filepath, mode, settings, self._lay_out(filepath, mode, settings))
     
-    def extract_vitola(self, name: str) -> str:
-        """Extract standardized vitola from name."""
-        if not name:
-            return None
-        name_lower = name.lower()
-        for key, value in VITOLA_MAP.items():
-            if key in name_lower:
-                return value
-        return None
-    
-    def extract_wrapper(self, name: str) -> str:
-        """Extract wrapper type from name."""
-        if not name:
-            return None
-        name_lower = name.lower()
-        for key, value in WRAPPER_MAP.items():
-            if key in name_lower:
-                return value
-        return None
-    
-    def clean_price(self, price_str) -> Optional[float]:
-        """Clean price string to float."""
-        if not price_str:
-            return None
-        price_str = re.sub(r'[$,\s]', '', str(price_str))
-        try:
-            return float(price_str)
-        except ValueError:
-            return None
-    
-    def extract_box_count(self, name: str) -> Optional[int]:
-        """Extract box count from name like 'ROBUSTO (20)' or 'BOX 25'."""
-        if not name:
-            return None
+    def _lay_out(self, filepath: Path, mode: str, settings: Optional[Dict] = None) -> Iterator:
+        """Run pdfplumber layout analysis page by page.
         
-        patterns = [
-            r'\((\d+)\)',  # (20)
-            r'BOX\s*(?:OF\s*)?(\d+)',  # BOX 20, BOX OF 20
-            r'(\d+)\s*(?:CT|COUNT|PC)',  # 20CT, 20 COUNT
-        ]
+        With page_workers > 1 and a large enough document, page ranges are
+        laid out in a process pool and stitched back in page order. Only the
+        layout step is parallel; row parsing stays sequential in the caller,
+        so state carried across pages (current_line etc.) is unaffected.
         
-        for pattern in patterns:
-            match = re.search(pattern, str(name).upper())
-            if match:
-                return int(match.group(1))
+        Each page is closed once laid out. pdfplumber otherwise keeps the
+        parsed objects of every visited page until the document closes,
+        so memory grew with page count; now it is bounded by one page.
+        """
+        if self.page_workers > 1:
+            with pdfplumber.open(filepath) as pdf:
+                page_count = len(pdf.pages)
+            
+            if page_count >= PAGE_PARALLEL_MIN_PAGES:
+                chunk = -(-page_count // self.page_workers)
+                starts = list(range(0, page_count, chunk))
+                ends = [min(start + chunk, page_count) for start in starts]
+                
+                with ProcessPoolExecutor(max_workers=self.page_workers) as pool:
+                    for layouts in pool.map(_layout_page_range, [str(filepath)] * len(starts),
+                                            starts, ends, [mode] * len(starts), [settings] * len(starts)):
+                        yield from layouts
+                return
         
-        return None
+        with pdfplumber.open(filepath) as pdf:
+            for page in pdf.pages:
+                layout = _layout_page(page, mode, settings)
+                page.close()
+                yield layout
     
     def extract_lfd(self, filepath: Path) -> List[Dict]:
         """Extract La Flor Dominicana price list."""
         cigars = []
         current_line = None
         
-        with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                
-                for table in tables:
-                    for row in table:
-                        if not row or len(row) < 4:
-                            continue
-                        
-                        # Clean row
-                        row = [str(c).strip() if c else "" for c in row]
-                        
-                        # Check if this is a line header (no price data)
-                        if row[0] and not row[2]:  # Name but no price
-                            current_line = row[0].replace('\n', ' ').strip()
-                            continue
-                        
-                        # Skip if no name
-                        name = row[0].replace('\n', ' ').strip() if row[0] else ""
-                        if not name or name.upper() in ['NAME', 'PRODUCT', 'ITEM']:
-                            continue
-                        
-                        size = row[1].replace('\n', ' ').strip() if len(row) > 1 and row[1] else ""
-                        length, ring_gauge = self.parse_size(size)
-                        
-                        box_count = self.extract_box_count(name)
-                        
-                        cigar = {
-                            "brand": "La Flor Dominicana",
-                            "line": current_line,
-                            "name": name,
-                            "size": size,
-                            "length": length,
-                            "ring_gauge": ring_gauge,
-                            "box_count": box_count,
-                            "wholesale_single": self.clean_price(row[2]) if len(row) > 2 else None,
-                            "wholesale_price": self.clean_price(row[3]) if len(row) > 3 else None,
-                            "msrp_single": self.clean_price(row[4]) if len(row) > 4 else None,
-                            "msrp_box": self.clean_price(row[5]) if len(row) > 5 else None,
-                            "country": "Dominican Republic",
-                            "source": "La Flor Dominicana Price List 2025",
-                        }
-                        
-                        cigar["vitola"] = self.extract_vitola(name)
-                        cigar["wrapper"] = self.extract_wrapper(name)
-                        
-                        # Only add if has meaningful data
-                        if cigar["wholesale_price"] or cigar["msrp_box"]:
-                            cigars.append(cigar)
+        for tables in self.page_tables(filepath):
+            for table in tables:
+                for row in table:
+                    if not row or len(row) < 4:
+                        continue
+                    
+                    # Clean row
+                    row = [str(c).strip() if c else "" for c in row]
+                    
+                    # Check if this is a line header (no price data)
+                    if row[0] and not row[2]:  # Name but no price
+                        current_line = row[0].replace('\n', ' ').strip()
+                        continue
+                    
+                    # Skip if no name
+                    name = row[0].replace('\n', ' ').strip() if row[0] else ""
+                    if not name or name.upper() in ['NAME', 'PRODUCT', 'ITEM']:
+                        continue
+                    
+                    size = row[1].replace('\n', ' ').strip() if len(row) > 1 and row[1] else ""
+                    length, ring_gauge = parse_size(size)
+                    
+                    parsed = parse_name(name)
+                    
+                    cigar = {
+                        "brand": "La Flor Dominicana",
+                        "line": current_line,
+                        "name": name,
+                        "size": size,
+                        "length": length,
+                        "ring_gauge": ring_gauge,
+                        "box_count": parsed.box_count,
+                        "wholesale_single": parse_price(row[2]) if len(row) > 2 else None,
+                        "wholesale_price": parse_price(row[3]) if len(row) > 3 else None,
+                        "msrp_single": parse_price(row[4]) if len(row) > 4 else None,
+                        "msrp_box": parse_price(row[5]) if len(row) > 5 else None,
+                        "country": "Dominican Republic",
+                        "source": "La Flor Dominicana Price List 2025",
+                    }
+                    
+                    cigar["vitola"] = parsed.vitola
+                    cigar["wrapper"] = parsed.wrapper
+                    
+                    # Only add if has meaningful data
+                    if cigar["wholesale_price"] or cigar["msrp_box"]:
+                        cigars.append(cigar)
         
         return cigars
     
@@ -182,64 +206,61 @@ class PDFExtractor:
         cigars = []
         current_line = None
         
-        with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                
-                for table in tables:
-                    for row in table:
-                        if not row or len(row) < 3:
-                            continue
-                        
-                        row = [str(c).strip() if c else "" for c in row]
-                        
-                        # Check for line header (contains "Corojo" or "Maduro" or brand names)
-                        first_cell = row[0].lower() if row[0] else ""
-                        if 'wise man' in first_cell or 'charter oak' in first_cell or 'tabernacle' in first_cell:
-                            current_line = row[0].replace('\n', ' ').strip()
-                            continue
-                        
-                        # Skip headers and empty rows
-                        if not row[0] or row[0].upper() in ['SIZE', 'VITOLA', 'TOTAL', '']:
-                            continue
-                        
-                        vitola = row[0].replace('\n', ' ').strip()
-                        if not vitola or vitola.lower() in ['total', 'subtotal']:
-                            continue
-                        
-                        size = row[1].replace('\n', ' ').strip() if len(row) > 1 and row[1] else ""
-                        length, ring_gauge = self.parse_size(size)
-                        
-                        box_count = None
-                        if len(row) > 2 and row[2]:
-                            try:
-                                box_count = int(row[2])
-                            except ValueError:
-                                pass
-                        
-                        wholesale_price = self.clean_price(row[3]) if len(row) > 3 else None
-                        
-                        if not wholesale_price:
-                            continue
-                        
-                        cigar = {
-                            "brand": "Foundation",
-                            "line": current_line,
-                            "name": f"{current_line} {vitola}" if current_line else vitola,
-                            "vitola": vitola,
-                            "size": size,
-                            "length": length,
-                            "ring_gauge": ring_gauge,
-                            "box_count": box_count,
-                            "wholesale_price": wholesale_price,
-                            "country": "Nicaragua",
-                            "source": "Foundation Cigar Company Order Form 2025",
-                        }
-                        
-                        cigar["vitola"] = self.extract_vitola(vitola) or vitola
-                        cigar["wrapper"] = self.extract_wrapper(current_line or "")
-                        
-                        cigars.append(cigar)
+        for tables in self.page_tables(filepath):
+            for table in tables:
+                for row in table:
+                    if not row or len(row) < 3:
+                        continue
+                    
+                    row = [str(c).strip() if c else "" for c in row]
+                    
+                    # Check for line header (contains "Corojo" or "Maduro" or brand names)
+                    first_cell = row[0].lower() if row[0] else ""
+                    if 'wise man' in first_cell or 'charter oak' in first_cell or 'tabernacle' in first_cell:
+                        current_line = row[0].replace('\n', ' ').strip()
+                        continue
+                    
+                    # Skip headers and empty rows
+                    if not row[0] or row[0].upper() in ['SIZE', 'VITOLA', 'TOTAL', '']:
+                        continue
+                    
+                    vitola = row[0].replace('\n', ' ').strip()
+                    if not vitola or vitola.lower() in ['total', 'subtotal']:
+                        continue
+                    
+                    size = row[1].replace('\n', ' ').strip() if len(row) > 1 and row[1] else ""
+                    length, ring_gauge = parse_size(size)
+                    
+                    box_count = None
+                    if len(row) > 2 and row[2]:
+                        try:
+                            box_count = int(row[2])
+                        except ValueError:
+                            pass
+                    
+                    wholesale_price = parse_price(row[3]) if len(row) > 3 else None
+                    
+                    if not wholesale_price:
+                        continue
+                    
+                    cigar = {
+                        "brand": "Foundation",
+                        "line": current_line,
+                        "name": f"{current_line} {vitola}" if current_line else vitola,
+                        "vitola": vitola,
+                        "size": size,
+                        "length": length,
+                        "ring_gauge": ring_gauge,
+                        "box_count": box_count,
+                        "wholesale_price": wholesale_price,
+                        "country": "Nicaragua",
+                        "source": "Foundation Cigar Company Order Form 2025",
+                    }
+                    
+                    cigar["vitola"] = match_vitola(vitola) or vitola
+                    cigar["wrapper"] = match_wrapper(current_line or "")
+                    
+                    cigars.append(cigar)
         
         return cigars
     
@@ -248,77 +269,74 @@ class PDFExtractor:
         cigars = []
         current_line = None
         
-        with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                
-                for table in tables:
-                    for row in table:
-                        if not row or len(row) < 4:
-                            continue
-                        
-                        row = [str(c).strip().replace('\n', ' ') if c else "" for c in row]
-                        
-                        # Check for line header (e.g., "EL CENTURION Box of 20")
-                        if row[0] == '' and row[1] and 'box' in row[1].lower():
-                            current_line = row[1].split('Box')[0].strip()
-                            # Extract box count
-                            box_match = re.search(r'box\s*(?:of\s*)?(\d+)', row[1].lower())
-                            current_box_count = int(box_match.group(1)) if box_match else None
-                            continue
-                        
-                        # Check if this is a cigar row (has size like "5 x 50")
-                        name = row[0]
-                        if not name or not re.search(r'\d+\s*[xX×]\s*\d+', name):
-                            continue
-                        
-                        # Parse "ROBUSTO 5 ¾ X 50" format
-                        match = re.match(r'([A-Za-z\s]+)\s*(\d+(?:\s*[½¾¼⅓⅔]|\s*\d+/\d+)?\s*[xX×]\s*\d+)', name)
-                        if match:
-                            vitola = match.group(1).strip()
-                            size = match.group(2).strip()
-                        else:
-                            vitola = name
-                            size = ""
-                        
-                        # Convert special fraction characters
-                        size = size.replace('½', '1/2').replace('¾', '3/4').replace('¼', '1/4')
-                        
-                        length, ring_gauge = self.parse_size(size)
-                        
-                        # Find price column
-                        price = None
-                        msrp = None
-                        for cell in row[1:]:
-                            val = self.clean_price(cell)
-                            if val:
-                                if not price:
-                                    price = val
-                                elif not msrp:
-                                    msrp = val
-                        
-                        if not price:
-                            continue
-                        
-                        cigar = {
-                            "brand": "My Father",
-                            "line": current_line,
-                            "name": f"{current_line} {vitola}" if current_line else vitola,
-                            "vitola": vitola,
-                            "size": size,
-                            "length": length,
-                            "ring_gauge": ring_gauge,
-                            "box_count": current_box_count if 'current_box_count' in dir() else None,
-                            "wholesale_price": price,
-                            "msrp_single": msrp,
-                            "country": "Nicaragua",
-                            "source": "My Father Price List 2025",
-                        }
-                        
-                        cigar["vitola"] = self.extract_vitola(vitola) or vitola
-                        cigar["wrapper"] = self.extract_wrapper(name)
-                        
-                        cigars.append(cigar)
+        for tables in self.page_tables(filepath):
+            for table in tables:
+                for row in table:
+                    if not row or len(row) < 4:
+                        continue
+                    
+                    row = [str(c).strip().replace('\n', ' ') if c else "" for c in row]
+                    
+                    # Check for line header (e.g., "EL CENTURION Box of 20")
+                    if row[0] == '' and row[1] and 'box' in row[1].lower():
+                        current_line = row[1].split('Box')[0].strip()
+                        # Extract box count
+                        box_match = re.search(r'box\s*(?:of\s*)?(\d+)', row[1].lower())
+                        current_box_count = int(box_match.group(1)) if box_match else None
+                        continue
+                    
+                    # Check if this is a cigar row (has size like "5 x 50")
+                    name = row[0]
+                    if not name or not re.search(r'\d+\s*[xX×]\s*\d+', name):
+                        continue
+                    
+                    # Parse "ROBUSTO 5 ¾ X 50" format
+                    match = re.match(r'([A-Za-z\s]+)\s*(\d+(?:\s*[½¾¼⅓⅔]|\s*\d+/\d+)?\s*[xX×]\s*\d+)', name)
+                    if match:
+                        vitola = match.group(1).strip()
+                        size = match.group(2).strip()
+                    else:
+                        vitola = name
+                        size = ""
+                    
+                    # Convert special fraction characters
+                    size = size.replace('½', '1/2').replace('¾', '3/4').replace('¼', '1/4')
+                    
+                    length, ring_gauge = parse_size(size)
+                    
+                    # Find price column
+                    price = None
+                    msrp = None
+                    for cell in row[1:]:
+                        val = parse_price(cell)
+                        if val:
+                            if not price:
+                                price = val
+                            elif not msrp:
+                                msrp = val
+                    
+                    if not price:
+                        continue
+                    
+                    cigar = {
+                        "brand": "My Father",
+                        "line": current_line,
+                        "name": f"{current_line} {vitola}" if current_line else vitola,
+                        "vitola": vitola,
+                        "size": size,
+                        "length": length,
+                        "ring_gauge": ring_gauge,
+                        "box_count": current_box_count if 'current_box_count' in dir() else None,
+                        "wholesale_price": price,
+                        "msrp_single": msrp,
+                        "country": "Nicaragua",
+                        "source": "My Father Price List 2025",
+                    }
+                    
+                    cigar["vitola"] = match_vitola(vitola) or vitola
+                    cigar["wrapper"] = match_wrapper(name)
+                    
+                    cigars.append(cigar)
         
         return cigars
     
@@ -326,59 +344,57 @@ class PDFExtractor:
         """Extract Padron price list from text."""
         cigars = []
         
-        with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if not text:
+        for text in self.page_texts(filepath):
+            if not text:
+                continue
+            
+            lines = text.split('\n')
+            current_line = None
+            
+            for line in lines:
+                line = line.strip()
+                if not line:
                     continue
                 
-                lines = text.split('\n')
-                current_line = None
-                
-                for line in lines:
-                    line = line.strip()
-                    if not line:
+                # Check for series headers
+                if 'series' in line.lower() or 'anniversary' in line.lower():
+                    if 'maduro' not in line.lower() and 'natural' not in line.lower():
+                        current_line = line.strip()
                         continue
+                
+                # Look for cigar lines with prices
+                # Format: "Name Size Box# $Price $Price"
+                match = re.search(r'([A-Za-z0-9\s\'"]+)\s+(\d+\s*[xX×]\s*\d+(?:\s*\d+/\d+)?)\s+(\d+)\s+\$?([\d,]+\.?\d*)\s+\$?([\d,]+\.?\d*)', line)
+                if match:
+                    name = match.group(1).strip()
+                    size = match.group(2)
+                    box_count = int(match.group(3))
                     
-                    # Check for series headers
-                    if 'series' in line.lower() or 'anniversary' in line.lower():
-                        if 'maduro' not in line.lower() and 'natural' not in line.lower():
-                            current_line = line.strip()
-                            continue
+                    # Prices might be wholesale and MSRP
+                    price1 = parse_price(match.group(4))
+                    price2 = parse_price(match.group(5))
                     
-                    # Look for cigar lines with prices
-                    # Format: "Name Size Box# $Price $Price"
-                    match = re.search(r'([A-Za-z0-9\s\'"]+)\s+(\d+\s*[xX×]\s*\d+(?:\s*\d+/\d+)?)\s+(\d+)\s+\$?([\d,]+\.?\d*)\s+\$?([\d,]+\.?\d*)', line)
-                    if match:
-                        name = match.group(1).strip()
-                        size = match.group(2)
-                        box_count = int(match.group(3))
-                        
-                        # Prices might be wholesale and MSRP
-                        price1 = self.clean_price(match.group(4))
-                        price2 = self.clean_price(match.group(5))
-                        
-                        length, ring_gauge = self.parse_size(size)
-                        
-                        cigar = {
-                            "brand": "Padron",
-                            "line": current_line,
-                            "name": f"Padron {current_line} {name}" if current_line else f"Padron {name}",
-                            "vitola": name,
-                            "size": size,
-                            "length": length,
-                            "ring_gauge": ring_gauge,
-                            "box_count": box_count,
-                            "wholesale_price": price1,
-                            "msrp_box": price2,
-                            "country": "Nicaragua",
-                            "source": "Padron Price List 2025",
-                        }
-                        
-                        cigar["vitola"] = self.extract_vitola(name) or name
-                        cigar["wrapper"] = self.extract_wrapper(line)
-                        
-                        cigars.append(cigar)
+                    length, ring_gauge = parse_size(size)
+                    
+                    cigar = {
+                        "brand": "Padron",
+                        "line": current_line,
+                        "name": f"Padron {current_line} {name}" if current_line else f"Padron {name}",
+                        "vitola": name,
+                        "size": size,
+                        "length": length,
+                        "ring_gauge": ring_gauge,
+                        "box_count": box_count,
+                        "wholesale_price": price1,
+                        "msrp_box": price2,
+                        "country": "Nicaragua",
+                        "source": "Padron Price List 2025",
+                    }
+                    
+                    cigar["vitola"] = match_vitola(name) or name
+                    cigar["wrapper"] = match_wrapper(line)
+                    
+                    cigars.append(cigar)
         
         return cigars
     
@@ -386,142 +402,148 @@ class PDFExtractor:
         """Extract Oliva price list."""
         cigars = []
         
-        with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
+        for tables in self.page_tables(filepath):
+            for table in tables:
+                current_line = None
                 
-                for table in tables:
-                    current_line = None
+                for row in table:
+                    if not row:
+                        continue
                     
-                    for row in table:
-                        if not row:
-                            continue
-                        
-                        row = [str(c).strip().replace('\n', ' ') if c else "" for c in row]
-                        
-                        # Process multi-column format
-                        for i in range(0, len(row) - 4, 5):
-                            item_no = row[i] if i < len(row) else ""
-                            desc = row[i+3] if i+3 < len(row) else ""
-                            price = row[i+4] if i+4 < len(row) else ""
-                            
-                            # Check for line headers like "Flor de Oliva (20)"
-                            if item_no == "" and desc and '(' in desc and not any(c.isdigit() for c in price):
-                                current_line = desc.split('(')[0].strip()
-                                continue
-                            
-                            if not item_no or not desc or item_no.upper() == 'ITEM#':
-                                continue
-                            
-                            # Parse description for size
-                            size_match = re.search(r'(\d+(?:\s*\d+/\d+)?)\s*[xX×]\s*(\d+)', desc)
-                            if size_match:
-                                size = f"{size_match.group(1)} x {size_match.group(2)}"
-                            else:
-                                size = ""
-                            
-                            length, ring_gauge = self.parse_size(size)
-                            
-                            box_count = self.extract_box_count(current_line or "")
-                            
-                            wholesale = self.clean_price(price)
-                            if not wholesale:
-                                continue
-                            
-                            cigar = {
-                                "brand": "Oliva",
-                                "line": current_line,
-                                "name": f"Oliva {current_line} {desc}" if current_line else f"Oliva {desc}",
-                                "vitola": desc,
-                                "size": size,
-                                "length": length,
-                                "ring_gauge": ring_gauge,
-                                "box_count": box_count,
-                                "wholesale_price": wholesale,
-                                "sku": item_no,
-                                "country": "Nicaragua",
-                                "source": "Oliva Price Sheet 2025",
-                            }
-                            
-                            cigar["vitola"] = self.extract_vitola(desc)
-                            cigar["wrapper"] = self.extract_wrapper(desc)
-                            
-                            cigars.append(cigar)
-        
-        return cigars
-    
-    def extract_generic_table(self, filepath: Path, brand: str, country: str = None) -> List[Dict]:
-        """Generic table extractor for simpler PDFs."""
-        cigars = []
-        
-        with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                
-                for table in tables:
-                    # Try to find header row
-                    header_idx = None
-                    for i, row in enumerate(table):
-                        row_str = ' '.join([str(c).lower() for c in row if c])
-                        if any(h in row_str for h in ['price', 'msrp', 'wholesale', 'size', 'vitola']):
-                            header_idx = i
-                            break
-                    
-                    if header_idx is None:
-                        header_idx = 0
-                    
-                    header = [str(c).strip().lower() if c else f"col_{i}" for i, c in enumerate(table[header_idx])]
-                    
-                    for row in table[header_idx + 1:]:
-                        if not row or len(row) < 3:
+                    row = [str(c).strip().replace('\n', ' ') if c else "" for c in row]
+                    
+                    # Process multi-column format
+                    for i in range(0, len(row) - 4, 5):
+                        item_no = row[i] if i < len(row) else ""
+                        desc = row[i+3] if i+3 < len(row) else ""
+                        price = row[i+4] if i+4 < len(row) else ""
+                        
+                        # Check for line headers like "Flor de Oliva (20)"
+                        if item_no == "" and desc and '(' in desc and not any(c.isdigit() for c in price):
+                            current_line = desc.split('(')[0].strip()
                             continue
                         
-                        row = [str(c).strip() if c else "" for c in row]
-                        
-                        # Try to extract meaningful data
-                        name = row[0] if row[0] else ""
-                        if not name or len(name) < 3:
+                        if not item_no or not desc or item_no.upper() == 'ITEM#':
                             continue
                         
-                        # Find size column
-                        size = ""
-                        for cell in row:
-                            if re.search(r'\d+\s*[xX×]\s*\d+', cell):
-                                size = cell
-                                break
+                        # Parse description for size
+                        size_match = re.search(r'(\d+(?:\s*\d+/\d+)?)\s*[xX×]\s*(\d+)', desc)
+                        if size_match:
+                            size = f"{size_match.group(1)} x {size_match.group(2)}"
+                        else:
+                            size = ""
                         
-                        length, ring_gauge = self.parse_size(size)
+                        length, ring_gauge = parse_size(size)
                         
-                        # Find price columns
-                        prices = []
-                        for cell in row:
-                            price = self.clean_price(cell)
-                            if price and price > 1:
-                                prices.append(price)
+                        box_count = parse_name(current_line or "").box_count
                         
-                        if not prices:
+                        wholesale = parse_price(price)
+                        if not wholesale:
                             continue
                         
                         cigar = {
-                            "brand": brand,
-                            "name": name,
+                            "brand": "Oliva",
+                            "line": current_line,
+                            "name": f"Oliva {current_line} {desc}" if current_line else f"Oliva {desc}",
+                            "vitola": desc,
                             "size": size,
                             "length": length,
                             "ring_gauge": ring_gauge,
-                            "wholesale_price": prices[0] if prices else None,
-                            "msrp_box": prices[1] if len(prices) > 1 else None,
-                            "country": country,
-                            "source": filepath.name,
+                            "box_count": box_count,
+                            "wholesale_price": wholesale,
+                            "sku": item_no,
+                            "country": "Nicaragua",
+                            "source": "Oliva Price Sheet 2025",
                         }
                         
-                        cigar["vitola"] = self.extract_vitola(name)
-                        cigar["wrapper"] = self.extract_wrapper(name)
-                        cigar["box_count"] = self.extract_box_count(name)
+                        cigar["vitola"] = match_vitola(desc)
+                        cigar["wrapper"] = match_wrapper(desc)
                         
                         cigars.append(cigar)
         
         return cigars
     
+    def extract_generic_table(self, filepath: Path, brand: str, country: str = None) -> List[Dict]:
+        """Generic table extractor for simpler PDFs.
+        
+        Column roles are inferred once per table by profile_table; a table
+        without a header row that continues one from an earlier page (same
+        width) reuses that table's profile.
+        """
+        cigars = []
+        profiles = {}  # table width -> roles of the last table with a header
+        
+        for tables in self.page_tables(filepath):
+            for table in tables:
+                rows = [[str(c).strip() if c else "" for c in row] for row in table if row]
+                if not rows:
+                    continue
+                
+                header_idx = find_header(rows)
+                width = max(len(row) for row in rows)
+                if header_idx is not None:
+                    data = rows[header_idx + 1:]
+                    roles = profile_table(rows[header_idx], data[:PROFILE_ROWS])
+                    profiles[width] = roles
+                else:
+                    data = rows
+                    roles = profiles.get(width)
+                    if roles is None or not profile_fits(roles, data[:PROFILE_ROWS]):
+                        roles = profile_table(None, data[:PROFILE_ROWS])
+                
+                price_roles = [(role, roles[role]) for role in PRICE_ROLES if role in roles]
+                if not price_roles:
+                    continue
+                
+                name_col = roles["name"]
+                size_col = roles.get("size")
+                count_col = roles.get("box_count")
+                
+                for row in data:
+                    if len(row) < 3:
+                        continue
+                    
+                    name = row[name_col] if name_col < len(row) else ""
+                    if not name or len(name) < 3:
+                        continue
+                    
+                    prices = {role: parse_price(row[col]) if col < len(row) else None
+                              for role, col in price_roles}
+                    if not any(price and price > 1 for price in prices.values()):
+                        continue
+                    
+                    size = row[size_col] if size_col is not None and size_col < len(row) else ""
+                    length, ring_gauge = parse_size(size)
+                    
+                    cigar = {
+                        "brand": brand,
+                        "name": name,
+                        "size": size,
+                        "length": length,
+                        "ring_gauge": ring_gauge,
+                        "wholesale_price": prices.get("wholesale_price"),
+                        "msrp_box": prices.get("msrp_box"),
+                        "msrp_single": prices.get("msrp_single"),
+                        "country": country,
+                        "source": filepath.name,
+                    }
+                    if "wholesale_single" in prices:
+                        cigar["wholesale_single"] = prices["wholesale_single"]
+                    for field in ("sku", "upc"):
+                        if field in roles and roles[field] < len(row) and row[roles[field]]:
+                            cigar[field] = row[roles[field]]
+                    
+                    parsed = parse_name(name)
+                    cigar["vitola"] = parsed.vitola
+                    cigar["wrapper"] = parsed.wrapper
+                    
+                    count = row[count_col] if count_col is not None and count_col < len(row) else ""
+                    cigar["box_count"] = int(count) if count.isdigit() else parsed.box_count
+                    
+                    cigars.append(cigar)
+        
+        return cigars
+    
     def process_file(self, filename: str) -> List[Dict]:
         """Process a single PDF file."""
         filepath = self.source_dir / filename
@@ -583,59 +605,272 @@ class PDFExtractor:
                 cigars = self.extract_generic_table(filepath, brand)
                 if len(cigars) < 5:
                     self.stats["needs_review"].append(filename)
+        except MemoryError as e:
+            # Not a parse failure: in an isolated worker, let it report the kill
+            if _in_isolated_worker:
+                raise
+            self.stats["errors"].append(f"{filename}: out of memory ({e})")
         except Exception as e:
             self.stats["errors"].append(f"{filename}: {str(e)}")
         
         return cigars
     
-    def process_all(self) -> Dict:
-        """Process all PDF files in source directory."""
-        pdf_files = list(self.source_dir.glob("*.pdf"))
+    def output_path_for(self, filepath: Path) -> Path:
+        """Per-manufacturer JSON/NDJSON path for a source PDF."""
+        return records_path(self.output_dir, filepath.stem.replace(" ", "_").lower(), self.output_format)
+    
+    def extract_and_save(self, filename: str) -> Dict:
+        """Process a single PDF file and write its per-manufacturer JSON."""
+        cigars = self.process_file(filename)
+        
+        output_path = self.output_path_for(self.source_dir / filename)
+        write_records(output_path, cigars)
+        
+        result = {
+            "filename": filename,
+            "cigars_extracted": len(cigars),
+            "output_file": str(output_path),
+        }
+        
+        if (self.learn_layout_profiles and cigars and self.layout_profiles
+                and not self.layout_profiles.profile_for(filename)):
+            result["layout_profile"] = self.learn_profile(filename)
+        
+        return result
+    
+    def learn_profile(self, filename: str) -> Optional[Dict]:
+        """Layout profile learned from a file that extracted cleanly, or None."""
+        try:
+            profile = learn_layout_profile(self.source_dir / filename)
+        except Exception as e:
+            print(f"  Could not learn layout profile for {filename}: {e}")
+            return None
+        if profile is None:
+            print(f"  No layout profile reproduces the tables of {filename}")
+        return profile
+    
+    def record_result(self, result: Dict, file_results: Dict):
+        """Fold a finished file into stats and file_results."""
+        filename = result["filename"]
+        
+        status = "success" if result["cigars_extracted"] else "no_data"
+        if result.get("status") in (TIMEOUT, KILLED):
+            status = result.pop("status")
+        elif filename in self.stats["needs_review"]:
+            status = "needs_review"
+        elif filename in [e.split(":")[0] for e in self.stats["errors"]]:
+            status = "failed"
+        
+        file_results[filename] = {
+            "status": status,
+            "cigars_extracted": result["cigars_extracted"],
+            "output_file": result["output_file"],
+        }
+        
+        peak = result.pop("peak_rss_mb", None)
+        if peak is not None:
+            file_results[filename]["peak_rss_mb"] = peak
+            self.stats["peak_rss_mb"][filename] = peak
+        
+        if result["cigars_extracted"]:
+            self.stats["files_processed"] += 1
+            self.stats["cigars_extracted"] += result["cigars_extracted"]
+    
+    def failed_result(self, filename: str, message: str, status: Optional[str] = None) -> Dict:
+        """Worker result for a file whose worker raised, timed out or was killed."""
+        result = {
+            "filename": filename,
+            "cigars_extracted": 0,
+            "output_file": str(self.output_path_for(self.source_dir / filename)),
+            "errors": [f"{filename}: {message}"],
+            "needs_review": [],
+        }
+        if status:
+            result["status"] = status
+        return result
+    
+    def process_all(self, workers: int = 1) -> Dict:
+        """Process all PDF files in source directory.
+        
+        Files whose content hash and extractor version match the cache are
+        reused from their existing JSON. With workers > 1, the remaining files
+        are extracted in a process pool; each worker writes its JSON as soon
+        as the file finishes. Results are merged in filename order so the
+        report does not depend on completion order.
+        
+        With isolate, every file instead runs in its own subprocess (up to
+        workers at a time) under the timeout and any memory limit; a file that
+        overruns either gets status "timeout" or "killed" and the run
+        carries on.
+        
+        When several files run at once, page_workers is cut to each file's
+        share of the CPUs, so workers x page_workers never oversubscribes
+        the machine.
+        """
+        pdf_files = sorted(self.source_dir.glob("*.pdf"))
         
-        all_cigars = []
         file_results = {}
+        results = {}
+        pending = []
         
         for filepath in pdf_files:
-            print(f"Processing: {filepath.name}")
-            cigars = self.process_file(filepath.name)
-            
-            # Save per-manufacturer JSON
-            output_name = filepath.stem.replace(" ", "_").lower() + ".json"
-            output_path = self.output_dir / output_name
-            
-            with open(output_path, 'w') as f:
-                json.dump(cigars, f, indent=2)
-            
-            status = "success" if cigars else "no_data"
-            if filepath.name in self.stats["needs_review"]:
-                status = "needs_review"
-            elif filepath.name in [e.split(":")[0] for e in self.stats["errors"]]:
-                status = "failed"
-            
-            file_results[filepath.name] = {
-                "status": status,
-                "cigars_extracted": len(cigars),
-                "output_file": str(output_path),
-            }
+            cached = self.cache.lookup(filepath, self.output_path_for(filepath)) if self.cache else None
+            if cached:
+                print(f"Cached: {filepath.name}")
+                results[filepath.name] = {
+                    "filename": filepath.name,
+                    "cigars_extracted": cached["cigars_extracted"],
+                    "output_file": cached["output_file"],
+                    "errors": [],
+                    "needs_review": cached.get("needs_review", []),
+                }
+            else:
+                pending.append(filepath)
+        
+        page_workers = self.page_workers
+        if workers > 1 and len(pending) > 1:
+            page_workers = max(1, min(page_workers, (os.cpu_count() or 1) // workers))
+            if page_workers < self.page_workers:
+                print(f"Page workers capped at {page_workers} per file ({workers} files at a time)")
+        
+        calls = {
+            fp.name: (str(self.source_dir), str(self.output_dir), fp.name, page_workers,
+                      self.output_format, self.layout_cache is not None, self.layout_profiles,
+                      self.learn_layout_profiles)
+            for fp in pending
+        }
+        
+        if self.isolate and pending:
+            for filename, status, value in run_isolated(calls, _extract_isolated, workers=workers,
+                                                        timeout=self.timeout,
+                                                        memory_limit_mb=self.memory_limit_mb):
+                if status == "ok":
+                    results[filename] = value
+                    print(f"Processed: {filename} ({value['cigars_extracted']} cigars)")
+                else:
+                    results[filename] = self.failed_result(filename, value, status if status != "error" else None)
+                    print(f"Processed: {filename} ({status}: {value})")
+        elif workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(_extract_worker, *args): filename for filename, args in calls.items()}
+                for future in as_completed(futures):
+                    filename = futures[future]
+                    try:
+                        results[filename] = future.result()
+                    except Exception as e:
+                        results[filename] = self.failed_result(filename, str(e))
+                    print(f"Processed: {filename} ({results[filename]['cigars_extracted']} cigars)")
+        else:
+            for filepath in pending:
+                print(f"Processing: {filepath.name}")
+                results[filepath.name] = _extract_worker(*calls[filepath.name])
+        
+        for filepath in pdf_files:
+            result = results[filepath.name]
+            errors = result.pop("errors")
+            needs_review = result.pop("needs_review")
+            if self.layout_cache is not None:
+                layouts = result.pop("layout_cache", {})
+                self.layout_cache.hits += layouts.get("hits", 0)
+                self.layout_cache.misses += layouts.get("misses", 0)
+            profile = result.pop("layout_profile", None)
+            if profile:
+                self.layout_profiles.add(filepath.name, profile)
+            self.stats["errors"].extend(errors)
+            self.stats["needs_review"].extend(needs_review)
+            self.record_result(result, file_results)
             
-            if cigars:
-                all_cigars.extend(cigars)
-                self.stats["files_processed"] += 1
-                self.stats["cigars_extracted"] += len(cigars)
+            if self.cache and filepath in pending and not errors:
+                self.cache.store(filepath, {**result, "needs_review": needs_review})
         
-        return {
+        summary = {
             "stats": self.stats,
             "file_results": file_results,
-            "total_cigars": len(all_cigars),
+            "total_cigars": self.stats["cigars_extracted"],
         }
+        
+        if self.cache:
+            self.cache.save()
+            summary["cache"] = self.cache.report()
+        if self.layout_cache:
+            summary["layout_cache"] = self.layout_cache.report()
+        if self.layout_profiles:
+            if self.layout_profiles.added:
+                self.layout_profiles.save()
+            summary["layout_profiles"] = self.layout_profiles.report()
+        
+        return summary
+
+
+def _extract_worker(source_dir: str, output_dir: str, filename: str, page_workers: int = 1,
+                    output_format: str = "json", layout_cache: bool = False,
+                    layout_profiles: Optional[LayoutProfiles] = None, learn_layout_profiles: bool = False) -> Dict:
+    """Process pool entry point: extract one file with a fresh extractor.
+    
+    Also reports the file's peak RSS, measured from a reset just before it.
+    """
+    reset_peak_rss()
+    extractor = PDFExtractor(source_dir, output_dir, page_workers=page_workers, output_format=output_format,
+                             layout_cache=LayoutCache(output_dir) if layout_cache else None,
+                             layout_profiles=layout_profiles, learn_layout_profiles=learn_layout_profiles)
+    result = extractor.extract_and_save(filename)
+    result["peak_rss_mb"] = peak_rss_mb()
+    result["errors"] = extractor.stats["errors"]
+    result["needs_review"] = extractor.stats["needs_review"]
+    if extractor.layout_cache:
+        result["layout_cache"] = extractor.layout_cache.report()
+    return result
+
+
+def _extract_isolated(*args) -> Dict:
+    """run_isolated entry point: _extract_worker in a process of its own,
+    where running out of memory ends the process rather than the file."""
+    global _in_isolated_worker
+    _in_isolated_worker = True
+    return _extract_worker(*args)
 
 
 def main():
     source_dir = os.path.expanduser("~/Desktop/Cigar Price Lists/")
     output_dir = os.path.expanduser("~/Projects/boxbluebook/data/extracted/pdf/")
     
-    extractor = PDFExtractor(source_dir, output_dir)
-    results = extractor.process_all()
+    workers = 1
+    if "--workers" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+    page_workers = 1
+    if "--page-workers" in sys.argv:
+        page_workers = int(sys.argv[sys.argv.index("--page-workers") + 1])
+    
+    # Learning mode re-extracts every file so each one without a profile
+    # gets a fresh auto-detected run to learn from
+    learn = "--learn-layout-profiles" in sys.argv
+    layout_profiles = None
+    if learn or "--no-layout-profiles" not in sys.argv:
+        layout_profiles = LayoutProfiles(output_dir)
+    
+    version = code_version()
+    if layout_profiles:
+        version = f"{version}-{layout_profiles.version()}"
+    cache = ExtractionCache(output_dir, version, force="--force" in sys.argv or learn)
+    
+    layout_cache = None if "--no-layout-cache" in sys.argv else LayoutCache(output_dir)
+    
+    # With --isolate each file runs in its own subprocess under --timeout
+    # (seconds, default DEFAULT_TIMEOUT) and, if given, --memory-limit (MB
+    # of address space, not RSS; see isolation.py); 0 disables a limit
+    timeout = DEFAULT_TIMEOUT
+    if "--timeout" in sys.argv:
+        timeout = float(sys.argv[sys.argv.index("--timeout") + 1]) or None
+    memory_limit_mb = DEFAULT_MEMORY_LIMIT_MB
+    if "--memory-limit" in sys.argv:
+        memory_limit_mb = int(sys.argv[sys.argv.index("--memory-limit") + 1]) or None
+    
+    extractor = PDFExtractor(source_dir, output_dir, page_workers=page_workers, cache=cache,
+                             output_format=output_format(sys.argv), layout_cache=layout_cache,
+                             layout_profiles=layout_profiles, learn_layout_profiles=learn,
+                             isolate="--isolate" in sys.argv, timeout=timeout,
+                             memory_limit_mb=memory_limit_mb)
+    results = extractor.process_all(workers=workers)
     
     print("\n" + "="*60)
     print("PDF EXTRACTION RESULTS")
@@ -643,6 +878,20 @@ def main():
     print(f"Files processed: {results['stats']['files_processed']}")
     print(f"Total cigars extracted: {results['stats']['cigars_extracted']}")
     
+    if "cache" in results:
+        print(f"Cache: {results['cache']['hits']} hits, {results['cache']['misses']} misses")
+    if "layout_cache" in results:
+        print(f"Layout cache: {results['layout_cache']['hits']} hits, {results['layout_cache']['misses']} misses")
+    if "layout_profiles" in results:
+        profiles = results['layout_profiles']
+        print(f"Layout profiles: {profiles['configured']} configured, {profiles['learned']} learned"
+              f" ({len(profiles['added'])} new)")
+    
+    peaks = results['stats']['peak_rss_mb']
+    if peaks:
+        largest = max(peaks, key=peaks.get)
+        print(f"Peak RSS: {peaks[largest]} MB ({largest})")
+    
     if results['stats']['errors']:
         print(f"\nErrors ({len(results['stats']['errors'])}):")
         for error in results['stats']['errors']:
@@ -661,15 +910,17 @@ def main():
             status = "⚠"
         else:
             status = "✗"
-        print(f"  {status} {filename}: {result['cigars_extracted']} cigars")
+        peak = f" ({result['peak_rss_mb']} MB peak RSS)" if "peak_rss_mb" in result else ""
+        if result["status"] in (TIMEOUT, KILLED):
+            peak = f" [{result['status']}]"
+        print(f"  {status} {filename}: {result['cigars_extracted']} cigars{peak}")
     
     # Save summary
     summary_path = os.path.expanduser("~/Projects/boxbluebook/data/reports/pdf_extraction_report.json")
     os.makedirs(os.path.dirname(summary_path), exist_ok=True)
     
     results["timestamp"] = datetime.now().isoformat()
-    with open(summary_path, 'w') as f:
-        json.dump(results, f, indent=2)
+    codec.dump(results, summary_path)
     
     print(f"\nReport saved to: {summary_path}")
 
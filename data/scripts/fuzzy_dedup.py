@@ -0,0 +1,170 @@
+"""
+Near-duplicate detection for aggregated cigars.
+
+Exact dedup only merges identical (brand, name, size) keys, so the same
+cigar spelled slightly differently by two price lists survives twice.
+Here records are blocked by (normalized brand, length, ring gauge) and
+only compared within a block, so the work grows with block size rather
+than with the square of the catalog. Within a block, names are scored by
+token similarity and each record joins the first earlier cluster whose
+leader it matches at or above the threshold.
+
+Records without a length and ring gauge are never fuzzy-merged.
+"""
+
+import re
+import sys
+from collections import defaultdict
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from identifiers import normalize_upc
+from size_parser import parse_size
+
+DEFAULT_THRESHOLD = 0.9
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+NUMBER_RE = re.compile(r'\d+')
+
+# Two differing tokens count as one word spelled two ways from this ratio up
+TOKEN_FLOOR = 0.75
+
+# Tokens that say nothing about which cigar a name is
+NOISE_TOKENS = {"cigar", "cigars", "box", "of", "the", "by", "ct", "count", "pc", "pack"}
+
+
+def name_tokens(name: str, brand: str = "") -> Tuple[str, ...]:
+    """Sorted name tokens without the brand's own words and noise tokens."""
+    skip = set(TOKEN_RE.findall(brand.lower())) | NOISE_TOKENS
+    return tuple(sorted(t for t in TOKEN_RE.findall((name or "").lower()) if t not in skip))
+
+
+def block_key(cigar: Dict) -> Optional[tuple]:
+    """(brand, length, ring gauge) block of a cigar, or None without a full size.
+
+    The size string is re-parsed when present: stored lengths from older
+    extracts can be truncated to whole inches (5 1/2 -> 5).
+    """
+    length, ring_gauge = parse_size(cigar.get('size'))
+    if not length or not ring_gauge:
+        length, ring_gauge = cigar.get('length'), cigar.get('ring_gauge')
+    brand = (cigar.get('brand') or '').lower()
+    if not brand or not length or not ring_gauge:
+        return None
+    return brand, round(float(length), 3), int(ring_gauge)
+
+
+class Candidate:
+    """A record's precomputed comparison features."""
+
+    __slots__ = ("index", "tokens", "joined", "numbers", "wrapper", "upc")
+
+    def __init__(self, index: int, cigar: Dict):
+        name = cigar.get('name') or ''
+        self.index = index
+        self.tokens = name_tokens(name, cigar.get('brand') or '')
+        self.joined = "".join(self.tokens)
+        self.numbers = tuple(sorted(NUMBER_RE.findall(name)))
+        self.wrapper = (cigar.get('wrapper') or '').lower() or None
+        self.upc = normalize_upc(cigar.get('upc'))[0]
+
+
+def compatible(a: Candidate, b: Candidate) -> bool:
+    """Hard vetoes: an empty name, different numbers (No. 2 vs No. 4, 25ct
+    vs 50ct), different known wrappers or different valid UPCs."""
+    if not a.tokens or not b.tokens:
+        return False
+    if a.numbers != b.numbers:
+        return False
+    if a.wrapper and b.wrapper and a.wrapper != b.wrapper:
+        return False
+    if a.upc and b.upc and a.upc != b.upc:
+        return False
+    return True
+
+
+def similarity(a: Candidate, b: Candidate) -> float:
+    """Token similarity of two names (0..1).
+
+    Every token must pair with an identical or similarly spelled token on
+    the other side; a word only one name has (NAT vs SG, Boy vs Girl) makes
+    them different cigars and scores 0. The score is the length-weighted
+    spelling similarity of the pairs, so word order, spacing and
+    punctuation do not count against a match.
+    """
+    if a.joined == b.joined:
+        return 1.0
+
+    left = list(a.tokens)
+    right = list(b.tokens)
+    total = sum(map(len, left)) + sum(map(len, right))
+    matched = 0.0
+
+    for token in a.tokens:
+        if token in right:
+            left.remove(token)
+            right.remove(token)
+            matched += 2 * len(token)
+
+    if len(left) != len(right):
+        return 0.0
+
+    for token in sorted(left, key=len, reverse=True):
+        best, best_ratio = None, TOKEN_FLOOR
+        for other in right:
+            ratio = SequenceMatcher(None, token, other).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = other, ratio
+        if best is None:
+            return 0.0
+        right.remove(best)
+        matched += best_ratio * (len(token) + len(best))
+
+    return matched / total
+
+
+def fuzzy_clusters(cigars: List[Dict], threshold: float = DEFAULT_THRESHOLD) -> Tuple[List[List[int]], List[Dict], Dict]:
+    """Group near-duplicate cigars.
+
+    Returns (clusters, merges, stats): clusters are lists of indexes into
+    cigars, ordered by first member, each listing its leader first; merges
+    describes every record folded into a leader with its score.
+    """
+    blocks = defaultdict(list)
+    clusters = {}
+    stats = {"threshold": threshold, "blocks": 0, "unblocked": 0, "comparisons": 0, "merged": 0}
+
+    for i, cigar in enumerate(cigars):
+        key = block_key(cigar)
+        if key is None:
+            stats["unblocked"] += 1
+            clusters[i] = [i]
+        else:
+            blocks[key].append(i)
+
+    stats["blocks"] = len(blocks)
+    merges = []
+
+    for members in blocks.values():
+        leaders = []
+        for i in members:
+            candidate = Candidate(i, cigars[i])
+            best, best_score = None, threshold
+            for leader in leaders:
+                if not compatible(candidate, leader):
+                    continue
+                stats["comparisons"] += 1
+                score = similarity(candidate, leader)
+                if score >= best_score and (best is None or score > best_score):
+                    best, best_score = leader, score
+            if best is None:
+                leaders.append(candidate)
+                clusters[i] = [i]
+            else:
+                clusters[best.index].append(i)
+                merges.append({"leader": best.index, "record": i, "score": round(best_score, 3)})
+
+    stats["merged"] = len(merges)
+    return [clusters[i] for i in sorted(clusters)], merges, stats
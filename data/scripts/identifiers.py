@@ -0,0 +1,150 @@
+"""
+UPC/SKU identifier index for linking records across price lists.
+
+UPCs are normalized to 14-digit GTINs (so UPC-A, EAN-13 and an Excel
+number that lost its leading zero all agree) and kept only with a valid
+check digit. SKUs are vendor-specific, so they are scoped by brand.
+
+Price lists give the UPC of the single cigar ("UPC EACH") while records
+are per packaging, so each identifier is qualified by box count: the
+20-count box and the 5-pack of one cigar share a UPC but stay separate.
+"""
+
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from size_parser import parse_size
+
+UPC_LEADING_RE = re.compile(r'[\d\s-]+')
+SKU_RE = re.compile(r'[A-Z0-9][A-Z0-9 ./-]*')
+
+
+def gtin_check_valid(digits: str) -> bool:
+    """GS1 mod-10 check digit; weights run from the right so zero padding is neutral."""
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(reversed(digits[:-1]), start=1))
+    return (10 - total % 10) % 10 == int(digits[-1])
+
+
+def normalize_upc(value) -> Tuple[Optional[str], bool]:
+    """(GTIN-14, False) for a valid UPC/EAN, else (None, invalid).
+
+    invalid is True when the value looked like a code but had the wrong
+    length or check digit, False when it was blank or text ('- None -').
+    Accepts '818578010075.0', '076622-026001' and '843182101048 (unit is tin)'.
+    """
+    if value is None:
+        return None, False
+    text = re.sub(r'\.0+$', '', str(value).strip())
+    match = UPC_LEADING_RE.match(text)
+    if not match:
+        return None, False
+    digits = re.sub(r'\D', '', match.group())
+    if not digits:
+        return None, False
+    if not 8 <= len(digits) <= 14 or not gtin_check_valid(digits):
+        return None, True
+    return digits.zfill(14), False
+
+
+def normalize_sku(value) -> Optional[str]:
+    """Uppercase alphanumeric SKU ('126010.0' -> '126010', 'Q-01-82-003' -> 'Q0182003').
+
+    Values with other characters are OCR or layout debris and are ignored.
+    """
+    if value is None:
+        return None
+    text = re.sub(r'\.0+$', '', str(value).strip().upper())
+    if not SKU_RE.fullmatch(text) or not re.search(r'\d', text):
+        return None
+    return re.sub(r'[^A-Z0-9]', '', text)
+
+
+def record_size(cigar: Dict) -> Tuple[Optional[float], Optional[int]]:
+    """(length, ring gauge), preferring the size string over stored fields."""
+    length, ring_gauge = parse_size(cigar.get('size'))
+    if length and ring_gauge:
+        return length, ring_gauge
+    return cigar.get('length'), cigar.get('ring_gauge')
+
+
+def record_identifiers(cigar: Dict) -> Tuple[List[str], bool]:
+    """(identifiers, invalid_upc) of a record, each qualified by box count."""
+    packaging = f"/{cigar['box_count']}" if cigar.get('box_count') else ""
+    identifiers = []
+
+    upc, invalid = normalize_upc(cigar.get('upc'))
+    if upc:
+        identifiers.append(f"upc:{upc}{packaging}")
+
+    sku = normalize_sku(cigar.get('sku'))
+    if sku and cigar.get('brand'):
+        identifiers.append(f"sku:{cigar['brand'].lower()}:{sku}{packaging}")
+
+    return identifiers, invalid
+
+
+class IdentifierIndex:
+    """Union of records that share an identifier, in insertion order.
+
+    add() is O(1) per identifier: a dict lookup finds the group already
+    holding it. A record whose size disagrees with that group is not
+    joined and is kept as a conflict instead.
+    """
+
+    def __init__(self):
+        self.owner: Dict[str, int] = {}        # identifier -> first position seen
+        self.parent: Dict[int, int] = {}
+        self.sizes: Dict[int, Tuple] = {}      # group root -> (length, ring gauge)
+        self.conflicts: List[Dict] = []
+        self.invalid_upcs = 0
+
+    def find(self, position: int) -> int:
+        root = position
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[position] != root:
+            self.parent[position], position = root, self.parent[position]
+        return root
+
+    def add(self, position: int, cigar: Dict):
+        identifiers, invalid = record_identifiers(cigar)
+        self.invalid_upcs += invalid
+        self.parent[position] = position
+        size = record_size(cigar)
+        self.sizes[position] = size
+
+        for identifier in identifiers:
+            if identifier not in self.owner:
+                self.owner[identifier] = position
+                continue
+
+            root = self.find(self.owner[identifier])
+            mine = self.find(position)
+            if root == mine:
+                continue
+
+            theirs = self.sizes[root]
+            ours = self.sizes[mine]
+            if all(theirs) and all(ours) and theirs != ours:
+                self.conflicts.append({
+                    "identifier": identifier,
+                    "positions": [self.owner[identifier], position],
+                    "sizes": [list(theirs), list(ours)],
+                })
+                continue
+
+            # The earlier group stays the canonical one
+            first, second = sorted((root, mine))
+            self.parent[second] = first
+            if not all(self.sizes[first]):
+                self.sizes[first] = self.sizes[second]
+
+    def groups(self) -> List[List[int]]:
+        """Positions grouped by root, ordered by first member."""
+        groups = {}
+        for position in sorted(self.parent):
+            groups.setdefault(self.find(position), []).append(position)
+        return list(groups.values())
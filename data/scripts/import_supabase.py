@@ -7,9 +7,13 @@ Requires SUPABASE_URL and SUPABASE_KEY environment variables.
 import json
 import os
 import sys
+import time
+import random
+import hashlib
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterable, Iterator, List, Optional
 
 try:
     from supabase import create_client, Client
@@ -17,166 +21,426 @@ except ImportError:
     print("Supabase client not installed. Run: pip install supabase")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+import codec
+from db_rows import cigar_record
+from record_io import find_records, iter_records, read_metadata
+
+
+# Cigar upsert batching: requests are capped by rows and payload bytes, and
+# the row target is steered toward TARGET_BATCH_SECONDS per request.
+INITIAL_BATCH_ROWS = 100
+MIN_BATCH_ROWS = 25
+MAX_BATCH_ROWS = 1000
+MAX_BATCH_BYTES = 512 * 1024
+TARGET_BATCH_SECONDS = 1.0
+DEFAULT_WORKERS = 4
+
+# Failed batches: transient errors are retried with exponential backoff,
+# anything else is bisected down to the records that fail on their own. A
+# transient error that outlasts the retries stops the import (ImportStalled);
+# the checkpointed manifest lets the next run resume from there.
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 0.5
+TRANSIENT_CODES = {"408", "429", "500", "502", "503", "504", "40001", "40P01", "53300"}
+
+# The manifest is checkpointed every this many stored batches, so an
+# interrupted import resumes after the last stored batch.
+CHECKPOINT_BATCHES = 10
+
+MANIFEST_FILENAME = ".import_manifest.json"
+
+
+class AdaptiveBatcher:
+    """Splits a record stream into upsert batches.
+    
+    A batch closes when it reaches the current row target or MAX_BATCH_BYTES
+    of JSON payload. observe() feeds back each request's latency and moves
+    the row target toward what fits in TARGET_BATCH_SECONDS. Batches are cut
+    lazily, so later batches use the adjusted target.
+    """
+    
+    def __init__(self, rows: int = INITIAL_BATCH_ROWS, max_bytes: int = MAX_BATCH_BYTES,
+                 target_seconds: float = TARGET_BATCH_SECONDS):
+        self.rows = rows
+        self.max_bytes = max_bytes
+        self.target_seconds = target_seconds
+    
+    def batches(self, records: Iterable[Dict]) -> Iterator[List[Dict]]:
+        batch, size = [], 2  # "[]"
+        for record in records:
+            record_size = len(codec.dumps(record, compact=True)) + 1
+            if batch and (len(batch) >= self.rows or size + record_size > self.max_bytes):
+                yield batch
+                batch, size = [], 2
+            batch.append(record)
+            size += record_size
+        if batch:
+            yield batch
+    
+    def observe(self, rows: int, seconds: float):
+        """Adjust the row target from one request's size and latency."""
+        if rows <= 0 or seconds <= 0:
+            return
+        fits = int(self.target_seconds * rows / seconds)
+        # Halfway toward the estimate, to damp noisy latencies
+        self.rows = max(MIN_BATCH_ROWS, min(MAX_BATCH_ROWS, (self.rows + fits) // 2))
+
+
+class ImportManifest:
+    """Fingerprints of the cigar rows last imported into one database, by slug.
+    
+    A fingerprint is a hash of the mapped row (cigar_record output), so any
+    change to an imported field, including a new brand_id/line_id, changes
+    it. Rows whose fingerprint matches the manifest are skipped; rows are
+    only recorded once their batch has been stored, so a failed batch is
+    retried on the next run. A manifest written for another target URL is
+    ignored.
+    
+    Only the first record for a slug is sent: the upsert is keyed on slug,
+    and Postgres rejects a statement that updates the same row twice.
+    """
+    
+    def __init__(self, path: Path, target: str, full: bool = False):
+        self.path = Path(path)
+        self.target = target
+        self.full = full
+        self.previous = {}
+        self.stored = {}
+        self.pending = {}
+        self.seen = set()
+        self.unchanged = 0
+        self.duplicates = 0
+        
+        if self.path.exists():
+            try:
+                manifest = codec.load(self.path)
+                if manifest.get("target") == target:
+                    self.previous = manifest.get("cigars", {})
+            except (ValueError, OSError):
+                self.previous = {}
+    
+    @staticmethod
+    def fingerprint(record: Dict) -> str:
+        # Always stdlib json: fingerprints must not change with the codec backend
+        payload = json.dumps(record, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha1(payload.encode()).hexdigest()
+    
+    def changed(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        """Yield the records that are new or differ from the manifest."""
+        for record in records:
+            slug = record.get("slug")
+            if slug is None:
+                yield record
+                continue
+            
+            if slug in self.seen:
+                self.duplicates += 1
+                continue
+            
+            digest = self.fingerprint(record)
+            self.seen.add(slug)
+            if not self.full and self.previous.get(slug) == digest:
+                self.unchanged += 1
+                continue
+            
+            self.pending[slug] = digest
+            yield record
+    
+    def is_new(self, record: Dict) -> bool:
+        return record.get("slug") not in self.previous
+    
+    def commit(self, records: List[Dict]):
+        """Record the fingerprints of a batch that was stored."""
+        for record in records:
+            slug = record.get("slug")
+            if slug in self.pending:
+                self.stored[slug] = self.pending.pop(slug)
+    
+    def removed(self) -> List[str]:
+        """Slugs imported previously but absent from this catalog."""
+        return sorted(slug for slug in self.previous if slug not in self.seen)
+    
+    def save(self, complete: bool = True):
+        """Write the manifest. A checkpoint (complete=False) keeps every
+        previous entry, since slugs not reached yet are not removals."""
+        if complete:
+            cigars = {slug: digest for slug, digest in self.previous.items() if slug in self.seen}
+        else:
+            cigars = dict(self.previous)
+        cigars.update(self.stored)
+        
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        codec.dump({"target": self.target, "cigars": cigars}, tmp_path, compact=True, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class ImportStalled(Exception):
+    """A cigar batch kept failing with a transient error after every retry."""
+
+
+def is_transient(error: Exception) -> bool:
+    """True for errors worth retrying as-is: network failures, timeouts,
+    throttling/5xx responses and Postgres serialization/deadlock errors."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    name = type(error).__name__
+    if any(word in name for word in ("Timeout", "Connect", "Network", "Transport", "Protocol")):
+        return True
+    return str(getattr(error, "code", "")) in TRANSIENT_CODES
+
 
 class SupabaseImporter:
-    def __init__(self, url: str, key: str, dry_run: bool = False):
-        self.client: Client = create_client(url, key)
+    def __init__(self, url: str, key: str, dry_run: bool = False, workers: int = DEFAULT_WORKERS,
+                 client: Optional[Client] = None, full: bool = False):
+        # One client for the whole run: its HTTP session (and connection pool)
+        # is shared by every request, including the concurrent cigar batches.
+        # A client can be passed in to point the importer at a local stand-in.
+        self.client: Client = client or create_client(url, key)
+        self.url = url
         self.dry_run = dry_run
+        self.workers = max(1, workers)
+        self.full = full
+        self.manifest: Optional[ImportManifest] = None
         self.stats = {
             "brands_inserted": 0,
             "lines_inserted": 0,
             "cigars_inserted": 0,
             "cigars_updated": 0,
+            "cigars_unchanged": 0,
+            "cigars_removed": 0,
+            "removed_slugs": [],
+            "duplicate_slugs": 0,
+            "cigars_failed": 0,
+            "retries": 0,
             "errors": [],
         }
     
+    def upsert(self, table: str, records: List[Dict]) -> List[Dict]:
+        """Upsert records into table on slug; returns the stored rows."""
+        result = self.client.table(table).upsert(records, on_conflict="slug").execute()
+        return result.data or []
+    
     def import_brands(self, brands: List[Dict]) -> Dict[str, str]:
-        """Import brands and return mapping of slug -> id."""
+        """Import brands in one bulk upsert and return mapping of slug -> id."""
         print(f"\nImporting {len(brands)} brands...")
-        brand_map = {}
         
-        for brand in brands:
-            record = {
+        records = [
+            {
                 "name": brand["name"],
                 "slug": brand["slug"],
                 "country": brand.get("country"),
             }
-            
-            if self.dry_run:
-                print(f"  [DRY RUN] Would insert brand: {brand['name']}")
-                brand_map[brand["slug"]] = brand["slug"]
-                continue
-            
-            try:
-                # Upsert based on slug
-                result = self.client.table("brands").upsert(
-                    record, 
-                    on_conflict="slug"
-                ).execute()
-                
-                if result.data:
-                    brand_map[brand["slug"]] = result.data[0]["id"]
-                    self.stats["brands_inserted"] += 1
-            except Exception as e:
-                self.stats["errors"].append(f"Brand {brand['name']}: {str(e)}")
+            for brand in brands
+        ]
+        
+        if self.dry_run:
+            for record in records:
+                print(f"  [DRY RUN] Would insert brand: {record['name']}")
+            return {record["slug"]: record["slug"] for record in records}
+        
+        if not records:
+            return {}
         
-        return brand_map
+        try:
+            rows = self.upsert("brands", records)
+        except Exception as e:
+            self.stats["errors"].append(f"Brands: {str(e)}")
+            return {}
+        
+        self.stats["brands_inserted"] += len(rows)
+        return {row["slug"]: row["id"] for row in rows}
     
     def import_lines(self, lines: List[Dict], brand_map: Dict[str, str]) -> Dict[str, str]:
-        """Import lines and return mapping of slug -> id."""
+        """Import lines in one bulk upsert and return mapping of slug -> id."""
         print(f"\nImporting {len(lines)} lines...")
-        line_map = {}
         
+        records = []
         for line in lines:
             brand_id = brand_map.get(line["brand_id"])
             if not brand_id:
                 continue
             
-            record = {
+            records.append({
                 "name": line["name"],
                 "slug": line["slug"],
                 "brand_id": brand_id,
-            }
-            
-            if self.dry_run:
-                print(f"  [DRY RUN] Would insert line: {line['name']}")
-                line_map[line["slug"]] = line["slug"]
-                continue
-            
+            })
+        
+        if self.dry_run:
+            for record in records:
+                print(f"  [DRY RUN] Would insert line: {record['name']}")
+            return {record["slug"]: record["slug"] for record in records}
+        
+        if not records:
+            return {}
+        
+        try:
+            rows = self.upsert("lines", records)
+        except Exception as e:
+            self.stats["errors"].append(f"Lines: {str(e)}")
+            return {}
+        
+        self.stats["lines_inserted"] += len(rows)
+        return {row["slug"]: row["id"] for row in rows}
+    
+    def cigar_record(self, cigar: Dict, brand_map: Dict[str, str], line_map: Dict[str, str]) -> Dict:
+        """Map a master-cigars entry to a cigars table row."""
+        return cigar_record(cigar, brand_map, line_map)
+    
+    def upsert_batch(self, records: List[Dict]) -> tuple:
+        """Upsert one cigar batch; returns (rows stored, seconds taken, retries).
+        
+        Transient errors are retried up to MAX_RETRIES times with jittered
+        exponential backoff; the last error, or any other error, is raised.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            start = time.perf_counter()
             try:
-                result = self.client.table("lines").upsert(
-                    record,
-                    on_conflict="slug"
-                ).execute()
-                
-                if result.data:
-                    line_map[line["slug"]] = result.data[0]["id"]
-                    self.stats["lines_inserted"] += 1
+                rows = self.upsert("cigars", records)
+                return len(rows), time.perf_counter() - start, attempt
             except Exception as e:
-                self.stats["errors"].append(f"Line {line['name']}: {str(e)}")
-        
-        return line_map
+                if attempt == MAX_RETRIES or not is_transient(e):
+                    raise
+                time.sleep(BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
     
-    def import_cigars(self, cigars: List[Dict], brand_map: Dict[str, str], line_map: Dict[str, str]):
-        """Import cigars."""
-        print(f"\nImporting {len(cigars)} cigars...")
+    def import_cigars(self, cigars: Iterable[Dict], brand_map: Dict[str, str], line_map: Dict[str, str],
+                      total: Optional[int] = None):
+        """Import cigars.
         
-        batch_size = 100
-        batches = [cigars[i:i + batch_size] for i in range(0, len(cigars), batch_size)]
+        cigars may be a stream (e.g. from an NDJSON catalog). Batches are cut
+        by AdaptiveBatcher and up to self.workers of them are in flight at
+        once over the shared client, so only that many batches are held at a
+        time. With a manifest, only new or changed rows are sent.
         
-        for batch_num, batch in enumerate(batches):
-            records = []
-            
-            for cigar in batch:
-                brand_slug = cigar.get("brand", "").lower().replace(" ", "-")
-                brand_id = brand_map.get(brand_slug)
-                
-                line_slug = f"{brand_slug}-{cigar.get('line', '').lower().replace(' ', '-')}" if cigar.get('line') else None
-                line_id = line_map.get(line_slug) if line_slug else None
-                
-                record = {
-                    "name": cigar.get("name"),
-                    "slug": cigar.get("slug"),
-                    "brand_id": brand_id,
-                    "line_id": line_id,
-                    "vitola": cigar.get("vitola"),
-                    "size": cigar.get("size"),
-                    "length": cigar.get("length"),
-                    "ring_gauge": cigar.get("ring_gauge"),
-                    "box_count": cigar.get("box_count"),
-                    "wholesale_price": cigar.get("wholesale_price"),
-                    "msrp_single": cigar.get("msrp_single"),
-                    "msrp_box": cigar.get("msrp_box"),
-                    "wrapper": cigar.get("wrapper"),
-                    "country": cigar.get("country"),
-                    "upc": cigar.get("upc"),
-                    "sku": cigar.get("sku"),
-                    "source": cigar.get("source"),
-                }
+        A batch that fails with a non-transient error is split in half and
+        both halves resubmitted, down to single records, so one bad row only
+        costs itself. A transient error that outlasts the retries is not the
+        rows' fault, so nothing is bisected: no further batches are sent, the
+        ones in flight are collected and ImportStalled is raised. Stored
+        batches are checkpointed into the manifest.
+        """
+        if total is None:
+            total = len(cigars)
+        print(f"\nImporting {total} cigars...")
+        
+        batcher = AdaptiveBatcher()
+        records = (self.cigar_record(cigar, brand_map, line_map) for cigar in cigars)
+        if self.manifest:
+            records = self.manifest.changed(records)
+        
+        def count(batch: List[Dict]):
+            if not self.manifest:
+                self.stats["cigars_inserted"] += len(batch)
+                return
+            new = sum(1 for record in batch if self.manifest.is_new(record))
+            self.stats["cigars_inserted"] += new
+            self.stats["cigars_updated"] += len(batch) - new
+        
+        def finish():
+            if self.manifest:
+                self.stats["cigars_unchanged"] = self.manifest.unchanged
+                self.stats["duplicate_slugs"] = self.manifest.duplicates
+                self.stats["removed_slugs"] = self.manifest.removed()
+                self.stats["cigars_removed"] = len(self.stats["removed_slugs"])
+        
+        if self.dry_run:
+            for batch_num, batch in enumerate(batcher.batches(records)):
+                print(f"  [DRY RUN] Would insert batch {batch_num + 1} ({len(batch)} cigars)")
+                count(batch)
+            finish()
+            return
+        
+        stored_batches = 0
+        stalled = None
+        
+        def collect(done):
+            nonlocal stored_batches, stalled
+            for future in sorted(done, key=lambda f: in_flight[f][0]):
+                batch_num, batch = in_flight.pop(future)
+                try:
+                    _, seconds, retries = future.result()
+                except Exception as e:
+                    if is_transient(e):
+                        self.stats["errors"].append(f"Batch {batch_num + 1}: {len(batch)} cigars not stored: {str(e)}")
+                        stalled = stalled or ImportStalled(f"Batch {batch_num + 1} failed after {MAX_RETRIES} retries: {e}")
+                    elif len(batch) > 1:
+                        half = len(batch) // 2
+                        print(f"  Batch {batch_num + 1}: {len(batch)} cigars failed, splitting")
+                        for part in (batch[:half], batch[half:]):
+                            in_flight[pool.submit(self.upsert_batch, part)] = (batch_num, part)
+                    else:
+                        self.stats["cigars_failed"] += 1
+                        self.stats["errors"].append(f"Batch {batch_num + 1}, cigar {batch[0].get('slug')}: {str(e)}")
+                    continue
                 
-                # Remove None values
-                record = {k: v for k, v in record.items() if v is not None}
-                records.append(record)
-            
-            if self.dry_run:
-                print(f"  [DRY RUN] Would insert batch {batch_num + 1}/{len(batches)} ({len(records)} cigars)")
-                self.stats["cigars_inserted"] += len(records)
-                continue
-            
-            try:
-                result = self.client.table("cigars").upsert(
-                    records,
-                    on_conflict="slug"
-                ).execute()
+                self.stats["retries"] += retries
+                batcher.observe(len(batch), seconds)
+                count(batch)
+                if self.manifest:
+                    self.manifest.commit(batch)
+                print(f"  Batch {batch_num + 1}: {len(batch)} cigars ({seconds:.2f}s)")
                 
-                self.stats["cigars_inserted"] += len(result.data) if result.data else 0
-                print(f"  Batch {batch_num + 1}/{len(batches)}: {len(records)} cigars")
-            except Exception as e:
-                self.stats["errors"].append(f"Batch {batch_num + 1}: {str(e)}")
+                stored_batches += 1
+                if self.manifest and stored_batches % CHECKPOINT_BATCHES == 0:
+                    self.manifest.save(complete=False)
+        
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for batch_num, batch in enumerate(batcher.batches(records)):
+                if len(in_flight) >= self.workers:
+                    collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+                if stalled:
+                    break
+                in_flight[pool.submit(self.upsert_batch, batch)] = (batch_num, batch)
+            while in_flight:
+                collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+        
+        if stalled:
+            raise stalled
+        finish()
     
     def run(self, data_dir: Path):
-        """Run full import."""
+        """Run full import.
+        
+        Reads the JSON or NDJSON master files, whichever aggregate.py wrote
+        last. An NDJSON catalog is streamed into import_cigars rather than
+        loaded whole. Cigars unchanged since the last import into the same
+        URL are skipped (see ImportManifest) unless full=True.
+        """
         # Load data files
         print("Loading data files...")
         
-        with open(data_dir / "brands.json", 'r') as f:
-            brands_data = json.load(f)
-            brands = brands_data.get("brands", [])
+        brands = list(iter_records(find_records(data_dir, "brands"), key="brands"))
+        lines = list(iter_records(find_records(data_dir, "lines"), key="lines"))
         
-        with open(data_dir / "lines.json", 'r') as f:
-            lines_data = json.load(f)
-            lines = lines_data.get("lines", [])
+        cigars_path = find_records(data_dir, "master-cigars")
+        if cigars_path.suffix == ".ndjson":
+            total = read_metadata(cigars_path).get("total_cigars")
+            cigars = iter_records(cigars_path)
+            if total is None:
+                total = sum(1 for _ in iter_records(cigars_path))
+        else:
+            cigars = list(iter_records(cigars_path, key="cigars"))
+            total = len(cigars)
         
-        with open(data_dir / "master-cigars.json", 'r') as f:
-            cigars_data = json.load(f)
-            cigars = cigars_data.get("cigars", [])
+        print(f"Loaded: {len(brands)} brands, {len(lines)} lines, {total} cigars ({cigars_path.name})")
         
-        print(f"Loaded: {len(brands)} brands, {len(lines)} lines, {len(cigars)} cigars")
+        self.manifest = ImportManifest(data_dir / MANIFEST_FILENAME, self.url, full=self.full)
         
         # Import in order
         brand_map = self.import_brands(brands)
         line_map = self.import_lines(lines, brand_map)
-        self.import_cigars(cigars, brand_map, line_map)
+        try:
+            self.import_cigars(cigars, brand_map, line_map, total=total)
+        except BaseException:
+            # Keep what was stored so far; a re-run resumes from there
+            if not self.dry_run:
+                self.manifest.save(complete=False)
+            raise
+        
+        if not self.dry_run:
+            self.manifest.save()
         
         # Print summary
         print("\n" + "="*60)
@@ -184,7 +448,19 @@ class SupabaseImporter:
         print("="*60)
         print(f"Brands: {self.stats['brands_inserted']}")
         print(f"Lines: {self.stats['lines_inserted']}")
-        print(f"Cigars: {self.stats['cigars_inserted']}")
+        print(f"Cigars: {self.stats['cigars_inserted']} inserted, {self.stats['cigars_updated']} updated, "
+              f"{self.stats['cigars_unchanged']} unchanged, {self.stats['cigars_failed']} failed")
+        if self.stats["retries"]:
+            print(f"Retried requests: {self.stats['retries']}")
+        if self.stats["duplicate_slugs"]:
+            print(f"Skipped {self.stats['duplicate_slugs']} cigars whose slug repeats an earlier one")
+        
+        if self.stats["removed_slugs"]:
+            print(f"\nNo longer in catalog ({self.stats['cigars_removed']}, not deleted):")
+            for slug in self.stats["removed_slugs"][:10]:
+                print(f"  - {slug}")
+            if self.stats["cigars_removed"] > 10:
+                print(f"  ... and {self.stats['cigars_removed'] - 10} more")
         
         if self.stats["errors"]:
             print(f"\nErrors ({len(self.stats['errors'])}):")
@@ -213,9 +489,9 @@ def main():
     
     data_dir = Path(os.path.expanduser("~/Projects/boxbluebook/data"))
     
-    # Check if data files exist
-    required_files = ["brands.json", "lines.json", "master-cigars.json"]
-    missing = [f for f in required_files if not (data_dir / f).exists()]
+    # Check if data files exist (JSON or NDJSON)
+    required_files = ["brands", "lines", "master-cigars"]
+    missing = [f for f in required_files if find_records(data_dir, f) is None]
     
     if missing:
         print(f"Missing data files: {missing}")
@@ -227,8 +503,17 @@ def main():
         print("DRY RUN MODE - No data will be written")
         print("="*60)
     
-    importer = SupabaseImporter(url, key, dry_run=dry_run)
-    importer.run(data_dir)
+    workers = DEFAULT_WORKERS
+    if "--workers" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+    
+    importer = SupabaseImporter(url, key, dry_run=dry_run, workers=workers, full="--full" in sys.argv)
+    try:
+        importer.run(data_dir)
+    except ImportStalled as e:
+        print(f"\nImport stopped: {e}")
+        print("Stored batches are checkpointed; re-run to resume.")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
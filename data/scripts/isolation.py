@@ -0,0 +1,120 @@
+"""
+Run extraction calls in isolated subprocesses with a timeout and a memory cap.
+
+Each call gets its own process, started fresh and never reused, so a
+file that hangs the parser or exhausts memory costs at most its timeout
+and cannot take down the run. A child that overruns its timeout is
+killed with its whole process group (page-layout pool workers included).
+
+A memory limit, when given, caps the child's address space with
+RLIMIT_AS where the platform supports it. That counts virtual memory,
+not RSS: pdfplumber, pandas and a page-layout pool reserve far more
+than they touch, so a limit near the resident size kills files that
+would have finished. There is none by default.
+"""
+
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows: timeouts only
+    resource = None
+
+# Defaults for extract_pdf.py --isolate; override with --timeout / --memory-limit
+DEFAULT_TIMEOUT = 300
+DEFAULT_MEMORY_LIMIT_MB = None
+
+# Outcome statuses besides "ok"
+TIMEOUT = "timeout"
+KILLED = "killed"
+ERROR = "error"
+
+
+def _limit_memory(memory_limit_mb: Optional[int]):
+    if not memory_limit_mb or resource is None:
+        return
+    limit = memory_limit_mb << 20
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _child(conn, target: Callable, args: tuple, memory_limit_mb: Optional[int]):
+    if hasattr(os, "setsid"):
+        os.setsid()
+    _limit_memory(memory_limit_mb)
+    try:
+        outcome = ("ok", target(*args))
+    except MemoryError:
+        outcome = (KILLED, f"memory limit of {memory_limit_mb} MB exceeded")
+    except Exception as e:
+        outcome = (ERROR, str(e))
+    conn.send(outcome)
+    conn.close()
+
+
+def _kill(process):
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        process.kill()
+    process.join()
+
+
+def run_isolated(calls: Dict[str, tuple], target: Callable, workers: int = 1,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT,
+                 memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB) -> Iterator[Tuple[str, str, object]]:
+    """Run target(*args) for each key, args in calls, up to workers at a time.
+
+    Yields (key, status, value) as calls finish: ("ok", return value),
+    (ERROR, message) if target raised, (TIMEOUT, message) for a call
+    killed at its timeout, or (KILLED, message) for one that ran out of
+    memory or died without a result (a segfault, the OOM killer).
+    """
+    queue = list(calls.items())
+    running = {}  # result connection -> (key, process, started)
+
+    while queue or running:
+        while queue and len(running) < workers:
+            key, args = queue.pop(0)
+            parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_child, args=(child_conn, target, args, memory_limit_mb),
+                                              daemon=False)
+            process.start()
+            child_conn.close()
+            running[parent_conn] = (key, process, time.monotonic())
+
+        wait_for = None
+        if timeout:
+            now = time.monotonic()
+            wait_for = max(0.0, min(started + timeout - now for _, _, started in running.values()))
+
+        for conn in wait(list(running), timeout=wait_for):
+            key, process, _ = running.pop(conn)
+            try:
+                status, value = conn.recv()
+            except (EOFError, OSError):
+                process.join()
+                status, value = KILLED, f"worker exited with code {process.exitcode} and no result"
+            else:
+                process.join()
+            conn.close()
+            yield key, status, value
+
+        if timeout:
+            now = time.monotonic()
+            for conn, (key, process, started) in list(running.items()):
+                if now - started >= timeout:
+                    del running[conn]
+                    _kill(process)
+                    conn.close()
+                    yield key, TIMEOUT, f"timed out after {timeout:g}s"
@@ -0,0 +1,151 @@
+"""
+Persistent cache of pdfplumber page layout output.
+
+Laying out a PDF (extract_tables / extract_text / extract_words) costs far
+more than parsing the rows that come out of it. This cache keeps the
+per-page layout of each document, keyed by the PDF's content hash, the
+layout mode and the settings passed to pdfplumber, so re-running an
+extractor after a row-parsing change skips pdfplumber entirely.
+
+Entries are files under <output_dir>/.layout_cache, one per (document,
+mode, settings). Each page is its own length-prefixed marshal + zlib
+frame and an empty frame ends the entry, so pages are written as they
+are laid out and read back one at a time: neither side holds the whole
+document. Delete the directory to clear it.
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import struct
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from extract_cache import file_hash
+
+LAYOUT_CACHE_DIRNAME = ".layout_cache"
+
+MAGIC = b"LAYOUT2\n"
+FRAME_HEADER = struct.Struct("<I")
+
+
+def settings_key(mode: str, settings: Optional[Dict]) -> str:
+    """Short hash of everything besides the PDF that shapes the layout:
+    mode, pdfplumber settings, pdfplumber version and marshal format."""
+    try:
+        import pdfplumber
+        version = pdfplumber.__version__
+    except (ImportError, AttributeError):
+        version = "unknown"
+    payload = json.dumps([mode, settings or {}, version, marshal.version, sys.version_info[:2]],
+                         sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+class LayoutCache:
+    """Per-document page layouts on disk."""
+
+    def __init__(self, output_dir: Path):
+        self.dir = Path(output_dir) / LAYOUT_CACHE_DIRNAME
+        self.hits = 0
+        self.misses = 0
+        self._hashes = {}
+
+    def path_for(self, filepath: Path, mode: str, settings: Optional[Dict]) -> Path:
+        filepath = Path(filepath)
+        if filepath not in self._hashes:
+            self._hashes[filepath] = file_hash(filepath)
+        return self.dir / f"{self._hashes[filepath][:32]}-{mode}-{settings_key(mode, settings)}.layout"
+
+    def load(self, filepath: Path, mode: str, settings: Optional[Dict] = None) -> Optional[Iterator]:
+        """Iterator over the page layouts of filepath, or None if not cached.
+
+        The entry's frame structure is checked up front, so a truncated or
+        foreign file counts as a miss rather than failing halfway through.
+        """
+        path = self.path_for(filepath, mode, settings)
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.misses += 1
+            return None
+        if not _complete(f):
+            f.close()
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _read_pages(f)
+
+    def store(self, filepath: Path, mode: str, settings: Optional[Dict], pages) -> Iterator:
+        """Pass pages through, writing each to the cache as it goes by.
+
+        The entry is written to a temporary file and moved into place only
+        once pages is exhausted, so readers never see a partial entry. If
+        the caller stops early, or a layout holds a type marshal cannot
+        write, nothing is stored.
+        """
+        path = self.path_for(filepath, mode, settings)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        stored = False
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(MAGIC)
+                for layout in pages:
+                    if f is not None:
+                        try:
+                            _write_frame(f, zlib.compress(marshal.dumps(layout), 1))
+                        except ValueError:
+                            f.close()  # leave this document uncached
+                            f = None
+                    yield layout
+                if f is not None:
+                    _write_frame(f, b"")
+                    stored = True
+            if stored:
+                os.replace(tmp_path, path)
+        finally:
+            if not stored:
+                tmp_path.unlink(missing_ok=True)
+
+    def report(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def _write_frame(f, data: bytes):
+    f.write(FRAME_HEADER.pack(len(data)))
+    f.write(data)
+
+
+def _complete(f) -> bool:
+    """True if f holds MAGIC and whole frames up to the end frame at EOF."""
+    try:
+        if f.read(len(MAGIC)) != MAGIC:
+            return False
+        size = os.fstat(f.fileno()).st_size
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return False
+            length, = FRAME_HEADER.unpack(header)
+            if length == 0:
+                return f.tell() == size
+            if f.seek(length, os.SEEK_CUR) > size:
+                return False
+    except OSError:
+        return False
+    finally:
+        f.seek(len(MAGIC))
+
+
+def _read_pages(f) -> Iterator:
+    with f:
+        while True:
+            length, = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+            if length == 0:
+                return
+            yield marshal.loads(zlib.decompress(f.read(length)))
@@ -0,0 +1,163 @@
+"""
+Per-layout pdfplumber table settings for the PDF extractors.
+
+page.extract_tables() with default settings runs full line and edge
+detection over the whole page. Vendor sheets keep the same layout from
+year to year, so a layout profile pins it down instead: a crop box
+around the tables and explicit column x-positions, leaving pdfplumber
+only the row splits to find.
+
+Profiles are keyed by layout_key(filename), the filename without years
+or punctuation, so "La Flor Dominicana Price List - 2025.pdf" and next
+year's sheet share one. They come from config.PDF_LAYOUT_PROFILES
+(reviewed, takes precedence) and from <output_dir>/.layout_profiles.json,
+written by learning mode (extract_pdf.py --learn-layout-profiles).
+
+learn_layout_profile() derives a profile from a document auto-detection
+already handles, and keeps it only if the explicit settings reproduce
+its auto-detected data tables on every page.
+"""
+
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pdfplumber
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import PDF_LAYOUT_PROFILES
+import codec
+
+# A dotfile, so aggregate.py does not take it for a record file
+LAYOUT_PROFILES_FILENAME = ".layout_profiles.json"
+LEGACY_FILENAME = "layout_profiles.json"
+
+# Points added around the union of table boxes when cropping
+CROP_PADDING = 2.0
+
+# Horizontal strategies tried when learning, cheapest first
+HORIZONTAL_STRATEGIES = ("text", "lines")
+
+
+def layout_key(filename: str) -> str:
+    """'La Flor Dominicana Price List - 2025.pdf' -> 'la flor dominicana price list'."""
+    stem = re.sub(r'\.pdf$', '', filename, flags=re.IGNORECASE)
+    stem = re.sub(r'(?<!\d)(?:19|20)\d{2}(?!\d)', ' ', stem)
+    return re.sub(r'[^a-z0-9]+', ' ', stem.lower()).strip()
+
+
+def clip_bbox(crop: List[float], bbox: Tuple[float, ...]) -> Optional[Tuple[float, ...]]:
+    """crop clipped to bbox, or None if they do not overlap."""
+    x0, top = max(crop[0], bbox[0]), max(crop[1], bbox[1])
+    x1, bottom = min(crop[2], bbox[2]), min(crop[3], bbox[3])
+    if x0 >= x1 or top >= bottom:
+        return None
+    return (x0, top, x1, bottom)
+
+
+def profile_tables(page, profile: Dict) -> List:
+    """extract_tables() for one page under a layout profile."""
+    if profile.get("crop"):
+        bbox = clip_bbox(profile["crop"], page.bbox)
+        if bbox is None:
+            return []
+        page = page.crop(bbox)
+    return page.extract_tables(profile["table_settings"])
+
+
+def is_data_table(table) -> bool:
+    """False for the one-column or empty "tables" auto-detection makes of
+    logos, rules and other page decoration."""
+    rows = table.extract()
+    return any(len(row) > 1 for row in rows) and any(cell for row in rows for cell in row)
+
+
+def learn_layout_profile(filepath: Path) -> Optional[Dict]:
+    """Derive a layout profile from filepath's auto-detected tables.
+
+    Decoration (see is_data_table) is left out. The crop box is the union
+    of the remaining tables' boxes and the column positions the union of
+    their cell edges. Each horizontal strategy is tried in turn against
+    the whole document; the first whose output matches the auto-detected
+    data tables exactly is returned. None if there are no data tables or
+    no strategy reproduces them.
+    """
+    with pdfplumber.open(filepath) as pdf:
+        detected = []
+        boxes = []
+        columns = set()
+        for page in pdf.pages:
+            tables = [table for table in page.find_tables() if is_data_table(table)]
+            detected.append([table.extract() for table in tables])
+            for table in tables:
+                boxes.append(table.bbox)
+                for cell in table.cells:
+                    columns.update((round(cell[0], 2), round(cell[2], 2)))
+
+        if not boxes:
+            return None
+
+        crop = [
+            round(min(box[0] for box in boxes) - CROP_PADDING, 2),
+            round(min(box[1] for box in boxes) - CROP_PADDING, 2),
+            round(max(box[2] for box in boxes) + CROP_PADDING, 2),
+            round(max(box[3] for box in boxes) + CROP_PADDING, 2),
+        ]
+
+        for strategy in HORIZONTAL_STRATEGIES:
+            profile = {
+                "crop": crop,
+                "table_settings": {
+                    "vertical_strategy": "explicit",
+                    "explicit_vertical_lines": sorted(columns),
+                    "horizontal_strategy": strategy,
+                },
+            }
+            if all(profile_tables(page, profile) == tables for page, tables in zip(pdf.pages, detected)):
+                profile["learned_from"] = filepath.name
+                return profile
+
+    return None
+
+
+class LayoutProfiles:
+    """Configured and learned layout profiles, by layout_key."""
+
+    def __init__(self, output_dir: Path):
+        self.path = Path(output_dir) / LAYOUT_PROFILES_FILENAME
+        legacy = Path(output_dir) / LEGACY_FILENAME
+        if legacy.exists() and not self.path.exists():
+            legacy.rename(self.path)
+        self.learned = {}
+        if self.path.exists():
+            try:
+                self.learned = codec.load(self.path)
+            except (ValueError, OSError):
+                self.learned = {}
+        self.added = []
+
+    def profile_for(self, filename: str) -> Optional[Dict]:
+        key = layout_key(filename)
+        return PDF_LAYOUT_PROFILES.get(key) or self.learned.get(key)
+
+    def add(self, filename: str, profile: Dict):
+        self.learned[layout_key(filename)] = profile
+        self.added.append(filename)
+
+    def save(self):
+        codec.dump(self.learned, self.path, sort_keys=True)
+
+    def version(self) -> str:
+        """Short hash of the learned profiles, for the extraction cache version."""
+        payload = json.dumps(self.learned, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:8]
+
+    def report(self) -> Dict:
+        return {
+            "configured": len(PDF_LAYOUT_PROFILES),
+            "learned": len(self.learned),
+            "added": sorted(self.added),
+        }
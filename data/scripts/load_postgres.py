@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Bulk-load cigar data straight into PostgreSQL, bypassing the REST API.
+For bootstrapping and disaster recovery of the database/schema.sql tables.
+Requires DATABASE_URL (a libpq connection string) and psycopg2 unless
+--dry-run.
+
+The master files are COPYed into temporary staging tables, then merged into
+brands, lines and cigars with one set-based INSERT ... ON CONFLICT per
+table; brand_id and line_id are resolved by joining on slug in SQL.
+"""
+
+import csv
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+sys.path.insert(0, str(Path(__file__).parent))
+from db_rows import cigar_record
+from record_io import find_records, iter_records
+
+# Staging tables live for one transaction
+STAGING_DDL = """
+CREATE TEMP TABLE stage_brands (
+    slug text, name text, country text
+) ON COMMIT DROP;
+CREATE TEMP TABLE stage_lines (
+    slug text, brand_slug text, name text
+) ON COMMIT DROP;
+CREATE TEMP TABLE stage_cigars (
+    ord integer, brand_slug text, line_slug text, name text, slug text,
+    full_name text, vitola text, length_inches numeric, ring_gauge integer,
+    box_count integer, msrp_per_cigar numeric, msrp_per_box numeric, wrapper text
+) ON COMMIT DROP;
+"""
+
+STAGING_COLUMNS = {
+    "stage_brands": ["slug", "name", "country"],
+    "stage_lines": ["slug", "brand_slug", "name"],
+    "stage_cigars": ["ord", "brand_slug", "line_slug", "name", "slug", "full_name", "vitola",
+                     "length_inches", "ring_gauge", "box_count", "msrp_per_cigar", "msrp_per_box",
+                     "wrapper"],
+}
+
+# Merges follow the unique keys in database/schema.sql: brands(slug),
+# lines(brand_id, slug), cigars(line_id, slug). Within a key the first
+# staged row wins, as in aggregation.
+MERGE_BRANDS = """
+INSERT INTO brands (name, slug, country_of_origin)
+SELECT DISTINCT ON (slug) LEFT(name, 255), LEFT(slug, 255), LEFT(country, 100)
+FROM stage_brands
+WHERE slug IS NOT NULL AND name IS NOT NULL
+ORDER BY slug
+ON CONFLICT (slug) DO UPDATE SET
+    name = EXCLUDED.name,
+    country_of_origin = COALESCE(EXCLUDED.country_of_origin, brands.country_of_origin),
+    updated_at = NOW()
+"""
+
+MERGE_LINES = """
+INSERT INTO lines (brand_id, name, slug)
+SELECT DISTINCT ON (b.id, s.slug) b.id, LEFT(s.name, 255), LEFT(s.slug, 255)
+FROM stage_lines s
+JOIN brands b ON b.slug = s.brand_slug
+WHERE s.slug IS NOT NULL AND s.name IS NOT NULL
+ORDER BY b.id, s.slug
+ON CONFLICT (brand_id, slug) DO UPDATE SET
+    name = EXCLUDED.name,
+    updated_at = NOW()
+"""
+
+MERGE_CIGARS = """
+INSERT INTO cigars (line_id, name, slug, full_name, vitola, length_inches, ring_gauge,
+                    box_count, msrp_per_cigar, msrp_per_box, wrapper)
+SELECT DISTINCT ON (l.id, s.slug)
+    l.id, LEFT(s.name, 255), LEFT(s.slug, 255), LEFT(s.full_name, 500),
+    LEFT(COALESCE(s.vitola, ''), 100), s.length_inches, s.ring_gauge,
+    s.box_count, s.msrp_per_cigar, s.msrp_per_box, LEFT(s.wrapper, 100)
+FROM stage_cigars s
+JOIN brands b ON b.slug = s.brand_slug
+JOIN lines l ON l.brand_id = b.id AND l.slug = s.line_slug
+WHERE s.slug IS NOT NULL AND s.name IS NOT NULL
+ORDER BY l.id, s.slug, s.ord
+ON CONFLICT (line_id, slug) DO UPDATE SET
+    name = EXCLUDED.name,
+    full_name = EXCLUDED.full_name,
+    vitola = EXCLUDED.vitola,
+    length_inches = EXCLUDED.length_inches,
+    ring_gauge = EXCLUDED.ring_gauge,
+    box_count = EXCLUDED.box_count,
+    msrp_per_cigar = EXCLUDED.msrp_per_cigar,
+    msrp_per_box = EXCLUDED.msrp_per_box,
+    wrapper = EXCLUDED.wrapper,
+    updated_at = NOW()
+"""
+
+# cigars.line_id is NOT NULL, so cigars without a resolvable line are not loaded
+UNMATCHED_CIGARS = """
+SELECT
+    count(*) FILTER (WHERE s.line_slug IS NULL),
+    count(*) FILTER (WHERE s.line_slug IS NOT NULL AND l.id IS NULL)
+FROM stage_cigars s
+LEFT JOIN brands b ON b.slug = s.brand_slug
+LEFT JOIN lines l ON l.brand_id = b.id AND l.slug = s.line_slug
+"""
+
+
+class PostgresLoader:
+    def __init__(self, dsn: str, dry_run: bool = False):
+        self.dsn = dsn
+        self.dry_run = dry_run
+        self.stats = {
+            "brands_staged": 0,
+            "lines_staged": 0,
+            "cigars_staged": 0,
+            "brands_loaded": 0,
+            "lines_loaded": 0,
+            "cigars_loaded": 0,
+            "cigars_without_line": 0,
+            "cigars_unmatched_line": 0,
+            "cigars_duplicate_slug": 0,
+        }
+
+    def brand_rows(self, brands: List[Dict]) -> Iterable[tuple]:
+        for brand in brands:
+            yield brand["slug"], brand["name"], brand.get("country")
+
+    def line_rows(self, lines: List[Dict]) -> Iterable[tuple]:
+        for line in lines:
+            yield line["slug"], line["brand_id"], line["name"]
+
+    def cigar_rows(self, cigars: Iterable[Dict], brand_map: Dict[str, str],
+                   line_map: Dict[str, str]) -> Iterable[tuple]:
+        """Staging rows from the same mapping the REST importer uses.
+
+        With slug -> slug maps, brand_id/line_id in the mapped record are the
+        brand and line slugs; the database ids are joined in SQL.
+        """
+        for ord_, cigar in enumerate(cigars):
+            record = cigar_record(cigar, brand_map, line_map)
+            if cigar.get("line") and record.get("vitola"):
+                parts = (cigar.get("brand"), cigar.get("line"), record["vitola"])
+            else:
+                parts = (cigar.get("brand"), record.get("name"))
+            full_name = " - ".join(part for part in parts if part)
+            yield (
+                ord_, record.get("brand_id"), record.get("line_id"), record.get("name"), record.get("slug"),
+                full_name, record.get("vitola"), record.get("length"), record.get("ring_gauge"),
+                record.get("box_count"), record.get("msrp_single"), record.get("msrp_box"),
+                record.get("wrapper"),
+            )
+
+    def spool(self, rows: Iterable[tuple]) -> tuple:
+        """Write rows as COPY CSV to a spooled temp file; returns (file, row count).
+
+        None becomes an unquoted empty field, which COPY reads as NULL.
+        """
+        buffer = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024, mode='w+', newline='')
+        writer = csv.writer(buffer)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        buffer.seek(0)
+        return buffer, count
+
+    def copy(self, cur, table: str, rows: Iterable[tuple]) -> int:
+        buffer, count = self.spool(rows)
+        with buffer:
+            if not self.dry_run:
+                columns = ", ".join(STAGING_COLUMNS[table])
+                cur.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        return count
+
+    def load(self, cur, brands: List[Dict], lines: List[Dict], cigars: Iterable[Dict]):
+        brand_map = {brand["slug"]: brand["slug"] for brand in brands}
+        line_map = {line["slug"]: line["slug"] for line in lines}
+
+        if not self.dry_run:
+            cur.execute(STAGING_DDL)
+
+        self.stats["brands_staged"] = self.copy(cur, "stage_brands", self.brand_rows(brands))
+        self.stats["lines_staged"] = self.copy(cur, "stage_lines", self.line_rows(lines))
+        self.stats["cigars_staged"] = self.copy(cur, "stage_cigars", self.cigar_rows(cigars, brand_map, line_map))
+
+        if self.dry_run:
+            return
+
+        cur.execute(MERGE_BRANDS)
+        self.stats["brands_loaded"] = cur.rowcount
+        cur.execute(MERGE_LINES)
+        self.stats["lines_loaded"] = cur.rowcount
+        cur.execute(MERGE_CIGARS)
+        self.stats["cigars_loaded"] = cur.rowcount
+
+        cur.execute(UNMATCHED_CIGARS)
+        self.stats["cigars_without_line"], self.stats["cigars_unmatched_line"] = cur.fetchone()
+        self.stats["cigars_duplicate_slug"] = (
+            self.stats["cigars_staged"] - self.stats["cigars_loaded"]
+            - self.stats["cigars_without_line"] - self.stats["cigars_unmatched_line"]
+        )
+
+    def connect(self):
+        """Open the database connection. psycopg2 is imported here, so a
+        dry run works without it."""
+        try:
+            import psycopg2
+        except ImportError:
+            print("PostgreSQL driver not installed. Run: pip install psycopg2-binary")
+            sys.exit(1)
+        return psycopg2.connect(self.dsn)
+
+    def run(self, data_dir: Path) -> Dict:
+        """Load the master files in one transaction."""
+        print("Loading data files...")
+
+        brands = list(iter_records(find_records(data_dir, "brands"), key="brands"))
+        lines = list(iter_records(find_records(data_dir, "lines"), key="lines"))
+        cigars = iter_records(find_records(data_dir, "master-cigars"), key="cigars")
+
+        if self.dry_run:
+            self.load(None, brands, lines, cigars)
+        else:
+            conn = self.connect()
+            try:
+                with conn:
+                    with conn.cursor() as cur:
+                        self.load(cur, brands, lines, cigars)
+            finally:
+                conn.close()
+
+        print("\n" + "="*60)
+        print("POSTGRES LOAD SUMMARY")
+        print("="*60)
+        print(f"Staged: {self.stats['brands_staged']} brands, {self.stats['lines_staged']} lines, "
+              f"{self.stats['cigars_staged']} cigars")
+
+        if not self.dry_run:
+            print(f"Brands: {self.stats['brands_loaded']}")
+            print(f"Lines: {self.stats['lines_loaded']}")
+            print(f"Cigars: {self.stats['cigars_loaded']}")
+            print(f"Skipped cigars: {self.stats['cigars_without_line']} without a line, "
+                  f"{self.stats['cigars_unmatched_line']} with an unknown line, "
+                  f"{self.stats['cigars_duplicate_slug']} repeating a slug in the same line")
+
+        return self.stats
+
+
+def main():
+    dsn = os.environ.get("DATABASE_URL")
+    dry_run = "--dry-run" in sys.argv
+
+    if not dsn and not dry_run:
+        print("Missing DATABASE_URL.")
+        print("Set DATABASE_URL to a PostgreSQL connection string, or pass --dry-run.")
+        sys.exit(1)
+
+    data_dir = Path(os.path.expanduser("~/Projects/boxbluebook/data"))
+
+    # Check if data files exist (JSON or NDJSON)
+    required_files = ["brands", "lines", "master-cigars"]
+    missing = [f for f in required_files if find_records(data_dir, f) is None]
+
+    if missing:
+        print(f"Missing data files: {missing}")
+        print("Run aggregate.py first to generate these files.")
+        sys.exit(1)
+
+    if dry_run:
+        print("="*60)
+        print("DRY RUN MODE - Staging files only, no database connection")
+        print("="*60)
+
+    loader = PostgresLoader(dsn, dry_run=dry_run)
+    loader.run(data_dir)
+
+
+if __name__ == "__main__":
+    main()
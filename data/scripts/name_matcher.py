@@ -0,0 +1,179 @@
+"""
+Keyword matcher for classifying cigar names against config maps.
+Built once from VITOLA_MAP / WRAPPER_MAP / BRAND_ALIASES and shared by
+the extractors and aggregation.
+"""
+
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import BRAND_ALIASES, VITOLA_MAP, WRAPPER_MAP
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+_END = object()
+
+# Words joining a sub-brand to its brand ("MONTE BY MONTECRISTO")
+SUB_BRAND_CONNECTORS = {"by", "de", "of"}
+
+# A word glued to a trailing number ("MAD20", "ROB54")
+GLUED_RE = re.compile(r'([a-z]+)\d+')
+
+# Shortest token whose trailing "s" is taken for a plural ("TOROS", not "CT S")
+PLURAL_MIN_LENGTH = 4
+
+# Count words that make a preceding number a box count ("20 CT", "10 PC")
+COUNT_WORDS = {"ct", "count", "pc"}
+
+
+@lru_cache(maxsize=16384)
+def token_forms(token: str) -> Tuple[str, ...]:
+    """token, then what it may stand for: 'mad20' -> ('mad20', 'mad'),
+    'toros' -> ('toros', 'toro'), 'belicosos' -> ('belicosos', 'belicoso')."""
+    forms = [token]
+    glued = GLUED_RE.fullmatch(token)
+    if glued:
+        forms.append(glued.group(1))
+    for form in list(forms):
+        if len(form) >= PLURAL_MIN_LENGTH and form.endswith('s'):
+            forms.append(form[:-1])
+    return tuple(forms)
+
+
+class KeywordMatcher:
+    """Token trie over the keys of a {keyword: value} map.
+
+    match() tokenizes the text once and walks the trie from each token,
+    returning the value of the longest keyword found (leftmost on ties).
+    Keywords only match whole tokens, so "ct" does not hit "20CT" or
+    "selection", and the result does not depend on dict order. A count
+    word after a number ("20 CT") is a box count and matches nothing.
+
+    With inflected=True a token that is not a keyword as written may
+    also match as its singular or without a trailing number (see
+    token_forms), so "TOROS" and "MAD20" hit "toro" and "mad".
+    """
+
+    def __init__(self, mapping: Dict[str, str], inflected: bool = False):
+        self.inflected = inflected
+        self.root = {}
+        for key, value in mapping.items():
+            node = self.root
+            for token in TOKEN_RE.findall(key.lower()):
+                node = node.setdefault(token, {})
+            node[_END] = value
+
+    def match(self, text: str) -> Optional[str]:
+        if not text:
+            return None
+
+        tokens = TOKEN_RE.findall(str(text).lower())
+        return self.match_tokens([
+            "" if token in COUNT_WORDS and i and tokens[i - 1].isdigit() else token
+            for i, token in enumerate(tokens)
+        ])
+
+    def match_tokens(self, tokens: List[str]) -> Optional[str]:
+        """match() over text that is already split into lowercase tokens."""
+        return self.match_span(tokens)[0]
+
+    def match_span(self, tokens: List[str]) -> Tuple[Optional[str], int, int]:
+        """(value, start, end) of the longest keyword in tokens; (None, 0, 0) if none."""
+        best, best_start, best_end = None, 0, 0
+        forms = [token_forms(token) for token in tokens] if self.inflected else [(token,) for token in tokens]
+
+        for start in range(len(tokens)):
+            node = self.root
+            for i in range(start, len(tokens)):
+                node = next((node[form] for form in forms[i] if form in node), None)
+                if node is None:
+                    break
+                if _END in node and i + 1 - start > best_end - best_start:
+                    best, best_start, best_end = node[_END], start, i + 1
+
+        return best, best_start, best_end
+
+
+def title_words(words: List[str]) -> str:
+    """Join words, capitalizing the all-upper or all-lower ones.
+
+    Digit-led words ("180TH", "1844") and words already in mixed case
+    ("VegaFina") are kept as written; str.title() would make "180Th".
+    """
+    return ' '.join(
+        word if word[:1].isdigit() or not (word.isupper() or word.islower()) else word.capitalize()
+        for word in words
+    )
+
+
+class BrandIndex:
+    """Resolves raw brand strings to canonical brand names.
+
+    Exact alias (or canonical name) lookup first, then the longest alias
+    found as whole words in the string ("H UPMANN 1844 ANEJO"), then
+    title case. An alias found inside a longer string leaves the rest of
+    it as a sub-brand ("1844 Anejo"), which split() returns alongside the
+    canonical name. Results are memoized per raw string; strings that fell
+    through to title case are kept in fallbacks for reporting.
+    """
+
+    def __init__(self, aliases: Dict[str, str]):
+        self.exact = {}
+        for alias, canonical in aliases.items():
+            self.exact[self.key(alias)] = canonical
+            self.exact.setdefault(self.key(canonical), canonical)
+        self.matcher = KeywordMatcher(aliases)
+        self.fallbacks = {}
+        self.split = lru_cache(maxsize=None)(self._split)
+
+    @staticmethod
+    def key(text: str) -> str:
+        return ' '.join(TOKEN_RE.findall(text.lower()))
+
+    def resolve(self, brand: str) -> str:
+        return self.split(brand)[0]
+
+    def _split(self, brand: str) -> Tuple[str, str]:
+        """(canonical brand, sub-brand); the sub-brand is "" unless an alias
+        matched inside a longer string."""
+        canonical = self.exact.get(self.key(brand))
+        if canonical:
+            return canonical, ""
+
+        words = TOKEN_RE.findall(brand)
+        canonical, start, end = self.matcher.match_span([word.lower() for word in words])
+        if canonical:
+            rest = words[:start] + words[end:]
+            # "ROMEO BY ROMEO Y JULIETA": the connecting "by" is not part of the name
+            while rest and rest[0].lower() in SUB_BRAND_CONNECTORS:
+                rest.pop(0)
+            while rest and rest[-1].lower() in SUB_BRAND_CONNECTORS:
+                rest.pop()
+            return canonical, title_words(rest)
+
+        titled = brand.title()
+        # Re-resolving an earlier fallback's output is not a new fallback
+        if titled not in self.fallbacks.values():
+            self.fallbacks[brand] = titled
+        return titled, ""
+
+
+VITOLA_MATCHER = KeywordMatcher(VITOLA_MAP, inflected=True)
+WRAPPER_MATCHER = KeywordMatcher(WRAPPER_MAP, inflected=True)
+
+
+BRAND_INDEX = BrandIndex(BRAND_ALIASES)
+
+
+def match_vitola(text: str) -> Optional[str]:
+    """Standardized vitola named in text, if any."""
+    return VITOLA_MATCHER.match(text)
+
+
+def match_wrapper(text: str) -> Optional[str]:
+    """Standardized wrapper named in text, if any."""
+    return WRAPPER_MATCHER.match(text)
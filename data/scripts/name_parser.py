@@ -0,0 +1,107 @@
+"""
+Single-pass cigar name parser shared by the PDF and Excel extractors.
+
+parse_name() scans a product name once and returns everything the
+extractors used to pull out with separate regexes and keyword scans:
+brand prefix, line, vitola, wrapper, box count and an embedded size.
+"""
+
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from name_matcher import VITOLA_MATCHER, WRAPPER_MATCHER
+from size_parser import SIZE_RE, parse_size
+
+# Vitola words that end the line part of a name ("Le Bijou 1922 Toro" -> "Le Bijou 1922")
+LINE_STOP_WORDS = ("robusto", "toro", "churchill", "corona", "gordo", "torpedo", "belicoso", "lancero")
+
+# One alternation, tried left to right at each position: an embedded size,
+# the three box count forms, else a plain word token.
+SCAN_RE = re.compile(
+    rf'(?P<size>{SIZE_RE.pattern})'
+    r'|\((?P<paren>\d+)\)'                      # (20)
+    r'|\bBOX\s*(?:OF\s*)?(?P<box>\d+)'          # BOX 20, BOX OF 20,
+    r'(?:\s*(?:CT|COUNT|PC)\b)?'                #   BOX 20CT
+    r'|(?P<count>\d+)\s*(?:CT|COUNT|PC)'        # 20CT, 20 COUNT
+    r'|(?P<word>[^\W_]+)',
+    re.IGNORECASE,
+)
+
+
+class ParsedName(NamedTuple):
+    brand_prefix: Optional[str]
+    line: Optional[str]
+    vitola: Optional[str]
+    wrapper: Optional[str]
+    box_count: Optional[int]
+    size: Optional[str]
+    length: Optional[float]
+    ring_gauge: Optional[int]
+
+
+EMPTY = ParsedName(None, None, None, None, None, None, None, None)
+
+
+@lru_cache(maxsize=None)
+def brand_prefix_re(brand: str) -> re.Pattern:
+    """Compiled 'Brand -' prefix pattern, built once per brand."""
+    return re.compile(rf'^{re.escape(brand)}\s*[-–]?\s*', re.IGNORECASE)
+
+
+@lru_cache(maxsize=16384)
+def parse_name(name: str, brand: Optional[str] = None) -> ParsedName:
+    """Parse a cigar product name in one scan.
+
+    Box count prefers '(20)' over 'BOX 20' over '20 CT' wherever they
+    appear. Vitola and wrapper are the longest whole-word keyword matches.
+    Line is the text after the brand prefix up to the first LINE_STOP_WORDS
+    vitola, if longer than two characters.
+    """
+    if not name:
+        return EMPTY
+
+    text = str(name).strip()
+    prefix = None
+    start = 0
+    if brand:
+        match = brand_prefix_re(str(brand)).match(text)
+        if match:
+            prefix = match.group(0).strip(' -–') or None
+            start = match.end()
+
+    words = []
+    stop = None
+    size = None
+    counts = {}
+
+    for match in SCAN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == 'word':
+            word = match.group('word').lower()
+            if stop is None and match.start() > start and text[match.start() - 1].isspace() \
+                    and word.startswith(LINE_STOP_WORDS):
+                stop = match.start()
+            words.append(word)
+        elif kind in ('paren', 'box', 'count'):
+            counts.setdefault(kind, int(match.group(kind)))
+        elif size is None:
+            size = match.group(0)
+
+    box_count = counts.get('paren', counts.get('box', counts.get('count')))
+    line = text[start:stop].strip()
+    length, ring_gauge = parse_size(size) if size else (None, None)
+
+    return ParsedName(
+        brand_prefix=prefix,
+        line=line if len(line) > 2 else None,
+        vitola=VITOLA_MATCHER.match_tokens(words),
+        wrapper=WRAPPER_MATCHER.match_tokens(words),
+        box_count=box_count,
+        size=size,
+        length=length,
+        ring_gauge=ring_gauge,
+    )
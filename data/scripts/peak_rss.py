@@ -0,0 +1,44 @@
+"""
+Peak resident memory of the current process, for per-file reporting.
+
+On Linux the kernel's high-water mark (VmHWM) can be reset through
+/proc/self/clear_refs, so reset_peak_rss() before a file and
+peak_rss_mb() after it give that file's own peak. Elsewhere the
+process-lifetime peak from getrusage() is reported instead.
+"""
+
+import re
+import sys
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def reset_peak_rss() -> bool:
+    """Reset the process's peak RSS; False where that is not supported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak RSS in MB since the last reset (or process start), or None if unknown."""
+    try:
+        with open("/proc/self/status") as f:
+            match = re.search(r'^VmHWM:\s+(\d+) kB', f.read(), re.MULTILINE)
+        if match:
+            return round(int(match.group(1)) / 1024, 1)
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
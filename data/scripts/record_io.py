@@ -0,0 +1,145 @@
+"""
+Record file I/O shared by the extractors, aggregation and import.
+
+Two formats:
+  json   - one indented document: a list of records, or
+           {"metadata": {...}, "<key>": [...]} for the master files
+  ndjson - one record per line, with any metadata block in a
+           '<stem>.meta.json' sidecar, so records can be written and
+           read as a stream
+
+Encoding and decoding go through codec (orjson/msgspec when installed).
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+import codec
+
+FORMATS = ("json", "ndjson")
+SUFFIXES = {"json": ".json", "ndjson": ".ndjson"}
+META_SUFFIX = ".meta.json"
+
+
+def json_default(obj):
+    """json default= hook: objects with to_dict() (CigarRecord) are written as that dict."""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_dict()
+
+
+def output_format(argv: List[str]) -> str:
+    """--format json|ndjson from a command line (default json)."""
+    if "--format" in argv:
+        fmt = argv[argv.index("--format") + 1]
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format: {fmt} (expected one of {', '.join(FORMATS)})")
+        return fmt
+    return "json"
+
+
+def records_path(directory: Path, stem: str, fmt: str = "json") -> Path:
+    return Path(directory) / (stem + SUFFIXES[fmt])
+
+
+def meta_path(path: Path) -> Path:
+    """Metadata sidecar for an NDJSON file: master-cigars.ndjson -> master-cigars.meta.json."""
+    return path.with_name(path.stem + META_SUFFIX)
+
+
+def is_records_file(path: Path) -> bool:
+    """True for a JSON/NDJSON record file, false for sidecars and dotfiles."""
+    name = path.name
+    return (
+        not name.startswith('.')
+        and not name.endswith(META_SUFFIX)
+        and path.suffix in SUFFIXES.values()
+    )
+
+
+def write_records(path: Path, records: Iterable[Dict], key: Optional[str] = None,
+                  metadata: Optional[Dict] = None, compact: bool = False) -> int:
+    """Write records to path in the format given by its suffix.
+
+    key/metadata describe the JSON document layout ({"metadata": ..., key: [...]});
+    for NDJSON the metadata goes to the sidecar instead. compact drops the
+    indentation of JSON documents (NDJSON lines are always compact). Any
+    copy of the same file in the other format is removed so readers never
+    see both. Returns the number of records written.
+    """
+    path = Path(path)
+    count = 0
+
+    if path.suffix == SUFFIXES["ndjson"]:
+        with open(path, 'wb') as f:
+            for record in records:
+                f.write(codec.dumps(record, compact=True, default=json_default))
+                f.write(b'\n')
+                count += 1
+        sidecar = meta_path(path)
+        if metadata is not None:
+            codec.dump(metadata, sidecar, compact=compact)
+        elif sidecar.exists():
+            sidecar.unlink()
+        path.with_suffix(SUFFIXES["json"]).unlink(missing_ok=True)
+    else:
+        records = list(records)
+        count = len(records)
+        if key is None:
+            document = records
+        else:
+            document = {"metadata": metadata, key: records} if metadata is not None else {key: records}
+        codec.dump(document, path, compact=compact, default=json_default)
+        ndjson = path.with_suffix(SUFFIXES["ndjson"])
+        ndjson.unlink(missing_ok=True)
+        meta_path(ndjson).unlink(missing_ok=True)
+
+    return count
+
+
+def iter_records(path: Path, key: Optional[str] = None) -> Iterator[Dict]:
+    """Yield the records of a JSON or NDJSON file.
+
+    NDJSON is read one line at a time; a JSON document is loaded whole and
+    its list (or the list under key) yielded.
+    """
+    path = Path(path)
+
+    if path.suffix == SUFFIXES["ndjson"]:
+        with open(path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield codec.loads(line)
+        return
+
+    document = codec.load(path)
+    if isinstance(document, dict):
+        document = document.get(key, []) if key else []
+    yield from document
+
+
+def read_metadata(path: Path) -> Dict:
+    """Metadata block of a master file: the sidecar for NDJSON, the 'metadata' key for JSON."""
+    path = Path(path)
+
+    if path.suffix == SUFFIXES["ndjson"]:
+        sidecar = meta_path(path)
+        if not sidecar.exists():
+            return {}
+        return codec.load(sidecar)
+
+    document = codec.load(path)
+    return document.get("metadata", {}) if isinstance(document, dict) else {}
+
+
+def find_records(directory: Path, stem: str) -> Optional[Path]:
+    """The JSON or NDJSON file for stem in directory, newest first if both exist."""
+    candidates = [records_path(directory, stem, fmt) for fmt in FORMATS]
+    existing = [p for p in candidates if p.exists()]
+    if not existing:
+        return None
+    return max(existing, key=lambda p: p.stat().st_mtime)
+
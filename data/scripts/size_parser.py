@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Shared cigar size parser for the PDF and Excel extractors.
+Turns size strings like '5 x 50', '6 1/2 x 52', '5 ¾ X 50', '4 ½ x 38/54'
+or '52/6' into (length, ring_gauge).
+
+Run directly to benchmark over every size string in master-cigars.json:
+    python size_parser.py [path/to/master-cigars.json]
+"""
+
+import re
+import sys
+import json
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+UNICODE_FRACTIONS = {
+    "½": 0.5, "¼": 0.25, "¾": 0.75,
+    "⅓": 1 / 3, "⅔": 2 / 3,
+    "⅛": 0.125, "⅜": 0.375, "⅝": 0.625, "⅞": 0.875,
+}
+
+# Proper fractions glued to a one-digit whole number: "61/2" is 6 1/2 and
+# "51/16" is 5 1/16, but "34/38" is not 3 4/38
+_GLUED = '|'.join(f'{n}/{d}' for d in (*range(2, 10), 16) for n in range(1, d))
+
+# A number with an optional fraction: 6, 6.5, 6 1/2, 61/2, 6½, 6 ½
+_NUM = rf'\d(?:{_GLUED})(?!\d)|\d+(?:\.\d+)?(?:\s+\d+/\d+|\s*[½¼¾⅓⅔⅛⅜⅝⅞])?'
+
+# One side of "A x B": a dual ring gauge (38/54), else a number
+_SIDE = rf'[2-9]\d\s*/\s*[2-9]\d(?!\d)|{_NUM}'
+
+# "A x B", either order, optional inch mark
+SIZE_RE = re.compile(rf'(?P<a>{_SIDE})["\']?\s*[X×]\s*(?P<b>{_SIDE})')
+
+# "52/6" ring/length, tried only when there is no "A x B"; a ring not
+# larger than the length ("1/2", "10/12") is a fraction, not a size
+RING_LENGTH_RE = re.compile(r'(?<![\d/])(?P<ring>\d{2})\s*/\s*(?P<length>\d+(?:\.\d+)?)(?![\d/])')
+
+NUM_RE = re.compile(r'(\d+(?:\.\d+)?)(?:\s*(?:(\d+)/(\d+)|([½¼¾⅓⅔⅛⅜⅝⅞])))?')
+RINGS_RE = re.compile(r'([2-9]\d)\s*/\s*([2-9]\d)')
+
+
+def parse_number(text: str) -> float:
+    """Parse '6', '6.5', '6 1/2', '61/2' or '6½' into a float; a dual
+    ring gauge '38/54' gives the larger ring."""
+    rings = RINGS_RE.fullmatch(text.strip())
+    if rings:
+        return float(max(int(ring) for ring in rings.groups()))
+
+    match = NUM_RE.fullmatch(text.strip())
+    whole, num, den, glyph = match.groups()
+    value = float(whole)
+    if num and float(den):
+        value += float(num) / float(den)
+    elif glyph:
+        value += UNICODE_FRACTIONS[glyph]
+    return value
+
+
+def _order(n1: float, n2: float) -> Tuple[float, int]:
+    """Decide which of two numbers is the length and which the ring gauge.
+
+    Length is typically 4-9 inches, ring gauge typically 30-70.
+    """
+    if n1 < 20 and n2 >= 30:
+        return n1, int(n2)
+    elif n2 < 20 and n1 >= 30:
+        return n2, int(n1)
+    elif n1 < n2:
+        return n1, int(n2)
+    else:
+        return n2, int(n1)
+
+
+@lru_cache(maxsize=4096)
+def _parse_normalized(size_str: str) -> Tuple[Optional[float], Optional[int]]:
+    match = SIZE_RE.search(size_str)
+    if match:
+        return _order(parse_number(match.group('a')), parse_number(match.group('b')))
+
+    match = RING_LENGTH_RE.search(size_str)
+    if match and int(match.group('ring')) > float(match.group('length')):
+        return float(match.group('length')), int(match.group('ring'))
+
+    return None, None
+
+
+def parse_size(size_str) -> Tuple[Optional[float], Optional[int]]:
+    """Parse a size string into (length, ring_gauge), or (None, None)."""
+    if size_str is None or size_str != size_str:  # None or NaN
+        return None, None
+
+    size_str = str(size_str).strip().upper()
+    if not size_str:
+        return None, None
+
+    return _parse_normalized(size_str)
+
+
+def parse_size_series(sizes):
+    """Vectorized parse_size over a pandas Series.
+
+    Returns a DataFrame aligned to sizes.index with a float 'length'
+    column and a nullable-integer 'ring_gauge' column.
+    """
+    import numpy as np
+    import pandas as pd
+
+    normalized = sizes.astype(str).str.strip().str.upper()
+    parts = normalized.str.extract(SIZE_RE)
+    n1 = parts['a'].map(parse_number, na_action='ignore').astype(float)
+    n2 = parts['b'].map(parse_number, na_action='ignore').astype(float)
+
+    # Same ordering rules as _order(), column-wise
+    first_is_length = ((n1 < 20) & (n2 >= 30)) | (~((n2 < 20) & (n1 >= 30)) & (n1 < n2))
+    length = pd.Series(np.where(first_is_length, n1, n2), index=sizes.index)
+    ring = pd.Series(np.where(first_is_length, n2, n1), index=sizes.index)
+
+    # '52/6' ring/length form, where there is no "A x B"
+    rest = normalized[parts['a'].isna()].str.extract(RING_LENGTH_RE).reindex(sizes.index)
+    rest_ring = pd.to_numeric(rest['ring'], errors='coerce')
+    rest_length = pd.to_numeric(rest['length'], errors='coerce')
+    fallback = parts['a'].isna() & (rest_ring > rest_length)
+    length = length.mask(fallback, rest_length)
+    ring = ring.mask(fallback, rest_ring)
+
+    return pd.DataFrame({"length": length, "ring_gauge": np.trunc(ring).astype('Int64')})
+
+
+def benchmark(master_path: Path, rounds: int = 20):
+    """Time parse_size over every size string in the master catalog."""
+    with open(master_path, 'r') as f:
+        sizes = [c.get('size') for c in json.load(f).get('cigars', [])]
+
+    normalized = [str(s).strip().upper() for s in sizes if s]
+    uncached = _parse_normalized.__wrapped__
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for s in normalized:
+            uncached(s)
+    cold = (time.perf_counter() - start) / rounds
+
+    _parse_normalized.cache_clear()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for s in sizes:
+            parse_size(s)
+    warm = (time.perf_counter() - start) / rounds
+
+    parsed = sum(1 for s in sizes if parse_size(s)[0] is not None)
+    info = _parse_normalized.cache_info()
+
+    print(f"Size strings: {len(sizes)} ({len(set(normalized))} distinct), parsed: {parsed}")
+    print(f"Uncached:  {cold * 1000:.2f} ms/pass ({cold / max(len(normalized), 1) * 1e6:.2f} us/call)")
+    print(f"Memoized:  {warm * 1000:.2f} ms/pass ({warm / max(len(sizes), 1) * 1e6:.2f} us/call)")
+    print(f"Cache: {info.hits} hits, {info.misses} misses")
+
+
+if __name__ == "__main__":
+    default = Path(__file__).parent.parent / "master-cigars.json"
+    benchmark(Path(sys.argv[1]) if len(sys.argv) > 1 else default)
@@ -0,0 +1,18 @@
+"""
+URL slugs for brands, lines and cigars. Shared by aggregation, which
+writes them into the master files, and the importers, which rebuild a
+cigar's brand and line slugs to resolve its database ids.
+"""
+
+import re
+
+
+def generate_slug(text: str) -> str:
+    """Generate URL-friendly slug from text."""
+    if not text:
+        return ""
+    slug = text.lower()
+    slug = re.sub(r'[^a-z0-9\s-]', '', slug)
+    slug = re.sub(r'[\s_]+', '-', slug)
+    slug = re.sub(r'-+', '-', slug)
+    return slug.strip('-')
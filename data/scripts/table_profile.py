@@ -0,0 +1,190 @@
+"""
+Column-role inference for generic PDF price tables.
+
+profile_table() decides once per table which column holds the name, size,
+box count and each kind of price: from the header text where there is
+one, else from the values in the first PROFILE_ROWS rows. Rows are then
+read by column index, so per-row work is one lookup per role instead of
+a regex and a price parse over every cell.
+"""
+
+import re
+from statistics import median
+from typing import Dict, List, Optional
+
+# Data rows sampled to infer roles the header does not name
+PROFILE_ROWS = 8
+
+# Share of sampled non-empty cells that must fit a role
+ROLE_MIN_SHARE = 0.5
+
+HEADER_HINTS = ['price', 'msrp', 'wholesale', 'size', 'vitola']
+
+PRICE_ROLES = ("wholesale_price", "wholesale_single", "msrp_single", "msrp_box")
+
+SIZE_CELL_RE = re.compile(r'\d+\s*[xX×]\s*\d+')
+PRICE_CELL_RE = re.compile(r'^\$?\s*\d[\d,]*\.\d{2}$|^\$\s*\d[\d,]*$')
+COUNT_CELL_RE = re.compile(r'^\d{1,3}$')
+
+
+def _words(*words: str) -> re.Pattern:
+    """Match any of words at a word start; words of 3 letters or fewer must also end there."""
+    parts = [
+        re.escape(word) + (r'(?![a-z])' if len(word) <= 3 and word[-1].isalpha() else '')
+        for word in words
+    ]
+    return re.compile(r'(?<![a-z0-9])(?:' + '|'.join(parts) + ')')
+
+
+MSRP_WORDS = _words("msrp", "srp", "retail", "map", "suggested")
+WHOLESALE_WORDS = _words("wholesale", "cost", "dealer", "net", "price", "$")
+SINGLE_WORDS = _words("single", "each", "ea", "stick", "per cigar", "/cigar", "unit")
+BOX_WORDS = _words("box", "pack", "case", "bundle")
+SIZE_WORDS = _words("size", "dimension", "length", "ring", "l x r", "lxr")
+COUNT_WORDS = _words("count", "qty", "quantity", "box of", "pcs", "ct", "per box", "cigars/")
+NAME_WORDS = _words("name", "description", "vitola", "cigar", "product", "shape", "blend", "frontmark")
+SKU_WORDS = _words("sku", "item #", "item no", "item#", "code")
+
+
+def parse_price(cell) -> Optional[float]:
+    """'$1,234.50' -> 1234.5; None for blanks and non-numbers."""
+    if not cell:
+        return None
+    try:
+        return float(re.sub(r'[$,\s]', '', str(cell)))
+    except ValueError:
+        return None
+
+
+def header_role(cell: str) -> Optional[str]:
+    """Role named by a header cell, if any.
+
+    Prices come back as wholesale_*/msrp_* with a unit when the header
+    gives one ("MSRP Box"), or as bare "msrp" to be resolved from values.
+    """
+    text = re.sub(r'\s+', ' ', cell.lower()).strip()
+
+    if "upc" in text:
+        return "upc"
+    if SKU_WORDS.search(text):
+        return "sku"
+
+    single = bool(SINGLE_WORDS.search(text))
+    box = bool(BOX_WORDS.search(text))
+
+    if MSRP_WORDS.search(text):
+        return "msrp_single" if single else "msrp_box" if box else "msrp"
+    if WHOLESALE_WORDS.search(text):
+        return "wholesale_single" if single else "wholesale_price"
+    if SIZE_WORDS.search(text):
+        return "size"
+    if COUNT_WORDS.search(text) or text == "box":
+        return "box_count"
+    if NAME_WORDS.search(text):
+        return "name"
+    return None
+
+
+def find_header(table: List[List]) -> Optional[int]:
+    """Index of the first row mentioning a price or size column, or None."""
+    for i, row in enumerate(table):
+        row_str = ' '.join(str(c).lower() for c in row if c)
+        if any(h in row_str for h in HEADER_HINTS):
+            return i
+    return None
+
+
+def _share(cells: List[str], test) -> float:
+    values = [c for c in cells if c]
+    if not values:
+        return 0.0
+    return sum(1 for c in values if test(c)) / len(values)
+
+
+def _median_price(rows: List[List[str]], col: int) -> float:
+    prices = [parse_price(row[col]) for row in rows if col < len(row)]
+    prices = [p for p in prices if p]
+    return median(prices) if prices else 0.0
+
+
+def profile_fits(roles: Dict[str, int], sample: List[List[str]]) -> bool:
+    """True if sample rows look like the table roles was profiled from:
+    sizes in its size column and prices in its price columns."""
+    def column(col):
+        return [row[col] if col < len(row) else "" for row in sample]
+
+    if "size" in roles and _share(column(roles["size"]), SIZE_CELL_RE.search) < ROLE_MIN_SHARE:
+        return False
+    for role in PRICE_ROLES:
+        if role in roles and _share(column(roles[role]), parse_price) < ROLE_MIN_SHARE:
+            return False
+    return True
+
+
+def profile_table(header: Optional[List[str]], sample: List[List[str]]) -> Dict[str, int]:
+    """Map roles to column indexes for one table.
+
+    header is the header row (or None for a headerless table) and sample
+    the first data rows, as stripped strings. Header names win; roles the
+    header does not name are inferred from the sample. Unlabeled price
+    columns are only used when the header names no price at all, and are
+    then told apart by value rather than by position.
+    """
+    width = max((len(row) for row in sample), default=len(header or []))
+    roles = {}
+
+    for col, cell in enumerate(header or []):
+        role = header_role(cell) if cell else None
+        if role and role not in roles:
+            roles[role] = col
+
+    columns = [[row[col] if col < len(row) else "" for row in sample] for col in range(width)]
+    free = [col for col in range(width) if col not in roles.values()]
+
+    if "size" not in roles:
+        for col in free:
+            if _share(columns[col], SIZE_CELL_RE.search) >= ROLE_MIN_SHARE:
+                roles["size"] = col
+                free.remove(col)
+                break
+
+    labeled_prices = [role for role in roles if role in PRICE_ROLES or role == "msrp"]
+    price_cols = [col for col in free if _share(columns[col], PRICE_CELL_RE.match) >= ROLE_MIN_SHARE]
+    free = [col for col in free if col not in price_cols]
+
+    if not labeled_prices and price_cols:
+        # No price headers: the cheaper column of a pair is the wholesale
+        # box price when the other is higher (its MSRP), and a per-cigar
+        # MSRP when it is lower
+        roles["wholesale_price"] = price_cols[0]
+        if len(price_cols) > 1:
+            other = price_cols[1]
+            if _median_price(sample, other) >= _median_price(sample, price_cols[0]):
+                roles["msrp_box"] = other
+            else:
+                roles["msrp_single"] = other
+
+    if "msrp" in roles:
+        # MSRP without a unit: per cigar if it is below the wholesale box price
+        col = roles.pop("msrp")
+        wholesale = roles.get("wholesale_price")
+        if wholesale is not None and _median_price(sample, col) < _median_price(sample, wholesale):
+            roles.setdefault("msrp_single", col)
+        else:
+            roles.setdefault("msrp_box", col)
+
+    if "box_count" not in roles:
+        for col in free:
+            if _share(columns[col], COUNT_CELL_RE.match) >= ROLE_MIN_SHARE:
+                roles["box_count"] = col
+                free.remove(col)
+                break
+
+    if "name" not in roles:
+        # The most text-heavy remaining column
+        def letters(col):
+            return sum(sum(ch.isalpha() for ch in cell) for cell in columns[col])
+        candidates = [col for col in free if _share(columns[col], lambda c: any(ch.isalpha() for ch in c)) >= ROLE_MIN_SHARE]
+        roles["name"] = max(candidates, key=letters) if candidates else 0
+
+    return roles
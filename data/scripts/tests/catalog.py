@@ -0,0 +1,40 @@
+"""A small master catalog (brands, lines, cigars) written the way aggregate.py writes it."""
+
+from pathlib import Path
+
+from record_io import records_path, write_records
+
+BRANDS = [
+    {"name": "Padron", "slug": "padron", "country": "Nicaragua"},
+    {"name": "Oliva", "slug": "oliva", "country": "Nicaragua"},
+]
+
+LINES = [
+    {"name": "1964 Anniversary", "slug": "padron-1964-anniversary", "brand_id": "padron"},
+    {"name": "Serie V", "slug": "oliva-serie-v", "brand_id": "oliva"},
+    {"name": "Serie G", "slug": "oliva-serie-g", "brand_id": "oliva"},
+]
+
+
+def make_cigars(count: int):
+    lines = [("Padron", "1964 Anniversary"), ("Oliva", "Serie V"), ("Oliva", "Serie G")]
+    cigars = []
+    for i in range(count):
+        brand, line = lines[i % len(lines)]
+        cigars.append({
+            "brand": brand,
+            "line": line,
+            "name": f"{line} Toro {i}",
+            "slug": f"{brand}-{line}-toro-{i}".lower().replace(" ", "-"),
+            "size": "6 x 52",
+            "box_count": 20,
+            "wholesale_price": 100.0 + i,
+        })
+    return cigars
+
+
+def write_catalog(data_dir: Path, cigars):
+    write_records(records_path(data_dir, "brands", "json"), BRANDS, key="brands")
+    write_records(records_path(data_dir, "lines", "json"), LINES, key="lines")
+    write_records(records_path(data_dir, "master-cigars", "json"), cigars, key="cigars",
+                  metadata={"total_cigars": len(cigars)})
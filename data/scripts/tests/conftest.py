@@ -0,0 +1,31 @@
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+try:
+    import supabase  # noqa: F401
+except ImportError:
+    # import_supabase.py exits without the package, but only needs it for
+    # create_client; the tests always pass a StandInClient instead
+    supabase = types.ModuleType("supabase")
+    supabase.Client = object
+
+    def create_client(url, key):
+        raise RuntimeError("supabase is not installed; pass client= to SupabaseImporter")
+
+    supabase.create_client = create_client
+    sys.modules["supabase"] = supabase
+
+from catalog import make_cigars, write_catalog
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """Data directory holding the 2 brands, 3 lines and 250 cigars; returns (dir, cigars)."""
+    cigars = make_cigars(250)
+    write_catalog(tmp_path, cigars)
+    return tmp_path, cigars
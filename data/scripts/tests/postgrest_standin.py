@@ -0,0 +1,121 @@
+"""
+In-memory stand-in for the supabase-py client, for testing the importer
+without a database.
+
+Covers the part of the PostgREST query builder import_supabase.py uses,
+client.table(name).upsert(rows, on_conflict=...).execute(), with Postgres
+upsert semantics: a request is one statement that stores every row or
+none, rows are matched on the conflict column and get a generated id on
+insert, a statement that touches the same conflict key twice is
+rejected, and NOT NULL and brand/line foreign keys are enforced. Errors
+are raised as APIError carrying the code the real client reports.
+
+Outages are scripted with fail(): requests to a table in a given range
+raise a given code, e.g. "503" for a gateway that is down.
+"""
+
+import itertools
+import threading
+from typing import Dict, List, Optional
+
+# NOT NULL columns the importer writes, per table (see database/schema.sql)
+REQUIRED = {
+    "brands": ("name", "slug"),
+    "lines": ("name", "slug", "brand_id"),
+    "cigars": ("name", "slug"),
+}
+
+# Columns that must hold the id of a row in another table
+FOREIGN_KEYS = {
+    "lines": {"brand_id": "brands"},
+    "cigars": {"brand_id": "brands", "line_id": "lines"},
+}
+
+
+class APIError(Exception):
+    """postgrest.exceptions.APIError look-alike: code plus message."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+
+
+class Response:
+    def __init__(self, data: List[Dict]):
+        self.data = data
+
+
+class Upsert:
+    def __init__(self, client: "StandInClient", table: str, rows: List[Dict], on_conflict: str):
+        self.client = client
+        self.table = table
+        self.rows = rows
+        self.on_conflict = on_conflict
+
+    def execute(self) -> Response:
+        return self.client.execute_upsert(self.table, self.rows, self.on_conflict)
+
+
+class Table:
+    def __init__(self, client: "StandInClient", name: str):
+        self.client = client
+        self.name = name
+
+    def upsert(self, rows, on_conflict: str = "id") -> Upsert:
+        return Upsert(self.client, self.name, rows if isinstance(rows, list) else [rows], on_conflict)
+
+
+class StandInClient:
+    """Tables of rows keyed by their conflict column, plus a request log."""
+
+    def __init__(self):
+        self.tables: Dict[str, Dict[str, Dict]] = {}
+        self.requests: List[tuple] = []     # (table, rows sent) per statement, failed ones included
+        self.faults: List[tuple] = []       # (table, first request, last request or None, code)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> Table:
+        return Table(self, name)
+
+    def fail(self, table: str, code: str = "503", start: int = 0, count: Optional[int] = None):
+        """Make requests start .. start + count - 1 to table (counted from
+        0, failed ones included) raise code; count=None fails all of them."""
+        stop = None if count is None else start + count
+        self.faults.append((table, start, stop, code))
+
+    def rows(self, table: str) -> Dict[str, Dict]:
+        return self.tables.get(table, {})
+
+    def request_count(self, table: str) -> int:
+        return sum(1 for name, _ in self.requests if name == table)
+
+    def execute_upsert(self, table: str, rows: List[Dict], on_conflict: str) -> Response:
+        with self._lock:
+            number = self.request_count(table)
+            self.requests.append((table, len(rows)))
+
+            for name, start, stop, code in self.faults:
+                if name == table and start <= number and (stop is None or number < stop):
+                    raise APIError(code, "scripted failure")
+
+            keys = [row.get(on_conflict) for row in rows]
+            if len(set(keys)) < len(keys):
+                raise APIError("21000", "ON CONFLICT DO UPDATE command cannot affect row a second time")
+            for row in rows:
+                for column in REQUIRED.get(table, ()):
+                    if row.get(column) is None:
+                        raise APIError("23502", f'null value in column "{column}" of relation "{table}"')
+                for column, target in FOREIGN_KEYS.get(table, {}).items():
+                    if row.get(column) is not None and not any(
+                            stored["id"] == row[column] for stored in self.rows(target).values()):
+                        raise APIError("23503", f'insert or update on table "{table}" violates foreign key')
+
+            stored = self.tables.setdefault(table, {})
+            result = []
+            for key, row in zip(keys, rows):
+                existing = stored.get(key)
+                stored[key] = dict(existing or {"id": f"{table}-{next(self._ids)}"}, **row)
+                result.append(dict(stored[key]))
+            return Response(result)
@@ -0,0 +1,62 @@
+"""Catalog ids and incremental aggregation state."""
+
+import json
+
+import aggregate
+from aggregate import assign_ids, generate_id, id_changes
+
+
+def entry(**fields):
+    return {"record": dict(fields)}
+
+
+def test_first_record_keeps_plain_id_and_later_ones_are_qualified():
+    ordered = [
+        entry(brand="H. Upmann", line="1844 Anejo", name="TORO BOX 25", size="54 X 6", upc="0123"),
+        entry(brand="H. Upmann", line="1844 Classic", name="TORO BOX 25", size="54 X 6", upc="0456"),
+        entry(brand="H. Upmann", line="1844 Classic", name="TORO BOX 25", size="54 X 6", upc="0456"),
+    ]
+    assign_ids(ordered)
+
+    ids = [e["record"]["id"] for e in ordered]
+    assert ids[0] == generate_id(ordered[0]["record"])
+    assert len(set(ids)) == 3
+
+
+def test_id_changes_maps_old_brand_to_brand_plus_line():
+    previous = [
+        {"id": "old1", "brand": "H Upmann 1844 Anejo", "name": "TORO BOX 25", "size": "54 X 6", "source": "AUSA"},
+        {"id": "kept", "brand": "Padron", "name": "1964 Toro", "size": "6 x 52", "source": "Padron"},
+        {"id": "gone", "brand": "Diesel", "name": "Ribeye", "size": "6 x 52", "source": "DTT"},
+    ]
+    current = [
+        {"id": "new1", "brand": "H. Upmann", "line": "1844 Anejo", "name": "TORO BOX 25", "size": "54 X 6",
+         "source": "AUSA"},
+        {"id": "new2", "brand": "H. Upmann", "line": "1844 Classic", "name": "TORO BOX 25", "size": "54 X 6",
+         "source": "AUSA"},
+        {"id": "kept", "brand": "Padron", "name": "1964 Toro", "size": "6 x 52", "source": "Padron"},
+    ]
+    assert id_changes(previous, current) == {"old1": "new1", "gone": None}
+
+
+def test_file_that_failed_to_load_is_retried_next_run(tmp_path, monkeypatch):
+    extracted = tmp_path / "extracted"
+    (extracted / "excel").mkdir(parents=True)
+    cigar = {"brand": "Padron", "name": "1964 Toro", "size": "6 x 52", "source": "Padron"}
+    (extracted / "excel" / "padron.json").write_text(json.dumps([cigar]))
+
+    real_load = aggregate.load_source
+
+    def broken(json_file):
+        raise OSError("read interrupted")
+
+    monkeypatch.setattr(aggregate, "load_source", broken)
+    state = aggregate.empty_state()
+    assert aggregate.refresh_state(state, extracted)["changed_files"] == ["excel/padron.json"]
+    assert state["order"] == []
+
+    # Same file on disk: it is loaded again rather than taken as unchanged
+    monkeypatch.setattr(aggregate, "load_source", real_load)
+    assert aggregate.refresh_state(state, extracted)["changed_files"] == ["excel/padron.json"]
+    assert [u["record"]["name"] for u in state["order"]] == ["1964 Toro"]
+    assert aggregate.refresh_state(state, extracted)["changed_files"] == []
@@ -0,0 +1,82 @@
+"""Header-row detection and named column mapping on a workbook laid out like the Drew Estate list."""
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+openpyxl = pytest.importorskip("openpyxl")
+
+from config import EXCEL_CONFIGS
+from extract_excel import HEADER_SCAN_ROWS, ExcelExtractor
+
+CONFIG = EXCEL_CONFIGS["Drew Estate Retailer Price List.xlsx"]
+
+HEADER = ["ItemCode", "U_DE_Brand", "Notes", "U_DE_Sub_Brand", "ItemName", "U_DE_PL_Description", "U_DE_Size",
+          "U_DE_Sticks_Per_Box", "Price", "MSRP_Box", "MSRP_Stick", "CodeBars"]
+ROWS = [
+    ["001-0001", "Liga Privada", "new", "No. 9", "Liga Privada - No. 9 - Toro Box 24ct", "Toro", "6 x 52",
+     24, 259.2, 432.0, 18.0, "815877011041"],
+    ["001-0002", "Undercrown", None, "Shade", "Undercrown - Shade - 2021 Robusto Box 25ct", "Robusto",
+     "5 x 54", 25, 150.0, 250.0, 10.0, None],
+    [None, "1", None, None, "index row", None, None, None, None, None, None, None],
+]
+
+
+def write_workbook(path, title_rows, header=HEADER, rows=ROWS):
+    """'Raw Data' sheet: title_rows of banner text, the header row, then rows."""
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.title = "Raw Data"
+    for i in range(title_rows):
+        sheet.append([f"Drew Estate Retailer Price List - banner {i}"] if i % 2 == 0 else [])
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    book.save(path)
+    return path
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    return ExcelExtractor(tmp_path, tmp_path / "out")
+
+
+def test_header_found_below_the_configured_row(extractor, tmp_path):
+    # header_row in the config is 2; the markers find it at 5
+    path = write_workbook(tmp_path / "Drew Estate Retailer Price List.xlsx", title_rows=5)
+    raw = pd.read_excel(path, sheet_name="Raw Data", header=None)
+
+    assert extractor.find_header_row(raw, CONFIG) == 5
+    assert extractor.find_header_row(raw, dict(CONFIG, header_markers=[])) == CONFIG["header_row"]
+
+
+def test_header_past_the_scan_window_falls_back_to_the_configured_row(extractor, tmp_path):
+    path = write_workbook(tmp_path / "Drew Estate Retailer Price List.xlsx", title_rows=HEADER_SCAN_ROWS + 1)
+    raw = pd.read_excel(path, sheet_name="Raw Data", header=None)
+
+    assert extractor.find_header_row(raw, CONFIG) == CONFIG["header_row"]
+
+
+def test_read_sheets_loads_only_the_mapped_columns(extractor, tmp_path):
+    path = write_workbook(tmp_path / "Drew Estate Retailer Price List.xlsx", title_rows=5)
+
+    sheets = extractor.read_sheets(path, CONFIG)
+
+    df = sheets["Raw Data"]
+    assert "Notes" not in df.columns
+    assert set(df.columns) == set(HEADER) - {"Notes"}
+    assert list(df["ItemName"]) == [row[4] for row in ROWS]
+    assert extractor.stats["errors"] == []
+
+
+def test_named_mapping_extracts_records(extractor, tmp_path):
+    path = write_workbook(tmp_path / "Drew Estate Retailer Price List.xlsx", title_rows=5)
+
+    cigars = extractor.extract_with_config(path, CONFIG)
+
+    assert [c["name"] for c in cigars] == [ROWS[0][4], ROWS[1][4]]   # the index row is excluded
+    first = cigars[0]
+    assert (first["brand"], first["line"], first["vitola"]) == ("Liga Privada", "No. 9", "Toro")
+    assert (first["length"], first["ring_gauge"], first["box_count"]) == (6.0, 52, 24)
+    assert (first["wholesale_price"], first["msrp_single"], first["upc"]) == (259.2, 18.0, "815877011041")
+    assert first["wrapper"] is None
+    assert first["source"] == CONFIG["source"]
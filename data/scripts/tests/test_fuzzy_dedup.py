@@ -0,0 +1,103 @@
+"""Near-duplicate blocking, vetoes and scoring on names from the price lists."""
+
+import pytest
+
+import fuzzy_dedup
+from fuzzy_dedup import DEFAULT_THRESHOLD, Candidate, block_key, compatible, fuzzy_clusters, similarity
+
+
+def cigar(name, brand="Oliva", size="6 x 60", **fields):
+    return dict(brand=brand, name=name, size=size, **fields)
+
+
+def candidates(a, b):
+    return Candidate(0, a), Candidate(1, b)
+
+
+def test_block_key_reparses_the_size_string():
+    # Older extracts stored 5 1/2 as length 5
+    assert block_key(cigar("Serie V Torpedo", size="5 1/2 x 54", length=5, ring_gauge=54)) == ("oliva", 5.5, 54)
+    assert block_key(cigar("Serie V Torpedo", size=None, length=5.5, ring_gauge=54)) == ("oliva", 5.5, 54)
+    assert block_key(cigar("Serie V Sampler", size="Assorted")) is None
+    assert block_key(cigar("Serie V Torpedo", brand="")) is None
+
+
+@pytest.mark.parametrize("a, b", [
+    (cigar("Oliva 6 X 60 DBL. TORO(10)"), cigar("Oliva 6 x 60 DBL TORO(10)")),
+    (cigar('"Ribeye"', brand="Diesel", size="6.00 x 52"), cigar("Ribeye", brand="Diesel", size="6.00 x 52")),
+    (cigar("Padron 1964 Anniversary Torpedo Box 20", brand="Padron", size="6 x 52"),
+     cigar("Padron 1964 Anniversary Torpedos 20 CT", brand="Padron", size="6 x 52")),
+    (cigar("Serie V Melanio Churchil"), cigar("Serie V Melanio Churchill")),
+])
+def test_same_cigar_spelled_two_ways_scores_over_the_threshold(a, b):
+    left, right = candidates(a, b)
+    assert compatible(left, right)
+    assert similarity(left, right) >= DEFAULT_THRESHOLD
+
+
+@pytest.mark.parametrize("a, b", [
+    # numbers: No. 2 vs No. 4, 10ct vs 20ct
+    (cigar("Family Reserve No. 45", brand="Padron"), cigar("Family Reserve No. 46", brand="Padron")),
+    (cigar("Serie V Double Toro (10)"), cigar("Serie V Double Toro (20)")),
+    # known wrappers that differ
+    (cigar("Serie V Double Toro", wrapper="Maduro"), cigar("Serie V Double Toro", wrapper="Natural")),
+    # two valid UPCs that differ
+    (cigar("Serie V Double Toro", upc="036000291452"), cigar("Serie V Double Toro", upc="4006381333931")),
+    # nothing left of the name once brand and noise words are dropped
+    (cigar("Oliva Box"), cigar("Oliva Cigars")),
+])
+def test_vetoes(a, b):
+    assert not compatible(*candidates(a, b))
+
+
+def test_an_invalid_upc_does_not_veto():
+    left, right = candidates(cigar("Serie V Double Toro", upc="036000291453"),
+                             cigar("Serie V Double Toro", upc="4006381333931"))
+    assert compatible(left, right)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Serie V Melanio Figurado", "Serie V Melanio Figurado Maduro"),   # a word only one name has
+    ("Aging Room Quattro Nicaragua Boy", "Aging Room Quattro Nicaragua Girl"),
+])
+def test_unpaired_words_score_zero(a, b):
+    assert similarity(*candidates(cigar(a), cigar(b))) == 0.0
+
+
+def test_token_floor(monkeypatch):
+    # "maduro"/"madura" pair at a spelling ratio of 0.83
+    left, right = candidates(cigar("Serie G Maduro Belicoso"), cigar("Serie G Madura Belicoso"))
+    assert similarity(left, right) >= DEFAULT_THRESHOLD
+
+    monkeypatch.setattr(fuzzy_dedup, "TOKEN_FLOOR", 0.85)
+    assert similarity(left, right) == 0.0
+
+
+def test_clusters_only_merge_within_a_block():
+    cigars = [
+        cigar("Oliva 6 X 60 DBL. TORO(10)"),
+        cigar("Oliva 6 x 60 DBL TORO(10)"),
+        cigar("Oliva 6 X 60 DBL. TORO(10)", size="6 x 54"),             # other ring gauge
+        cigar("Oliva 6 X 60 DBL. TORO(10)", brand="Nub", size="6 x 60"),  # other brand
+        cigar("Oliva Sampler", size="Assorted"),                        # no size: never merged
+        cigar("Oliva Sampler", size="Assorted"),
+    ]
+
+    clusters, merges, stats = fuzzy_clusters(cigars)
+
+    assert clusters == [[0, 1], [2], [3], [4], [5]]
+    assert merges == [{"leader": 0, "record": 1, "score": 1.0}]
+    assert (stats["blocks"], stats["unblocked"], stats["merged"]) == (3, 2, 1)
+
+
+def test_a_misspelling_joins_the_leader_and_an_extra_word_does_not():
+    cigars = [
+        cigar("Serie V Melanio Churchill"),
+        cigar("Serie V Melanio Churcill Special"),
+        cigar("Serie V Melanio Churchil"),
+    ]
+
+    clusters, merges, _ = fuzzy_clusters(cigars)
+
+    assert clusters == [[0, 2], [1]]
+    assert merges[0]["leader"] == 0 and merges[0]["score"] < 1.0
@@ -0,0 +1,100 @@
+"""UPC/SKU normalization and the identifier union-find."""
+
+import pytest
+
+from identifiers import IdentifierIndex, gtin_check_valid, normalize_sku, normalize_upc, record_identifiers
+
+
+@pytest.mark.parametrize("digits, valid", [
+    ("036000291452", True),       # UPC-A
+    ("036000291453", False),
+    ("4006381333931", True),      # EAN-13
+    ("00036000291452", True),     # GTIN-14: zero padding is neutral
+    ("843182100409", True),       # Arturo Fuente list
+])
+def test_gtin_check_digit(digits, valid):
+    assert gtin_check_valid(digits) is valid
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("818578010075.0", ("00818578010075", False)),          # Excel float
+    ("076622-026001", ("00076622026001", False)),
+    ("76622026001", ("00076622026001", False)),             # leading zero lost in Excel
+    ("843182101048 (unit is tin)", ("00843182101048", False)),
+    ("036000291453", (None, True)),                          # bad check digit
+    ("12345", (None, True)),                                 # too short
+    ("- None -", (None, False)),
+    ("", (None, False)),
+    (None, (None, False)),
+])
+def test_normalize_upc(value, expected):
+    assert normalize_upc(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("126010.0", "126010"),
+    ("Q-01-82-003", "Q0182003"),
+    ("af 915220", "AF915220"),
+    ("SEE BELOW", None),          # no digit
+    ("$12.50*", None),            # layout debris
+    (None, None),
+])
+def test_normalize_sku(value, expected):
+    assert normalize_sku(value) == expected
+
+
+def test_identifiers_are_qualified_by_box_count_and_skus_by_brand():
+    cigar = {"brand": "Arturo Fuente", "upc": "843182100409", "sku": "915220", "box_count": 20}
+
+    assert record_identifiers(cigar) == (["upc:00843182100409/20", "sku:arturo fuente:915220/20"], False)
+    assert record_identifiers({"upc": "843182100408"}) == ([], True)
+
+
+def record(size="8 1/2 x 52", **fields):
+    return dict({"brand": "Arturo Fuente", "size": size, "box_count": 20}, **fields)
+
+
+def test_shared_upc_links_records_and_box_counts_stay_apart():
+    index = IdentifierIndex()
+    index.add(0, record(upc="843182100409"))
+    index.add(1, record(upc="00843182100409", size='81/2" x 52'))
+    index.add(2, record(upc="843182100409", box_count=5))       # the 5-pack
+    index.add(3, record(upc="843182100408"))                    # invalid check digit
+
+    assert index.groups() == [[0, 1], [2], [3]]
+    assert index.invalid_upcs == 1
+    assert index.conflicts == []
+
+
+def test_upc_and_sku_chain_into_one_group():
+    index = IdentifierIndex()
+    index.add(0, record(upc="843182100409"))
+    index.add(1, record(sku="915220"))
+    index.add(2, record(upc="843182100409", sku="915220"))
+
+    assert index.groups() == [[0, 1, 2]]
+    assert index.find(2) == 0
+
+
+def test_size_conflict_is_reported_not_joined():
+    index = IdentifierIndex()
+    index.add(0, record(upc="843182100409"))
+    index.add(1, record(upc="843182100409", size="6 x 50"))
+
+    assert index.groups() == [[0], [1]]
+    assert index.conflicts == [{
+        "identifier": "upc:00843182100409/20",
+        "positions": [0, 1],
+        "sizes": [[8.5, 52], [6.0, 50]],
+    }]
+
+
+def test_a_record_without_a_size_joins_and_the_group_takes_a_size():
+    index = IdentifierIndex()
+    index.add(0, record(upc="843182100409", size=None))
+    index.add(1, record(upc="843182100409"))
+    index.add(2, record(upc="843182100409", size="6 x 50"))
+
+    assert index.groups() == [[0, 1], [2]]
+    assert index.sizes[0] == (8.5, 52)
+    assert len(index.conflicts) == 1
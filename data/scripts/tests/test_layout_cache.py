@@ -0,0 +1,73 @@
+"""LayoutCache round trips, and partial or foreign entries read as misses."""
+
+import pytest
+
+from layout_cache import MAGIC, LayoutCache
+
+PAGES = [
+    [[["Brand", "Name", "Size"], ["Padron", "1964 Anniversary Torpedo", "6 x 52"]]],
+    [],
+    [[["Oliva", "Serie V Double Toro", "6 x 60"]]],
+]
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "price list.pdf"
+    path.write_bytes(b"%PDF-1.4 stand-in")
+    return path
+
+
+def store(cache, pdf, pages=PAGES, mode="tables"):
+    return list(cache.store(pdf, mode, {"snap_tolerance": 3}, iter(pages)))
+
+
+def test_round_trip(tmp_path, pdf):
+    cache = LayoutCache(tmp_path)
+    assert cache.load(pdf, "tables", {"snap_tolerance": 3}) is None
+
+    assert store(cache, pdf) == PAGES
+    assert list(cache.load(pdf, "tables", {"snap_tolerance": 3})) == PAGES
+    assert cache.load(pdf, "tables", {"snap_tolerance": 4}) is None
+    assert cache.load(pdf, "text") is None
+    assert cache.report() == {"hits": 1, "misses": 3}
+
+
+@pytest.mark.parametrize("cut", [
+    len(MAGIC) - 2,     # inside the magic
+    len(MAGIC) + 2,     # inside the first frame header
+    len(MAGIC) + 10,    # inside the first page
+    -4,                 # the end frame missing
+    -1,                 # the end frame cut short
+])
+def test_truncated_entry_is_a_miss(tmp_path, pdf, cut):
+    cache = LayoutCache(tmp_path)
+    store(cache, pdf)
+    path = cache.path_for(pdf, "tables", {"snap_tolerance": 3})
+    path.write_bytes(path.read_bytes()[:cut])
+
+    assert cache.load(pdf, "tables", {"snap_tolerance": 3}) is None
+    assert cache.misses == 1
+
+
+def test_trailing_bytes_and_foreign_files_are_misses(tmp_path, pdf):
+    cache = LayoutCache(tmp_path)
+    store(cache, pdf)
+    path = cache.path_for(pdf, "tables", {"snap_tolerance": 3})
+    data = path.read_bytes()
+
+    path.write_bytes(data + b"\x00")
+    assert cache.load(pdf, "tables", {"snap_tolerance": 3}) is None
+
+    path.write_bytes(b"LAYOUT1\n" + data[len(MAGIC):])
+    assert cache.load(pdf, "tables", {"snap_tolerance": 3}) is None
+
+
+def test_an_interrupted_store_leaves_no_entry(tmp_path, pdf):
+    cache = LayoutCache(tmp_path)
+    pages = cache.store(pdf, "tables", {"snap_tolerance": 3}, iter(PAGES))
+    next(pages)
+    pages.close()
+
+    assert cache.load(pdf, "tables", {"snap_tolerance": 3}) is None
+    assert list(cache.dir.iterdir()) == []
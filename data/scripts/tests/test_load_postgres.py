@@ -0,0 +1,105 @@
+"""PostgresLoader dry run, and its staging/merge SQL checked against database/schema.sql."""
+
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+from catalog import BRANDS, LINES
+from load_postgres import MERGE_BRANDS, MERGE_CIGARS, MERGE_LINES, STAGING_COLUMNS, STAGING_DDL, PostgresLoader
+
+SCHEMA = Path(__file__).resolve().parents[3] / "database" / "schema.sql"
+
+MERGES = {
+    "brands": (MERGE_BRANDS, "stage_brands"),
+    "lines": (MERGE_LINES, "stage_lines"),
+    "cigars": (MERGE_CIGARS, "stage_cigars"),
+}
+
+
+def split_columns(text):
+    return tuple(column.strip() for column in text.split(","))
+
+
+def schema_tables():
+    """{table: (columns, NOT NULL columns without a default, unique keys)}."""
+    tables = {}
+    for name, body in re.findall(r"CREATE TABLE (\w+) \((.*?)\n\);", SCHEMA.read_text(), re.DOTALL):
+        columns, required, keys = set(), set(), set()
+        for line in body.splitlines():
+            line = line.split("--")[0].strip().rstrip(",")
+            if not line:
+                continue
+            unique = re.fullmatch(r"UNIQUE\s*\((.*)\)", line)
+            if unique:
+                keys.add(split_columns(unique.group(1)))
+                continue
+            column = line.split()[0]
+            columns.add(column)
+            if "NOT NULL" in line and "DEFAULT" not in line:
+                required.add(column)
+            if re.search(r"\bUNIQUE\b", line):
+                keys.add((column,))
+        tables[name] = (columns, required, keys)
+    return tables
+
+
+def staging_tables():
+    return {
+        name: [column.split()[0] for column in split_columns(body)]
+        for name, body in re.findall(r"CREATE TEMP TABLE (\w+) \((.*?)\) ON COMMIT DROP", STAGING_DDL, re.DOTALL)
+    }
+
+
+def test_staging_ddl_matches_copy_columns():
+    assert staging_tables() == STAGING_COLUMNS
+
+
+@pytest.mark.parametrize("table", sorted(MERGES))
+def test_merge_targets_a_schema_unique_key(table):
+    sql, stage = MERGES[table]
+    columns, required, keys = schema_tables()[table]
+
+    inserted = split_columns(re.search(rf"INSERT INTO {table} \(([^)]*)\)", sql).group(1))
+    conflict = split_columns(re.search(r"ON CONFLICT \(([^)]*)\)", sql).group(1))
+    distinct = split_columns(re.search(r"DISTINCT ON \(([^)]*)\)", sql).group(1))
+
+    assert set(inserted) <= columns
+    assert required <= set(inserted)
+    assert conflict in keys
+    # One staged row per conflict key, or the statement updates a row twice
+    assert len(distinct) == len(conflict)
+    assert set(re.findall(r"\bs\.(\w+)", sql)) <= set(STAGING_COLUMNS[stage])
+    assert set(re.findall(r"\bEXCLUDED\.(\w+)", sql)) <= set(inserted)
+
+
+def test_dry_run_stages_the_catalog_without_psycopg2(catalog, monkeypatch):
+    data_dir, cigars = catalog
+    monkeypatch.setitem(sys.modules, "psycopg2", None)  # import psycopg2 now raises ImportError
+
+    stats = PostgresLoader(None, dry_run=True).run(data_dir)
+
+    assert (stats["brands_staged"], stats["lines_staged"], stats["cigars_staged"]) == (
+        len(BRANDS), len(LINES), len(cigars))
+    assert stats["cigars_loaded"] == 0
+
+
+def test_staged_cigars_join_to_staged_brands_and_lines(catalog):
+    _, cigars = catalog
+    loader = PostgresLoader(None, dry_run=True)
+    brand_map = {brand["slug"]: brand["slug"] for brand in BRANDS}
+    line_map = {line["slug"]: line["slug"] for line in LINES}
+    staged_lines = {(line["brand_id"], line["slug"]) for line in LINES}
+    column = STAGING_COLUMNS["stage_cigars"].index
+
+    for row in loader.cigar_rows(cigars, brand_map, line_map):
+        assert row[column("brand_slug")] in brand_map
+        assert (row[column("brand_slug")], row[column("line_slug")]) in staged_lines
+
+
+def test_connect_without_psycopg2_exits(monkeypatch):
+    monkeypatch.setitem(sys.modules, "psycopg2", None)
+
+    with pytest.raises(SystemExit):
+        PostgresLoader("postgresql://localhost/none").connect()
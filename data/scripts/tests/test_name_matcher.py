@@ -0,0 +1,67 @@
+"""Brand resolution and vitola/wrapper keyword matching on catalog names."""
+
+import pytest
+
+from name_matcher import BRAND_INDEX, KeywordMatcher, match_vitola, match_wrapper, title_words, token_forms
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("H UPMANN", ("H. Upmann", "")),
+    ("H UPMANN 1844 ANEJO", ("H. Upmann", "1844 Anejo")),
+    ("H UPMANN 180TH ANNIVERSARY", ("H. Upmann", "180TH Anniversary")),
+    ("ROMEO BY ROMEO Y JULIETA", ("Romeo y Julieta", "Romeo")),
+])
+def test_brand_split(raw, expected):
+    assert BRAND_INDEX.split(raw) == expected
+
+
+@pytest.mark.parametrize("words, expected", [
+    (["180TH", "ANNIVERSARY"], "180TH Anniversary"),
+    (["1844", "anejo"], "1844 Anejo"),
+    (["VegaFina", "NICARAGUA"], "VegaFina Nicaragua"),
+])
+def test_title_words_keeps_digit_led_and_mixed_case(words, expected):
+    assert title_words(words) == expected
+
+
+@pytest.mark.parametrize("token, forms", [
+    ("toros", ("toros", "toro")),
+    ("belicosos", ("belicosos", "belicoso")),
+    ("mad20", ("mad20", "mad")),
+    ("cts", ("cts",)),            # too short to be a plural
+    ("toro", ("toro",)),
+])
+def test_token_forms(token, forms):
+    assert token_forms(token) == forms
+
+
+@pytest.mark.parametrize("name, vitola, wrapper", [
+    # plurals
+    ("LFD LOS LANCEROS (5)", "Lancero", None),
+    ("DON PEPIN GARCIA - SERIES JJ BELICOSOS", "Belicoso", None),
+    ("DON PEPIN GARCIA - SERIES JJ TOROS", "Toro", None),
+    ("Rocky Patel Vintage 1990 Robustos", "Robusto", None),
+    # a keyword glued to a number
+    ("Hemingway Short Story MAD20", None, "Maduro"),
+    # "20 CT" is a box count, CT on its own is Connecticut
+    ("Perdomo Reserve 10th Anniversary Champagne Epicure 20 CT", None, None),
+    ("Macanudo Cafe Hyde Park 25 CT", None, None),
+    ("Oliva 30 Displays of 5 CT Reserve (5x50)", None, None),
+    ("Blackened - S84 - Corona Box 20ct", "Corona", None),
+    ("JDN - Antano CT - Toro Box 20ct", "Toro", "Connecticut"),
+    ("Acid - 20 Toro CT Box 20ct", "Toro", "Connecticut"),
+    ("Perdomo Lot 23 Connecticut Toro", "Toro", "Connecticut"),
+    # whole tokens only
+    ("Fresh Pack 5 Toro (10 Count Case)", "Toro", None),
+    ("JDN - Other - seleccion Antano 4ct", None, None),
+])
+def test_vitola_and_wrapper_from_catalog_names(name, vitola, wrapper):
+    assert (match_vitola(name), match_wrapper(name)) == (vitola, wrapper)
+
+
+def test_longest_keyword_wins_and_plain_matchers_do_not_inflect():
+    matcher = KeywordMatcher({"corona": "Corona", "corona gorda": "Corona Gorda"})
+
+    assert matcher.match("JDN - Joya Cabinetta - Corona Gorda Box 20ct") == "Corona Gorda"
+    assert matcher.match("Coronas") is None
+    assert KeywordMatcher({"corona": "Corona"}, inflected=True).match("Coronas") == "Corona"
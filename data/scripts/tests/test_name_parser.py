@@ -0,0 +1,46 @@
+"""parse_name over product names from the price lists."""
+
+import pytest
+
+from name_parser import parse_name
+
+
+@pytest.mark.parametrize("brand, name, expected", [
+    # brand prefix, with or without a dash, in any case
+    ("Oliva", "Oliva 6 X 60 DBL. TORO(10)",
+     dict(brand_prefix="Oliva", vitola="Toro", box_count=10, size="6 X 60", length=6.0, ring_gauge=60)),
+    ("Padron", "PADRON - 1926 SERIE No. 9 MADURO BOX 24",
+     dict(brand_prefix="PADRON", wrapper="Maduro", box_count=24)),
+    ("Padron", "Padron 1964 Anniversary Torpedos 20 CT",
+     dict(brand_prefix="Padron", line="1964 Anniversary", vitola="Torpedo", wrapper=None, box_count=20)),
+    ("Acid", "Acid - 20 Robusto Maduro Box 24ct",
+     dict(brand_prefix="Acid", line=None, vitola="Robusto", wrapper="Maduro", box_count=24)),
+    # no prefix when the name does not start with the brand
+    ("My Father", "DON PEPIN GARCIA - SERIES JJ TOROS",
+     dict(brand_prefix=None, line="DON PEPIN GARCIA - SERIES JJ", vitola="Toro")),
+    ("Oliva", "Serie V Oliva Torpedo", dict(brand_prefix=None, line="Serie V Oliva", vitola="Torpedo")),
+    # plurals
+    ("La Flor Dominicana", "LFD LOS LANCEROS (5)", dict(line="LFD LOS", vitola="Lancero", box_count=5)),
+    ("My Father", "DON PEPIN GARCIA - SERIES JJ BELICOSOS", dict(vitola="Belicoso")),
+    # "20ct" / "20 CT" are box counts; CT on its own is Connecticut
+    ("Blackened", "Blackened - S84 - Corona Box 20ct",
+     dict(brand_prefix="Blackened", vitola="Corona", wrapper=None, box_count=20)),
+    ("Herrera", "Herrera - Miami - Lonsdale Box 10ct", dict(wrapper=None, box_count=10)),
+    ("Saint Luis Rey", "6 CT SAMPLER BOX 6", dict(wrapper=None, box_count=6)),
+    ("Acid", "Acid - 20 Toro CT Box 20ct", dict(vitola="Toro", wrapper="Connecticut", box_count=20)),
+    ("Joya De Nicaragua", "JDN - Antano CT - Toro Box 20ct", dict(vitola="Toro", wrapper="Connecticut")),
+    # box count: (20) over BOX 20 over 20 CT
+    ("Oscar Valladares", "Fresh Pack 5 Toro (10 Count Case)", dict(vitola="Toro", box_count=10)),
+    ("Oliva", "Oliva 30 Displays of 5 CT Reserve (5x50)",
+     dict(box_count=5, size="5x50", length=5.0, ring_gauge=50)),
+    # embedded size, ring first
+    ("Padron", "Padron 40th Anniversary (Chest) 54 X 61/2 40 $2,106.00 $1,053.00 Torpedo",
+     dict(brand_prefix="Padron", size="54 X 61/2", length=6.5, ring_gauge=54)),
+])
+def test_parse_name(brand, name, expected):
+    parsed = parse_name(name, brand)._asdict()
+    assert {field: parsed[field] for field in expected} == expected
+
+
+def test_empty_name():
+    assert parse_name("", "Oliva") == parse_name(None) == (None,) * 8
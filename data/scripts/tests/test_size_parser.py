@@ -0,0 +1,53 @@
+"""parse_size and parse_size_series over size strings from the price lists."""
+
+import pytest
+
+from name_parser import parse_name
+from size_parser import parse_size, parse_size_series
+
+CASES = [
+    ("5 x 50", (5.0, 50)),
+    ("6 1/2 x 52", (6.5, 52)),
+    ("5 ¾ X 50", (5.75, 50)),
+    ('81/2" x 52', (8.5, 52)),
+    ('51/16" x 44', (5.0625, 44)),
+    ("6.5 x 54", (6.5, 54)),
+    ("54 X 61/2", (6.5, 54)),
+    ("52 X 51/4", (5.25, 52)),
+    ("44 X 5/12", (5.0, 44)),
+    # dual ring gauges give the larger ring
+    ("4 ½ x 38/54", (4.5, 54)),
+    ('57/8" x 50/64', (5.875, 64)),
+    ("34/38 X 5 1/2", (5.5, 38)),
+    # ring/length only where there is no "A x B"
+    ("52/6", (6.0, 52)),
+    ("1/2", (None, None)),
+    ("10/12", (None, None)),
+    ("", (None, None)),
+    (None, (None, None)),
+]
+
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_parse_size(text, expected):
+    assert parse_size(text) == expected
+
+
+def test_series_matches_parse_size():
+    pd = pytest.importorskip("pandas")
+    sizes = pd.Series([text for text, _ in CASES])
+
+    parsed = parse_size_series(sizes)
+
+    for (text, expected), length, ring in zip(CASES, parsed["length"], parsed["ring_gauge"]):
+        got = (None if pd.isna(length) else length, None if pd.isna(ring) else int(ring))
+        assert got == expected, text
+
+
+@pytest.mark.parametrize("name, size", [
+    ('Padron 40th Anniversary (Chest) 54 X 61/2 40 $2,106.00 $1,053.00 Torpedo', (6.5, 54)),
+    ("Liga Privada 50/50 Blend Toro 6 x 52", (6.0, 52)),
+    ("Half Corona 1/2 Box 20 $150.00", (None, None)),
+])
+def test_names_take_only_a_by_b_sizes(name, size):
+    assert parse_name(name)[6:] == size